@@ -1,3 +1,6 @@
+import time
+from threading import Lock
+
 from bleak import BleakClient
 from flask_socketio import SocketIO
 
@@ -7,14 +10,26 @@ from VehicleManagement.AnkiController import AnkiController
 from VehicleManagement.VehicleController import Turns, VehicleController
 
 from LocationService.LocationService import LocationService
+from LocationService.DeadlineScheduler import DeadlineScheduler
 from LocationService.Track import FullTrack
 
 
+# fields that are sent with every driving data update, so the receivers know whose data it is
+_DRIVING_DATA_IDENTITY_KEYS = ('vehicle_id', 'player')
+
+
 class ModelCar(Vehicle):
     """
     Base Car implementation that reacts to hacking effects and forwards speed/offset changes to
-    the controller, if appropriate
+    the controller, if appropriate.
+    Driving data changes are sent to the driving data callback as diff against the last sent
+    data and at most driving_data_rate times per second. Changes in between are sent together
+    when the next update is allowed.
     """
+    DEFAULT_DRIVING_DATA_RATE: float = 5.0
+    # sends the changes that were held back by the rate limit of all cars in one thread
+    _driving_data_scheduler: DeadlineScheduler = DeadlineScheduler("driving_data_scheduler_thread")
+
     def __init__(self, vehicle_id: str, controller: VehicleController, track: FullTrack, socketio: SocketIO) -> None:
         super().__init__(vehicle_id, socketio)
         self._controller = controller
@@ -47,16 +62,39 @@ class ModelCar(Vehicle):
         self._version: str = ""
 
         self._model_car_not_reachable_callback = None
+        # if set, positions are sent in batches for all cars instead of one event per car
+        self._position_aggregator = None
+
+        # last driving data that was sent to the driving data callback
+        self._published_driving_data: dict = {}
+        self._driving_data_interval: float = 1 / ModelCar.DEFAULT_DRIVING_DATA_RATE
+        self._next_driving_data_time: float = 0.0
+        self._driving_data_mutex: Lock = Lock()
+        # the callback is called without holding the mutex. Only one thread sends at a time and
+        # sends the changes that were made meanwhile afterwards, so the updates stay in order
+        self._driving_data_sending: bool = False
+        self._driving_data_resend: bool = False
         return
 
     def __del__(self) -> None:
         self._controller.__del__()
         self._location_service.__del__()
+        ModelCar._driving_data_scheduler.cancel(self)
         return
 
     def get_typ_of_controller(self):
         return type(self._controller)
 
+    def get_location_service(self) -> LocationService:
+        return self._location_service
+
+    def set_position_aggregator(self, position_aggregator) -> None:
+        """
+        Sets a CarPositionAggregator that sends the positions of all cars in one event
+        per simulation tick. Without it every position is sent as own car_positions event
+        """
+        self._position_aggregator = position_aggregator
+
     def set_model_car_not_reachable_callback(self, function_name) -> None:
         self._model_car_not_reachable_callback = function_name
         return
@@ -66,11 +104,102 @@ class ModelCar(Vehicle):
             self._model_car_not_reachable_callback(self.vehicle_id, self.player, err_msg)
         return
 
-    def _on_driving_data_change(self) -> None:
-        if self._driving_data_callback is not None:
-            self._driving_data_callback(self.get_driving_data())
+    def set_driving_data_callback(self, function_name) -> None:
+        with self._driving_data_mutex:
+            self._driving_data_callback = function_name
+            # a new receiver gets the complete data with the next update
+            self._published_driving_data = {}
+        return
+
+    def set_driving_data_rate(self, rate: float) -> None:
+        """
+        Sets how often per second the driving data may be sent at most. 0 disables the limit
+        """
+        with self._driving_data_mutex:
+            self._driving_data_interval = 1 / rate if rate > 0 else 0.0
+
+    def _on_driving_data_change(self, force: bool = False) -> None:
+        """
+        Sends the changed driving data, if the rate limit allows it. Otherwise the changes
+        are sent as soon as it does.
+        force: send the changes immediately regardless of the rate limit. Used for discrete
+            events like a new hacking scenario
+        Thread-safe
+        """
+        with self._driving_data_mutex:
+            if self._driving_data_callback is None:
+                return
+            now = time.monotonic()
+            if not force and now < self._next_driving_data_time:
+                ModelCar._driving_data_scheduler.schedule(self, self._next_driving_data_time - now,
+                                                          self._on_driving_data_due)
+                return
+            if not self._start_sending_driving_data():
+                return
+        self._send_driving_data()
         return
 
+    def _on_driving_data_due(self) -> None:
+        with self._driving_data_mutex:
+            if self._driving_data_callback is None:
+                return
+            if not self._start_sending_driving_data():
+                return
+        self._send_driving_data()
+
+    def _start_sending_driving_data(self) -> bool:
+        """
+        returns: True, if the caller has to send the driving data with _send_driving_data().
+            False, if another thread is sending and will send the changes afterwards
+        Not Thread-safe: requires the driving data mutex
+        """
+        if self._driving_data_sending:
+            self._driving_data_resend = True
+            return False
+        self._driving_data_sending = True
+        return True
+
+    def _send_driving_data(self) -> None:
+        """
+        Sends the driving data that changed since the last update. The callback (a Socket.IO
+        emit) is called without holding the mutex, so a slow emit doesn't block the setters
+        or the position updates
+        """
+        try:
+            while True:
+                with self._driving_data_mutex:
+                    self._driving_data_resend = False
+                    callback = self._driving_data_callback
+                    changes = self._collect_driving_data_changes(time.monotonic()) if callback is not None else None
+                if changes is not None:
+                    callback(changes)
+                with self._driving_data_mutex:
+                    if not self._driving_data_resend:
+                        self._driving_data_sending = False
+                        return
+        except Exception:
+            with self._driving_data_mutex:
+                self._driving_data_sending = False
+            raise
+
+    def _collect_driving_data_changes(self, now: float) -> dict | None:
+        """
+        Get the driving data that changed since the last update and mark it as sent
+        returns: the changes or None, if nothing changed
+        Not Thread-safe: requires the driving data mutex
+        """
+        driving_data = self.get_driving_data()
+        changes = {key: value for key, value in driving_data.items()
+                   if key not in self._published_driving_data or self._published_driving_data[key] != value}
+        if len(changes) == 0:
+            return None
+        for key in _DRIVING_DATA_IDENTITY_KEYS:
+            changes[key] = driving_data[key]
+        self._published_driving_data = driving_data
+        self._next_driving_data_time = now + self._driving_data_interval
+        ModelCar._driving_data_scheduler.cancel(self)
+        return changes
+
     @property
     def speed_request(self) -> float:
         return self.__speed_request
@@ -104,7 +233,7 @@ class ModelCar(Vehicle):
         else:
             self.__speed = 0
             self._speed_actual = 0
-            self._on_driving_data_change()
+            self._on_driving_data_change(force=True)
 
         self._location_service.set_speed_percent(self.__speed)
         self._controller.change_speed_to(int(self.__speed))
@@ -265,7 +394,17 @@ class ModelCar(Vehicle):
     def __on_location_service_update(self, pos: Position, angle: Angle, _: dict):
         self._send_location_via_socketio(pos, angle)
 
+    def get_position_data(self) -> dict:
+        """
+        Get the last simulated position in the same format as the car_positions event
+        """
+        pos, angle = self._location_service.get_position_and_angle()
+        return { 'car': self.vehicle_id, 'position': pos.to_dict(), 'angle': angle.get_deg() }
+
     def _send_location_via_socketio(self, pos: Position, angle: Angle) -> None:
         data = { 'car': self.vehicle_id, 'position': pos.to_dict(), 'angle': angle.get_deg() }
-        self._socketio.emit("car_positions", data)
+        if self._position_aggregator is not None:
+            self._position_aggregator.add_position(data)
+        else:
+            self._socketio.emit("car_positions", data)
         return
@@ -4,12 +4,14 @@ from flask_socketio import SocketIO
 from DataModel.ModelCar import ModelCar
 from LocationService.Track import FullTrack
 from VehicleManagement.AnkiController import AnkiController
+from VehicleManagement.VehicleControllerProcess import RemoteAnkiController
 
 
 class PhysicalCar(ModelCar):
-    def __init__(self, vehicle_id: str, controller: AnkiController, track: FullTrack, socketio: SocketIO) -> None:
+    def __init__(self, vehicle_id: str, controller: AnkiController | RemoteAnkiController, track: FullTrack,
+                 socketio: SocketIO) -> None:
         super().__init__(vehicle_id, controller, track, socketio)
-        self._controller: AnkiController = controller
+        self._controller: AnkiController | RemoteAnkiController = controller
 
     def initiate_connection(self, uuid: str) -> bool:
         if self._controller.connect_to_vehicle(BleakClient(uuid), True):
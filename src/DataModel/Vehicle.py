@@ -71,7 +71,7 @@ class Vehicle:
         return
 
     @abc.abstractmethod
-    def _on_driving_data_change(self) -> None:
+    def _on_driving_data_change(self, force: bool = False) -> None:
         pass
 
     @property
@@ -81,7 +81,7 @@ class Vehicle:
     @hacking_scenario.setter
     def hacking_scenario(self, value: str) -> None:
         self._active_hacking_scenario = value
-        self._on_driving_data_change()
+        self._on_driving_data_change(force=True)
 
     @abc.abstractmethod
     def get_driving_data(self) -> dict:
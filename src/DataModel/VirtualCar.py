@@ -10,7 +10,8 @@ from VehicleManagement.EmptyController import EmptyController
 class VirtualCar(ModelCar):
     def __init__(self, vehicle_id: str, track: FullTrack, socketio: SocketIO) -> None:
         super().__init__(vehicle_id, EmptyController(), track, socketio)
-        self._location_service: LocationService = LocationService(track, self.__location_service_update, start_immeaditly=True)
+        # the simulation isn't started here, since virtual cars are advanced by the FleetSimulator
+        self._location_service: LocationService = LocationService(track, self.__location_service_update)
 
     def __location_service_update(self, pos: Position, rot: Angle, data: dict):
         speed: float | None = data.get('speed')
@@ -0,0 +1,234 @@
+import json
+import struct
+import logging
+from typing import Dict, List
+from threading import Lock
+from flask_socketio import SocketIO
+
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.Track import FullTrack
+from LocationService.SimulationProcess import SimulationProcess
+
+
+class CarPositionAggregator():
+    """
+    Collects the positions of all cars during a simulation tick and sends them as
+    a single car_positions_batch event at the end of the tick instead of one
+    car_positions event per car. The payload is a list of the same dicts the
+    car_positions event uses.
+    With the binary encoding the batch is sent as car_positions_binary event with
+    a bytes payload (a Socket.IO binary attachment) instead: a uint16 version of the
+    car id table followed by one fixed-width record per car (see _RECORD). The ids
+    belonging to the record indices are sent as car_position_ids event whenever
+    a car is added and can be requested with request_car_position_ids. The index of
+    a removed car is given to the next new car.
+    If the FleetSimulator uses an UpdatePublisher, the positions arrive in its emitter
+    thread and are sent after it delivered all waiting updates instead of after every tick.
+    Thread-safe
+    """
+    def __init__(self, socketio: SocketIO, fleet_simulator: FleetSimulator | SimulationProcess, use_binary_encoding: bool = False,
+                 track: FullTrack | None = None):
+        """
+        track: track the cars drive on. The binary encoding is only used, if the coordinates
+            of all positions on it fit into its records
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._socketio: SocketIO = socketio
+        # latest position of every car that was updated in the current tick
+        self._positions: Dict[str, dict] = {}
+        self._mutex: Lock = Lock()
+
+        self._batch_count: int = 0
+        self._position_count: int = 0
+        self._packets_saved: int = 0
+        self._bytes_saved: int = 0
+
+        if use_binary_encoding and track is not None and max(track.get_size()) > _INT16_MAX:
+            self.logger.warning("The track is larger than the %i mm the binary car positions can hold. "
+                                "Sending the car positions as JSON instead!", _INT16_MAX)
+            use_binary_encoding = False
+        self._use_binary_encoding: bool = use_binary_encoding
+        # index of every car in the binary records. Cars keep their index until they are removed.
+        # The slots of removed cars are None
+        self._car_indices: Dict[str, int] = {}
+        self._car_ids: List[str | None] = []
+        self._id_table_version: int = 0
+        if use_binary_encoding:
+            socketio.on_event('request_car_position_ids', self.get_id_table)
+
+        update_publisher = fleet_simulator.get_update_publisher()
+        if update_publisher is not None:
+            update_publisher.add_drain_listener(self.flush)
+        else:
+            fleet_simulator.add_tick_listener(self._on_tick)
+
+    def add_position(self, data: dict) -> None:
+        """
+        Adds the position of a car to the next batch. A later position of the same
+        car in the same tick replaces the earlier one.
+        data: dict with the keys car, position and angle
+        """
+        with self._mutex:
+            self._positions[data['car']] = data
+
+    def remove_car(self, car_id: str) -> None:
+        """
+        Drops the waiting position of a removed car and frees its index in the id table
+        """
+        with self._mutex:
+            self._positions.pop(car_id, None)
+            index = self._car_indices.pop(car_id, None)
+            if index is None:
+                return
+            self._car_ids[index] = None
+            while len(self._car_ids) > 0 and self._car_ids[-1] is None:
+                self._car_ids.pop()
+
+    def _on_tick(self, _: int) -> None:
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Sends all collected positions as one batch
+        """
+        id_table: dict | None = None
+        with self._mutex:
+            if len(self._positions) == 0:
+                return
+            positions: List[dict] = list(self._positions.values())
+            self._positions = {}
+            self._batch_count += 1
+            self._position_count += len(positions)
+            self._packets_saved += len(positions) - 1
+            if self._use_binary_encoding:
+                id_table = self._update_id_table(positions)
+                frame = self._encode(positions)
+                self._bytes_saved += _get_json_bytes(positions) - _BINARY_FRAMING_BYTES - len(frame)
+            else:
+                self._bytes_saved += _get_framing_bytes_saved(len(positions))
+        if not self._use_binary_encoding:
+            self._socketio.emit('car_positions_batch', positions)
+            return
+        if id_table is not None:
+            self._socketio.emit('car_position_ids', id_table)
+        self._socketio.emit('car_positions_binary', frame)
+
+    def get_id_table(self) -> dict:
+        """
+        Get the ids of the cars in the order of their record indices and the version of
+        the table. Used as acknowledgement of request_car_position_ids
+        """
+        with self._mutex:
+            return self._get_id_table()
+
+    def _get_id_table(self) -> dict:
+        """
+        Not Thread-safe
+        """
+        return {'version': self._id_table_version, 'ids': list(self._car_ids)}
+
+    def _update_id_table(self, positions: List[dict]) -> dict | None:
+        """
+        Adds unknown cars to the id table. They get the first free index
+        Not Thread-safe
+        returns: the new table, if it changed
+        """
+        changed = False
+        for data in positions:
+            if data['car'] in self._car_indices:
+                continue
+            if None in self._car_ids:
+                index = self._car_ids.index(None)
+                self._car_ids[index] = data['car']
+            elif len(self._car_ids) <= _INDEX_MAX:
+                index = len(self._car_ids)
+                self._car_ids.append(data['car'])
+            else:
+                self.logger.error("The binary car positions can't hold more than %i cars. Not sending the position of %s!",
+                                  _INDEX_MAX + 1, data['car'])
+                continue
+            self._car_indices[data['car']] = index
+            changed = True
+        if not changed:
+            return None
+        self._id_table_version = (self._id_table_version + 1) % 65536
+        return self._get_id_table()
+
+    def _encode(self, positions: List[dict]) -> bytes:
+        """
+        Not Thread-safe
+        """
+        # cars that didn't get an index aren't sent
+        positions = [data for data in positions if data['car'] in self._car_indices]
+        frame = bytearray(_FRAME_HEADER.size + len(positions) * _RECORD.size)
+        _FRAME_HEADER.pack_into(frame, 0, self._id_table_version)
+        offset = _FRAME_HEADER.size
+        for data in positions:
+            _RECORD.pack_into(frame, offset, self._car_indices[data['car']], _quantize_coordinate(data['position']['x']),
+                              _quantize_coordinate(data['position']['y']), round(data['angle'] * 100) % 36000)
+            offset += _RECORD.size
+        return bytes(frame)
+
+    def get_statistics(self) -> dict:
+        """
+        Get the amount of sent batches and positions and how many Socket.IO packets
+        and bytes were saved compared to one car_positions event per car. The
+        savings apply to every connected client.
+        """
+        with self._mutex:
+            return {
+                'batches': self._batch_count,
+                'positions': self._position_count,
+                'packets_saved': self._packets_saved,
+                'bytes_saved': self._bytes_saved
+            }
+
+
+# A Socket.IO event is sent as text packet '42["<event>",<payload>]' ('4' is the Engine.IO
+# message type, '2' the Socket.IO event type) with compact JSON. The car dicts are serialized
+# the same way in both cases, so only the framing around them differs.
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+_PACKET_TYPE_BYTES = len('42')
+_SINGLE_FRAMING_BYTES = _PACKET_TYPE_BYTES + len(_dumps(['car_positions', None])) - len(_dumps(None))
+_BATCH_FRAMING_BYTES = _PACKET_TYPE_BYTES + len(_dumps(['car_positions_batch', []]))
+_LIST_SEPARATOR_BYTES = len(_dumps([0, 0])) - 2 * len(_dumps(0)) - len(_dumps([]))
+
+
+def _get_framing_bytes_saved(position_count: int) -> int:
+    """
+    Get the bytes a batch of the given amount of positions saves compared to single events
+    """
+    single = position_count * _SINGLE_FRAMING_BYTES
+    batch = _BATCH_FRAMING_BYTES + (position_count - 1) * _LIST_SEPARATOR_BYTES
+    return single - batch
+
+
+# binary frame: version of the car id table, then per car: index in the id table, x and y
+# in whole mm and the angle in centi-degrees. All little endian
+_FRAME_HEADER = struct.Struct('<H')
+_RECORD = struct.Struct('<HhhH')
+_INT16_MIN = -32768
+_INT16_MAX = 32767
+_INDEX_MAX = 65535
+# a binary event is sent as text packet '451-["<event>",{"_placeholder":true,"num":0}]'
+# followed by the attachment as binary message
+_BINARY_FRAMING_BYTES = len('451-') + len(_dumps(['car_positions_binary', {'_placeholder': True, 'num': 0}]))
+
+
+def _quantize_coordinate(value: float) -> int:
+    return min(max(round(value), _INT16_MIN), _INT16_MAX)
+
+
+def _get_json_bytes(positions: List[dict]) -> int:
+    """
+    Get the bytes the positions would need as single car_positions events
+    """
+    # the batch list only adds the brackets and separators to the serialized car dicts
+    list_bytes = len(_dumps(positions)) - len(_dumps([])) - (len(positions) - 1) * _LIST_SEPARATOR_BYTES
+    return list_bytes + len(positions) * _SINGLE_FRAMING_BYTES
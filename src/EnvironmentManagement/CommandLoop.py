@@ -0,0 +1,81 @@
+import logging
+from concurrent.futures import Future
+from queue import Queue
+from typing import Callable, Tuple
+from threading import Lock, Thread, current_thread
+
+
+class CommandLoop():
+    """
+    Runs commands one after another in an own thread, so the state they change has a single
+    writer and doesn't need to be locked. Other threads submit the commands and can wait for
+    their results. Commands submitted by a command itself are ran immediately.
+    Thread-safe
+    """
+    def __init__(self, name: str = "command_loop"):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        # None stops the loop
+        self._commands: Queue[Tuple[Callable, tuple, Future] | None] = Queue()
+        self._mutex: Lock = Lock()
+        self._stopped: bool = False
+        self._thread: Thread = Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, command: Callable, *args) -> Future:
+        """
+        Adds a command to the end of the queue without waiting for it
+        returns: Future with the result of the command
+        """
+        future = Future()
+        with self._mutex:
+            if self._stopped:
+                self.logger.error("It was attempted to submit a command to a stopped CommandLoop. Ignoring the request!")
+                future.set_result(None)
+                return future
+            self._commands.put((command, args, future))
+        return future
+
+    def execute(self, command: Callable, *args):
+        """
+        Runs a command in the loop and waits for it
+        returns: the result of the command. Exceptions of the command are raised again
+        """
+        if self.is_loop_thread():
+            return command(*args)
+        return self.submit(command, *args).result()
+
+    def is_loop_thread(self) -> bool:
+        return current_thread() is self._thread
+
+    def stop(self):
+        """
+        Stops the loop after the already submitted commands
+        """
+        with self._mutex:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._commands.put(None)
+        if not self.is_loop_thread():
+            self._thread.join()
+
+    def is_running(self) -> bool:
+        return not self._stopped
+
+    def _run(self):
+        while True:
+            entry = self._commands.get()
+            if entry is None:
+                return
+            command, args, future = entry
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(command(*args))
+            except Exception as e:
+                self.logger.error("Command %s failed: %s", getattr(command, '__name__', command), e)
+                future.set_exception(e)
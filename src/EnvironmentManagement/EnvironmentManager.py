@@ -7,36 +7,104 @@
 # file that should have been included as part of this package.
 #
 import logging
-from typing import List, Dict
-from collections import deque
+import functools
+from typing import Dict, List, NamedTuple, Tuple
 from flask_socketio import SocketIO
 
+from DataModel.ModelCar import ModelCar
 from DataModel.PhysicalCar import PhysicalCar
 from DataModel.Vehicle import Vehicle
 from DataModel.VirtualCar import VirtualCar
-from VehicleManagement.AnkiController import AnkiController
 from VehicleManagement.FleetController import FleetController
+from VehicleManagement.VehicleControllerProcess import VehicleControllerProcess
 from VehicleManagement.VehicleController import VehicleController
 
-from LocationService.TrackPieces import TrackBuilder, FullTrack
-from LocationService.Track import TrackPieceType
+from LocationService.Track import FullTrack
+from LocationService.TrackLoader import TrackLoader
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.SimulationRecorder import SimulationRecorder
+from LocationService.SimulationProcess import SimulationProcess
+from LocationService.FleetStateBuffer import FleetStateWriter
+from EnvironmentManagement.CarPositionAggregator import CarPositionAggregator
+from EnvironmentManagement.VehicleRegistry import VehicleRegistry
+from EnvironmentManagement.CommandLoop import CommandLoop
+
+
+class EnvironmentSnapshot(NamedTuple):
+    """
+    State of the vehicles and the waiting players after a command of the EnvironmentManager.
+    It's replaced and never changed, so it can be read without locking
+    """
+    vehicles: Tuple[Vehicle, ...]
+    # (player, vehicle id) for every vehicle with a player
+    mapped_cars: Tuple[Tuple[str, str], ...]
+    free_cars: Tuple[str, ...]
+    waiting_players: Tuple[str, ...]
+
+
+def _command(method):
+    """
+    Runs the decorated method of the EnvironmentManager in its command loop and publishes
+    a new snapshot afterwards
+    """
+    @functools.wraps(method)
+    def run_command(self, *args, **kwargs):
+        def run_and_publish():
+            result = method(self, *args, **kwargs)
+            self._publish_snapshot()
+            return result
+        return self._command_loop.execute(run_and_publish)
+    return run_command
 
-class EnvironmentManager:
 
-    def __init__(self, fleet_ctrl: FleetController, socketio: SocketIO):
+class EnvironmentManager:
+    """
+    Manages the vehicles and the players waiting for one. The Socket.IO handlers call it from
+    arbitrary threads, so all changes of the vehicles and the queue are ran one after another
+    in a command loop (single writer). The lists for the UIs are read from an immutable
+    snapshot that's replaced after every change.
+    Thread-safe
+    """
+
+    def __init__(self, fleet_ctrl: FleetController | VehicleControllerProcess, socketio: SocketIO, fleet_simulator: FleetSimulator | SimulationProcess | None = None,
+                 simulation_recorder: SimulationRecorder | None = None, binary_car_positions: bool = False,
+                 fleet_state_writer: FleetStateWriter | None = None, track: FullTrack | None = None):
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
         console_handler = logging.StreamHandler()
         self.logger.addHandler(console_handler)
 
-        self._fleet_ctrl = fleet_ctrl
+        # the BLE I/O of the physical cars can also run in a separate process by a VehicleControllerProcess
+        self._fleet_ctrl: FleetController | VehicleControllerProcess = fleet_ctrl
         self._socketio: SocketIO = socketio
-        self._player_queue_list: deque[str] = deque()
-        self._active_anki_cars: List[Vehicle] = []
+        # indexes the vehicles by id and player and holds the queue of waiting players,
+        # so the lookups of the socket events don't scan all vehicles
+        self._vehicle_registry: VehicleRegistry = VehicleRegistry()
+        # only the command loop changes the registry
+        self._command_loop: CommandLoop = CommandLoop("environment_command_loop")
+        self._snapshot: EnvironmentSnapshot = EnvironmentSnapshot((), (), (), ())
         self.staff_ui = None
 
+        # all virtual vehicles are simulated by a single scheduler instead of one thread each
+        if fleet_simulator is None:
+            fleet_simulator = FleetSimulator()
+        # the virtual vehicles can also be simulated in a separate process by a SimulationProcess
+        self._fleet_simulator: FleetSimulator | SimulationProcess = fleet_simulator
+        # optionally records the inputs and states of the virtual vehicles for a later replay
+        self._simulation_recorder: SimulationRecorder | None = simulation_recorder
+        # optionally publishes the state of the virtual vehicles into shared memory for local processes
+        self._fleet_state_writer: FleetStateWriter | None = fleet_state_writer
+
         # self.find_unpaired_anki_cars()
 
+        # built once and shared by all cars and the car map. Without a track the default loop is loaded
+        if track is None:
+            track = TrackLoader().load()
+        self._track: FullTrack = track
+        # sends the positions of all simulated cars in one event per tick
+        self._position_aggregator: CarPositionAggregator = CarPositionAggregator(socketio, fleet_simulator,
+                                                                                 binary_car_positions, track)
+
         # number used for naming virtual vehicles
         self._virtual_vehicle_num: int = 1
 
@@ -59,9 +127,7 @@ class EnvironmentManager:
         found_devices = self._fleet_ctrl.scan_for_anki_cars()
         # remove already active uuids:
         new_devices = []
-        connected_devices = []
-        for v in self._active_anki_cars:
-            connected_devices.append(v.get_vehicle_id())
+        connected_devices = set(v.get_vehicle_id() for v in self._snapshot.vehicles)
         new_devices = [device for device in found_devices if device not in connected_devices]
 
         if new_devices:
@@ -72,38 +138,74 @@ class EnvironmentManager:
         return new_devices
 
     def get_vehicle_list(self) -> list[Vehicle]:
-        return self._active_anki_cars
+        return list(self._snapshot.vehicles)
+
+    def get_snapshot(self) -> EnvironmentSnapshot:
+        """
+        Get the state after the last finished command
+        """
+        return self._snapshot
+
+    def _publish_snapshot(self) -> None:
+        """
+        Replaces the snapshot with the current state
+        Not Thread-safe: only called by the command loop
+        """
+        vehicles = tuple(self._vehicle_registry.get_vehicles())
+        self._snapshot = EnvironmentSnapshot(
+            vehicles,
+            tuple((v.get_player(), v.get_vehicle_id()) for v in vehicles if v.get_player() is not None),
+            tuple(v.get_vehicle_id() for v in vehicles if v.get_player() is None),
+            tuple(self._vehicle_registry.get_waiting_players()))
+
+    def get_vehicle_registry(self) -> VehicleRegistry:
+        return self._vehicle_registry
+
+    def get_position_aggregator(self) -> CarPositionAggregator:
+        return self._position_aggregator
+
+    def get_car_positions(self) -> List[dict]:
+        """
+        Get the last simulated positions of all cars. Parked cars don't send updates,
+        so new car map clients need them as starting point
+        """
+        return [vehicle.get_position_data() for vehicle in self._snapshot.vehicles if isinstance(vehicle, ModelCar)]
 
+    @_command
     def remove_vehicle(self, uuid_to_remove: str):
         """
         Remove both vehicle and the controlling player for a given vehicle
         """
         self.logger.info(f"Removing vehicle with UUID {uuid_to_remove}")
 
-        found_vehicle = next((o for o in self._active_anki_cars if o.vehicle_id == uuid_to_remove), None)
+        found_vehicle = self._vehicle_registry.get_vehicle(uuid_to_remove)
         if found_vehicle is not None:
             player = found_vehicle.get_player()
             if player is not None:
                 self._socketio.emit('player_removed', player)
-            found_vehicle.remove_player()
-            self._active_anki_cars.remove(found_vehicle)
+            # also releases the player
+            self._vehicle_registry.remove_vehicle(uuid_to_remove)
+            if isinstance(found_vehicle, ModelCar):
+                self._fleet_simulator.unregister(found_vehicle.get_location_service())
+                if self._simulation_recorder is not None:
+                    self._simulation_recorder.remove_car(found_vehicle.get_location_service())
+                if self._fleet_state_writer is not None:
+                    self._fleet_state_writer.remove_car(found_vehicle.get_location_service())
+                self._position_aggregator.remove_car(found_vehicle.vehicle_id)
             found_vehicle.__del__()
 
         self._assign_players_to_vehicles()
-        self.logger.debug("Updated list of active vehicles: %s", self._active_anki_cars)
+        self.logger.debug("Updated list of active vehicles: %s", self._vehicle_registry.get_vehicles())
 
         self._update_staff_ui()
         return
 
+    @_command
     def update_queues_and_get_vehicle(self, player_id: str) -> Vehicle | None:
         self._add_player_to_queue_if_appropiate(player_id)
         self._assign_players_to_vehicles()
         self._update_staff_ui()
-        for v in self._active_anki_cars:
-            if v.get_player() == player_id:
-                return v
-        self._update_staff_ui()
-        return None
+        return self._vehicle_registry.get_vehicle_by_player(player_id)
 
     def _add_player_to_queue_if_appropiate(self, player_id: str) -> None:
         """
@@ -111,104 +213,107 @@ class EnvironmentManager:
             player isn't controlling a vehicle already and the player
             also isn't in the queue already)
         """
-        for v in self._active_anki_cars:
-            if v.get_player() == player_id:
-                return
-        for p in self._player_queue_list:
-            if p == player_id:
-                return
-        self._player_queue_list.append(player_id)
+        if self._vehicle_registry.get_vehicle_by_player(player_id) is not None:
+            return
+        self._vehicle_registry.enqueue_player(player_id)
         return
 
     def _assign_players_to_vehicles(self) -> None:
         """
         Assigns as many waiting players to vehicles as possible
         """
-        for v in self._active_anki_cars:
-            if v.is_free():
-                if len(self._player_queue_list) == 0:
-                    self._update_staff_ui()
-                    return
-                p = self._player_queue_list.popleft()
-                self._socketio.emit('player_active', p)
-                v.set_player(p)
+        for v in self._vehicle_registry.get_free_vehicles():
+            p = self._vehicle_registry.pop_waiting_player()
+            if p is None:
+                self._update_staff_ui()
+                return
+            self._socketio.emit('player_active', p)
+            self._vehicle_registry.assign_player(v, p)
         self._update_staff_ui()
         return
 
+    @_command
     def add_player(self, player_id: str) -> None:
         """
         Add a player to the waiting queue.
         """
-        if player_id in self._player_queue_list:
+        if not self._vehicle_registry.enqueue_player(player_id):
             print(f'Player {player_id} is already in the queue!')
             return
         else:
-            self._player_queue_list.append(player_id)
-            print(self._player_queue_list)
+            print(self._vehicle_registry.get_waiting_players())
         self._update_staff_ui()
         return
 
+    @_command
     def remove_player_from_waitlist(self, player_id: str) -> None:
         """
         Remove a player from the waiting queue
         """
-        if player_id in self._player_queue_list:
-            self._player_queue_list.remove(player_id)
+        self._vehicle_registry.remove_waiting_player(player_id)
         # TODO: Show other page when the user gets removed from here
         self._socketio.emit('player_removed', player_id)
         self._update_staff_ui()
         return
 
+    @_command
     def remove_player_from_vehicle(self, player: str) -> None:
         """
         removes a player from the vehicle they are controlling
         """
         self.logger.info(f"Removing player with UUID {player} from vehicle")
-        for v in self._active_anki_cars:
-            if v.get_player() == player:
-                v.remove_player()
-                self._socketio.emit('player_removed', player)
-                # TODO: define how to control vehicle without player
+        if self._vehicle_registry.release_player(player) is not None:
+            self._socketio.emit('player_removed', player)
+            # TODO: define how to control vehicle without player
         self._update_staff_ui()
         return
 
     def add_vehicle(self, uuid: str) -> None:
         self.logger.debug(f"Adding vehicle with UUID {uuid}")
 
-        anki_car_controller = AnkiController()
+        anki_car_controller = self._fleet_ctrl.create_vehicle_controller()
         temp_vehicle = PhysicalCar(uuid, anki_car_controller, self.get_track(), self._socketio)
+        # connected outside of the command loop, so other commands don't wait for the BLE connection
         temp_vehicle.initiate_connection(uuid)
         # TODO: add a check if connection was successful 
 
-        self._active_anki_cars.append(temp_vehicle)
+        self._add_connected_vehicle(temp_vehicle)
+        return
+
+    @_command
+    def _add_connected_vehicle(self, vehicle: Vehicle) -> None:
+        self._vehicle_registry.add_vehicle(vehicle)
         self._assign_players_to_vehicles()
         self._update_staff_ui()
         return
 
-    def add_virtual_vehicle(self):
+    @_command
+    def add_virtual_vehicle(self) -> str:
         # TODO: Add more better way of determining name numbers to allow reuse of already
         # used numbers
         name = f"Virtual Vehicle {self._virtual_vehicle_num}"
         self._virtual_vehicle_num += 1
         vehicle = VirtualCar(name, self.get_track(), self._socketio)
-        self._active_anki_cars.append(vehicle)
+        vehicle.set_position_aggregator(self._position_aggregator)
+        self._fleet_simulator.register(vehicle.get_location_service())
+        if self._simulation_recorder is not None:
+            self._simulation_recorder.add_car(vehicle.get_location_service())
+        if self._fleet_state_writer is not None:
+            self._fleet_state_writer.add_car(vehicle.get_location_service(), name)
+        self._vehicle_registry.add_vehicle(vehicle)
         self._assign_players_to_vehicles()
         self._update_staff_ui()
-        return
+        return name
 
     def get_track(self) -> FullTrack:
-        track: FullTrack = TrackBuilder()\
-            .append(TrackPieceType.STRAIGHT_WE)\
-            .append(TrackPieceType.CURVE_WS)\
-            .append(TrackPieceType.CURVE_NW)\
-            .append(TrackPieceType.STRAIGHT_EW)\
-            .append(TrackPieceType.CURVE_EN)\
-            .append(TrackPieceType.CURVE_SE)\
-            .build()
-
-        return track
+        """
+        Get the track all cars drive on. It's the same instance for all calls
+        """
+        return self._track
 
     def _update_staff_ui(self) -> None:
+        # the staff UI reads the snapshot
+        self._publish_snapshot()
         if self.staff_ui is not None:
             self.staff_ui.publish_new_data()
         else:
@@ -220,49 +325,34 @@ class EnvironmentManager:
         Returns a list of all vehicle names from vehicles that are
         controlled by a player
         """
-        l = []
-        for v in self._active_anki_cars:
-            if v.get_player() is not None:
-                l.append(v.get_vehicle_id())
-        return l
+        return [vehicle_id for _, vehicle_id in self._snapshot.mapped_cars]
 
     def get_free_car_list(self) -> List[str]:
         """
         Returns a list of all cars that have no player controlling them
         """
-        l = []
-        for v in self._active_anki_cars:
-            if v.get_player() is None:
-                l.append(v.get_vehicle_id())
-        return l
+        return list(self._snapshot.free_cars)
 
     def get_waiting_player_list(self) -> List[str]:
         """
         Gets a list of all player that are waiting for a vehicle
         """
-        tmp = []
-        for p in self._player_queue_list:
-            tmp.append(p)
-        return tmp
+        return list(self._snapshot.waiting_players)
 
     def get_car_from_player(self, player: str) -> Vehicle | None:
         """
         Get the car that's controlled by a player or None, if the
         player doesn't control any car
         """
-        for v in self._active_anki_cars:
-            if v.get_player() == player:
-                return v
-        return None
+        return self._vehicle_registry.get_vehicle_by_player(player)
 
     def get_mapped_cars(self) -> List[dict]:
         tmp = []
-        for v in self._active_anki_cars:
-            if v.get_player() is not None:
-                tmp.append({
-                    'player': v.get_player(),
-                    'car': v.get_vehicle_id()
-                })
+        for player, vehicle_id in self._snapshot.mapped_cars:
+            tmp.append({
+                'player': player,
+                'car': vehicle_id
+            })
         return tmp
 
     def get_car_color_map(self) -> Dict[str, List[str]]:
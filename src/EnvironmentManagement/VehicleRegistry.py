@@ -0,0 +1,136 @@
+from typing import Dict, List
+from threading import Lock
+
+from DataModel.Vehicle import Vehicle
+
+
+class VehicleRegistry():
+    """
+    Central registry of the active vehicles and the players waiting for one. Keeps indexes
+    from the vehicle id and from the player to the vehicle, so the lookups done for every
+    Socket.IO event don't have to scan all vehicles, and a queue of the waiting players
+    that's checked and changed without scanning it. Players have to be assigned and
+    released through the registry to keep the indexes consistent.
+    Thread-safe
+    """
+    def __init__(self, vehicles: List[Vehicle] | None = None):
+        # dicts keep the insertion order, so the vehicles and the queue stay in order
+        self._vehicles_by_id: Dict[str, Vehicle] = {}
+        self._vehicles_by_player: Dict[str, Vehicle] = {}
+        # the waiting players in the order of the queue. Only the keys are used
+        self._waiting_players: Dict[str, None] = {}
+        self._mutex: Lock = Lock()
+        if vehicles is not None:
+            for vehicle in vehicles:
+                self.add_vehicle(vehicle)
+
+    def add_vehicle(self, vehicle: Vehicle) -> bool:
+        """
+        returns: True, if no vehicle with the same id was registered before
+        """
+        with self._mutex:
+            if vehicle.vehicle_id in self._vehicles_by_id:
+                return False
+            self._vehicles_by_id[vehicle.vehicle_id] = vehicle
+            player = vehicle.get_player()
+            if player is not None:
+                self._vehicles_by_player[player] = vehicle
+            return True
+
+    def remove_vehicle(self, vehicle_id: str) -> Vehicle | None:
+        """
+        Removes a vehicle and releases its player
+        returns: the removed vehicle or None, if it wasn't registered
+        """
+        with self._mutex:
+            vehicle = self._vehicles_by_id.pop(vehicle_id, None)
+            if vehicle is None:
+                return None
+            player = vehicle.get_player()
+            if player is not None and self._vehicles_by_player.get(player) is vehicle:
+                del self._vehicles_by_player[player]
+            vehicle.remove_player()
+            return vehicle
+
+    def get_vehicle(self, vehicle_id: str) -> Vehicle | None:
+        return self._vehicles_by_id.get(vehicle_id)
+
+    def get_vehicle_by_player(self, player: str) -> Vehicle | None:
+        return self._vehicles_by_player.get(player)
+
+    def get_vehicles(self) -> List[Vehicle]:
+        """
+        Get all vehicles in the order they were added
+        """
+        with self._mutex:
+            return list(self._vehicles_by_id.values())
+
+    def get_free_vehicles(self) -> List[Vehicle]:
+        """
+        Get the vehicles without player in the order they were added
+        """
+        with self._mutex:
+            return [v for v in self._vehicles_by_id.values() if v.is_free()]
+
+    def assign_player(self, vehicle: Vehicle, player: str) -> bool:
+        """
+        Makes a player the driver of a free vehicle
+        returns: True, if the vehicle was free and the player didn't drive another vehicle
+        """
+        with self._mutex:
+            if not vehicle.is_free() or player in self._vehicles_by_player:
+                return False
+            vehicle.set_player(player)
+            self._vehicles_by_player[player] = vehicle
+            return True
+
+    def release_player(self, player: str) -> Vehicle | None:
+        """
+        Removes a player from the vehicle they're driving
+        returns: the vehicle or None, if the player didn't drive one
+        """
+        with self._mutex:
+            vehicle = self._vehicles_by_player.pop(player, None)
+            if vehicle is not None:
+                vehicle.remove_player()
+            return vehicle
+
+    def enqueue_player(self, player: str) -> bool:
+        """
+        Adds a player to the end of the queue
+        returns: True, if the player wasn't waiting already
+        """
+        with self._mutex:
+            if player in self._waiting_players:
+                return False
+            self._waiting_players[player] = None
+            return True
+
+    def remove_waiting_player(self, player: str) -> bool:
+        """
+        returns: True, if the player was waiting
+        """
+        with self._mutex:
+            if player not in self._waiting_players:
+                return False
+            del self._waiting_players[player]
+            return True
+
+    def pop_waiting_player(self) -> str | None:
+        """
+        Removes the first player of the queue
+        returns: the player or None, if nobody is waiting
+        """
+        with self._mutex:
+            if len(self._waiting_players) == 0:
+                return None
+            player = next(iter(self._waiting_players))
+            del self._waiting_players[player]
+            return player
+
+    def get_waiting_players(self) -> List[str]:
+        """
+        Get the waiting players in the order of the queue
+        """
+        with self._mutex:
+            return list(self._waiting_players)
@@ -0,0 +1,66 @@
+import time
+from abc import ABC, abstractmethod
+from threading import Event, Lock
+
+
+class Clock(ABC):
+    """
+    Time source of the simulation loops. All times are in seconds.
+    """
+    @abstractmethod
+    def now(self) -> float:
+        """
+        Get the current time. Only differences between two values are meaningful
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def wait(self, delay: float, stop_event: Event) -> bool:
+        """
+        Waits for the given time or until the stop_event is set
+        returns: True, if the stop_event was set
+        """
+        raise NotImplementedError
+
+
+class MonotonicClock(Clock):
+    """
+    Clock that follows the wall time. Used by default.
+    Thread-safe
+    """
+    def now(self) -> float:
+        return time.monotonic()
+
+    def wait(self, delay: float, stop_event: Event) -> bool:
+        return stop_event.wait(delay)
+
+
+class VirtualClock(Clock):
+    """
+    Clock that is only advanced by waiting on it. Waiting returns immediately,
+    so a simulation loop using it runs as fast as the CPU allows while the
+    simulated time advances exactly as scheduled.
+    Thread-safe
+    """
+    def __init__(self, start_time: float = 0.0):
+        self._time: float = start_time
+        self._mutex: Lock = Lock()
+
+    def now(self) -> float:
+        with self._mutex:
+            return self._time
+
+    def wait(self, delay: float, stop_event: Event) -> bool:
+        if stop_event.is_set():
+            return True
+        self.advance(delay)
+        return False
+
+    def advance(self, delay: float):
+        """
+        Moves the time forward. Negative values are ignored
+        """
+        if delay <= 0:
+            return
+        with self._mutex:
+            self._time += delay
@@ -0,0 +1,88 @@
+import time
+import heapq
+import logging
+from typing import Callable, Dict, List, Tuple
+from threading import Condition, Thread
+
+
+class DeadlineScheduler():
+    """
+    Runs callbacks at deadlines in a single worker thread, instead of starting a Timer
+    thread for every delayed callback. Every key (e.g. a car) has at most one scheduled
+    callback. The callbacks run one after another in the worker thread, so they should
+    return quickly.
+    Thread-safe
+    """
+    def __init__(self, name: str = "deadline_scheduler_thread"):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._name: str = name
+        self._condition: Condition = Condition()
+        # (deadline, sequence number, key). Entries of cancelled or replaced callbacks stay in the
+        # heap until their deadline and are skipped then
+        self._deadlines: List[Tuple[float, int, object]] = []
+        # scheduled callback of every key as (sequence number, callback)
+        self._scheduled: Dict[object, Tuple[int, Callable[[], None]]] = {}
+        self._next_sequence_number: int = 0
+        self._worker_thread: Thread | None = None
+
+    def schedule(self, key, delay: float, callback: Callable[[], None]) -> bool:
+        """
+        Schedules the callback of a key to be called after delay seconds
+        returns: False, if a callback of the key is already scheduled. It's kept then
+        """
+        with self._condition:
+            if key in self._scheduled:
+                return False
+            sequence_number = self._next_sequence_number
+            self._next_sequence_number += 1
+            self._scheduled[key] = (sequence_number, callback)
+            heapq.heappush(self._deadlines, (time.monotonic() + delay, sequence_number, key))
+            if self._worker_thread is None:
+                self._worker_thread = Thread(target=self._run, name=self._name, daemon=True)
+                self._worker_thread.start()
+            self._condition.notify()
+        return True
+
+    def cancel(self, key) -> None:
+        """
+        Cancels the scheduled callback of a key, if there is one
+        """
+        with self._condition:
+            self._scheduled.pop(key, None)
+
+    def is_scheduled(self, key) -> bool:
+        with self._condition:
+            return key in self._scheduled
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                callback = self._pop_due_callback()
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error("A scheduled callback failed: %s", e)
+
+    def _pop_due_callback(self) -> Callable[[], None]:
+        """
+        Waits until the deadline of a scheduled callback passed and removes it
+        Not Thread-safe: requires the condition
+        """
+        while True:
+            if len(self._deadlines) == 0:
+                self._condition.wait()
+                continue
+            deadline, sequence_number, key = self._deadlines[0]
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            heapq.heappop(self._deadlines)
+            scheduled = self._scheduled.get(key)
+            if scheduled is not None and scheduled[0] == sequence_number:
+                del self._scheduled[key]
+                return scheduled[1]
@@ -0,0 +1,148 @@
+import logging
+from enum import Enum
+from collections import deque
+from threading import Event
+
+from LocationService.Clock import Clock, MonotonicClock
+
+
+class OverrunPolicy(Enum):
+    """
+    Defines what happens when ticks couldn't be run in time
+    """
+    # run the missed ticks back to back (up to a limit) so the simulated time stays in sync with the wall time
+    CATCH_UP = 0,
+    # drop the missed ticks and continue with the next tick that is due
+    SKIP = 1
+
+
+class TickStatistics():
+    """
+    Timing statistics of a simulation loop. All times are in seconds. Written
+    by the simulation thread only, so reading them from another thread can
+    give slightly outdated values.
+    """
+    def __init__(self, tick_interval: float, window_size: int = 240):
+        """
+        tick_interval: targeted time between two ticks
+        window_size: amount of recent ticks the averages and maximums are calculated of
+        """
+        self._tick_interval = tick_interval
+        self.tick_count: int = 0
+        # how often the loop woke up after the deadline of one or more further ticks passed
+        self.overrun_count: int = 0
+        # ticks that were run late back to back to catch up
+        self.caught_up_ticks: int = 0
+        # ticks that were dropped
+        self.skipped_ticks: int = 0
+        self._step_times: deque[float] = deque(maxlen=window_size)
+        self._callback_times: deque[float] = deque(maxlen=window_size)
+
+    def record_tick(self, step_time: float, callback_time: float):
+        self.tick_count += 1
+        self._step_times.append(step_time)
+        self._callback_times.append(callback_time)
+
+    def record_overrun(self, caught_up_ticks: int, skipped_ticks: int):
+        self.overrun_count += 1
+        self.caught_up_ticks += caught_up_ticks
+        self.skipped_ticks += skipped_ticks
+
+    def get_summary(self) -> dict:
+        """
+        Get the statistics as dict. Averages and maximums are calculated over the
+        recent ticks. load is the average share of the tick interval that was needed
+        for the step and callbacks; values near or above 1 mean the system is saturated.
+        """
+        step_times = list(self._step_times)
+        callback_times = list(self._callback_times)
+        count = len(step_times)
+        avg_step = sum(step_times) / count if count > 0 else 0
+        avg_callback = sum(callback_times) / count if count > 0 else 0
+        return {
+            'tick_count': self.tick_count,
+            'overrun_count': self.overrun_count,
+            'caught_up_ticks': self.caught_up_ticks,
+            'skipped_ticks': self.skipped_ticks,
+            'avg_step_time': avg_step,
+            'max_step_time': max(step_times, default=0),
+            'avg_callback_time': avg_callback,
+            'max_callback_time': max(callback_times, default=0),
+            'load': (avg_step + avg_callback) / self._tick_interval
+        }
+
+
+class DeadlineTicker():
+    """
+    Ticker for simulation loops that schedules ticks on fixed monotonic deadlines
+    instead of sleeping a fixed time after every tick. This keeps the rate
+    independent of how long a tick takes.
+    """
+    def __init__(self, ticks_per_second: int, overrun_policy: OverrunPolicy = OverrunPolicy.CATCH_UP, max_catch_up_ticks: int = 3,
+                 clock: Clock | None = None):
+        """
+        ticks_per_second: targeted tick rate
+        overrun_policy: what to do with ticks that couldn't be run in time
+        max_catch_up_ticks: maximum amount of missed ticks that are run additionally
+            at once with OverrunPolicy.CATCH_UP. Further missed ticks are dropped
+        clock: time source of the schedule. Defaults to the wall time (MonotonicClock)
+        """
+        self._clock: Clock = clock if clock is not None else MonotonicClock()
+        self._interval: float = 1 / ticks_per_second
+        self._overrun_policy = overrun_policy
+        self._max_catch_up_ticks = max_catch_up_ticks
+        self._next_deadline: float | None = None
+        self._last_overrun_warning: float | None = None
+        self.statistics: TickStatistics = TickStatistics(self._interval)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+    def get_clock(self) -> Clock:
+        return self._clock
+
+    def reset(self):
+        """
+        Restarts the schedule, so the next tick is due immediately. Needs to be called
+        after the loop was paused to not catch up the paused time
+        """
+        self._next_deadline = None
+
+    def wait_for_next_tick(self, stop_event: Event) -> int:
+        """
+        Blocks until the next tick is due.
+        stop_event: Event that interrupts the waiting
+        returns: how many ticks have to be run now or 0 if the stop_event was set
+        """
+        now = self._clock.now()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        delay = self._next_deadline - now
+        ticks = 1
+        if delay > 0:
+            if self._clock.wait(delay, stop_event):
+                return 0
+        else:
+            # deadlines of further ticks that have already passed
+            missed = int(-delay / self._interval)
+            if missed > 0:
+                if self._overrun_policy == OverrunPolicy.CATCH_UP:
+                    caught_up = min(missed, self._max_catch_up_ticks)
+                else:
+                    caught_up = 0
+                skipped = missed - caught_up
+                ticks += caught_up
+                self._next_deadline += skipped * self._interval
+                self.statistics.record_overrun(caught_up, skipped)
+                self._warn_about_overrun(now)
+        self._next_deadline += ticks * self._interval
+        return ticks
+
+    def _warn_about_overrun(self, now: float):
+        # limit the warnings to not flood the log of an already saturated system
+        if self._last_overrun_warning is None or now - self._last_overrun_warning > 10:
+            self._last_overrun_warning = now
+            self.logger.warning("The simulation can't keep up with %i ticks per second: %s", round(1 / self._interval),
+                                self.statistics.get_summary())
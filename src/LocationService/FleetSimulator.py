@@ -0,0 +1,237 @@
+import logging
+from typing import Callable, Tuple
+from threading import Event, Lock, Thread
+
+from LocationService.LocationService import LocationService
+from LocationService.DeadlineTicker import DeadlineTicker, OverrunPolicy, TickStatistics
+from LocationService.Clock import Clock
+from LocationService.UpdatePublisher import UpdatePublisher
+from LocationService import VectorizedFleetEngine
+
+
+class FleetSimulator():
+    """
+    Scheduler that advances all registered LocationServices in a single
+    simulation thread. This replaces the thread per LocationService, so
+    all cars are simulated in phase and don't contend for the GIL.
+    """
+    def __init__(self, simulation_ticks_per_second: int = 24, start_on_register: bool = True, use_vectorized_engine: bool = False,
+                 overrun_policy: OverrunPolicy = OverrunPolicy.CATCH_UP, clock: Clock | None = None,
+                 update_publisher: UpdatePublisher | None = None):
+        """
+        Init the fleet simulator
+        simulation_ticks_per_second: how many steps should be ran per second. Every
+            registered LocationService has to use the same value
+        start_on_register: if True the simulation thread is started as soon as the
+            first LocationService gets registered
+        use_vectorized_engine: if True all cars are advanced with numpy array operations
+            by the VectorizedFleetEngine. Requires numpy; without it the scalar
+            simulation of every LocationService is used
+        overrun_policy: what to do with ticks that couldn't be run in time
+        clock: time source of the simulation. Defaults to the wall time; a VirtualClock
+            runs the simulation as fast as possible
+        update_publisher: if set, the update callbacks of the registered LocationServices
+            are called by its emitter thread instead of the simulation thread. It's
+            started and stopped together with the simulation thread
+        """
+        self._simulation_ticks_per_second = simulation_ticks_per_second
+        self._start_on_register = start_on_register
+
+        # The tick loop only reads this tuple. It's replaced on every change so
+        # registering/unregistering (even from a callback) doesn't need a lock
+        # in the loop itself
+        self._location_services: Tuple[LocationService, ...] = ()
+        self._register_mutex: Lock = Lock()
+        # called with the number of the tick after every tick. Copy-on-write like the LocationServices
+        self._tick_listeners: Tuple[Callable[[int], None], ...] = ()
+        self._tick_number: int = 0
+
+        self._stop_event: Event = Event()
+        self._simulation_thread: Thread | None = None
+        self._ticker: DeadlineTicker = DeadlineTicker(simulation_ticks_per_second, overrun_policy, clock=clock)
+        self._update_publisher: UpdatePublisher | None = update_publisher
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._vectorized_engine: VectorizedFleetEngine.VectorizedFleetEngine | None = None
+        if use_vectorized_engine:
+            if VectorizedFleetEngine.is_available():
+                self._vectorized_engine = VectorizedFleetEngine.VectorizedFleetEngine(simulation_ticks_per_second)
+            else:
+                self.logger.error("The vectorized engine was requested but numpy isn't installed. Using the scalar simulation!")
+
+    def __del__(self):
+        if self._simulation_thread is not None:
+            self.stop()
+
+    def register(self, location_service: LocationService) -> bool:
+        """
+        Adds a LocationService to the simulation. It's advanced in every tick
+        from now on.
+        Thread-safe
+        returns: True, if the LocationService was added
+        """
+        if location_service.get_simulation_ticks_per_second() != self._simulation_ticks_per_second:
+            self.logger.error("It was attempted to register a LocationService with %i ticks per second in a FleetSimulator "
+                              "running with %i ticks per second. Ignoring the request!",
+                              location_service.get_simulation_ticks_per_second(), self._simulation_ticks_per_second)
+            return False
+        if location_service.is_running():
+            self.logger.error("It was attempted to register a LocationService that runs its own simulation thread. Ignoring the request!")
+            return False
+
+        with self._register_mutex:
+            if location_service in self._location_services:
+                self.logger.warning("It was attempted to register an already registered LocationService. Ignoring the request!")
+                return False
+            self._location_services = self._location_services + (location_service,)
+            if self._vectorized_engine is not None:
+                self._vectorized_engine.add(location_service)
+            if self._update_publisher is not None:
+                location_service.set_update_publisher(self._update_publisher)
+
+        if self._start_on_register and self._simulation_thread is None:
+            self.start()
+        return True
+
+    def unregister(self, location_service: LocationService) -> bool:
+        """
+        Removes a LocationService from the simulation. It isn't advanced anymore
+        afterwards.
+        Thread-safe
+        returns: True, if the LocationService was registered before
+        """
+        with self._register_mutex:
+            if location_service not in self._location_services:
+                return False
+            self._location_services = tuple(s for s in self._location_services if s is not location_service)
+            if self._vectorized_engine is not None:
+                self._vectorized_engine.remove(location_service)
+            if self._update_publisher is not None:
+                location_service.set_update_publisher(None)
+                self._update_publisher.discard(location_service)
+        return True
+
+    def add_tick_listener(self, listener: Callable[[int], None]):
+        """
+        Adds a listener that's called in the simulation thread after every tick with
+        the number of the tick
+        Thread-safe
+        """
+        with self._register_mutex:
+            self._tick_listeners = self._tick_listeners + (listener,)
+
+    def remove_tick_listener(self, listener: Callable[[int], None]):
+        """
+        Thread-safe
+        """
+        with self._register_mutex:
+            self._tick_listeners = tuple(l for l in self._tick_listeners if l is not listener)
+
+    def get_tick_number(self) -> int:
+        """
+        Get the amount of ticks that were run so far
+        """
+        return self._tick_number
+
+    def get_simulation_ticks_per_second(self) -> int:
+        return self._simulation_ticks_per_second
+
+    def is_vectorized(self) -> bool:
+        """
+        Returns whether the cars are advanced by the VectorizedFleetEngine
+        """
+        return self._vectorized_engine is not None
+
+    def get_update_publisher(self) -> UpdatePublisher | None:
+        return self._update_publisher
+
+    def get_registered_count(self) -> int:
+        return len(self._location_services)
+
+    def _run_tick(self) -> Tuple[float, float]:
+        """
+        Advances every registered LocationService by a single simulation step
+        returns: the time in seconds needed for all steps and for all callbacks
+        """
+        if self._vectorized_engine is not None:
+            return self._vectorized_engine.run_tick()
+        step_time = 0.0
+        callback_time = 0.0
+        for location_service in self._location_services:
+            car_step_time, car_callback_time = location_service._run_tick()
+            step_time += car_step_time
+            callback_time += car_callback_time
+        return (step_time, callback_time)
+
+    def _run_task(self):
+        """
+        Runs the simulation of all cars asynchronously in an own thread
+        """
+        self._ticker.reset()
+        while not self._stop_event.is_set():
+            self._run_due_ticks()
+
+    def _run_due_ticks(self) -> int:
+        """
+        Waits for the next tick and runs all due ticks
+        returns: the amount of ticks that were run
+        """
+        ticks = self._ticker.wait_for_next_tick(self._stop_event)
+        for _ in range(0, ticks):
+            step_time, callback_time = self._run_tick()
+            self._ticker.statistics.record_tick(step_time, callback_time)
+            self._tick_number += 1
+            for listener in self._tick_listeners:
+                listener(self._tick_number)
+        return ticks
+
+    def run_for(self, simulated_seconds: float) -> int:
+        """
+        Runs the ticks for the given time in the calling thread, waiting on the clock
+        between them. With a VirtualClock this runs as fast as the CPU allows.
+        Consecutive calls continue the schedule. Can't be used while the simulation
+        thread is running.
+        returns: the amount of ticks that were run
+        """
+        if self._simulation_thread is not None:
+            self.logger.error("It was attempted to run a FleetSimulator synchronously while its thread is running. Ignoring the request!")
+            return 0
+        target_ticks = round(simulated_seconds * self._simulation_ticks_per_second)
+        self._stop_event.clear()
+        tick_count = 0
+        while tick_count < target_ticks:
+            tick_count += self._run_due_ticks()
+        return tick_count
+
+    def get_tick_statistics(self) -> TickStatistics:
+        return self._ticker.statistics
+
+    def start(self):
+        """
+        Start the thread that's responsible for the simulation
+        """
+        if self._simulation_thread is not None:
+            self.logger.error("It was attempted to start an already running FleetSimulator Thread. Ignoring the request!")
+            return
+        self._stop_event.clear()
+        if self._update_publisher is not None and not self._update_publisher.is_running():
+            self._update_publisher.start()
+        self._simulation_thread = Thread(target=self._run_task, name="fleet_simulation_thread", daemon=True)
+        self._simulation_thread.start()
+
+    def stop(self):
+        """
+        Stops the thread that's responsible for the simulation
+        """
+        if self._simulation_thread is None:
+            self.logger.error("It was attempted to stop an already stopped FleetSimulator Thread. Ignoring the request!")
+            return
+        self._stop_event.set()
+        self._simulation_thread.join()
+        self._simulation_thread = None
+        if self._update_publisher is not None and self._update_publisher.is_running():
+            self._update_publisher.stop()
@@ -0,0 +1,279 @@
+import mmap
+import struct
+import logging
+from typing import Dict, List, NamedTuple, Tuple
+from threading import Lock
+
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.LocationService import LocationService
+
+# Layout of the shared file. All values are little endian.
+# header: magic, version, amount of slots, maximum amount of cars, bytes per car name,
+#   number of the last completely written frame (0: none yet)
+# name table: sequence number, then a zero padded utf-8 name per car index
+# slots: the frames of the ring buffer. A frame is written into slot frame number % slots
+#   and starts with its sequence number, the tick number and the amount of cars, followed
+#   by one record per car
+# The sequence numbers implement a seqlock: they're odd while the writer changes the data
+# after them. A reader copies the data and only uses it, if the sequence number was even
+# and didn't change meanwhile. The sequence number of a complete frame is 2 * frame number
+_MAGIC = b'IAVF'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHHHQ')
+_LATEST_FRAME = struct.Struct('<Q')
+_LATEST_FRAME_OFFSET = _HEADER.size - _LATEST_FRAME.size
+_SEQUENCE = struct.Struct('<Q')
+# sequence number, tick number, amount of cars
+_SLOT_HEADER = struct.Struct('<QQH')
+_SLOT_CONTENT_HEADER = struct.Struct('<QH')
+# car index, piece index, x, y, angle, speed, offset from the center (like in the update data)
+_CAR_RECORD = struct.Struct('<HHddddd')
+_NAME_LENGTH = 32
+# amount of attempts to read data that's changed by the writer at the same time
+_READ_ATTEMPTS = 100
+
+
+class CarState(NamedTuple):
+    index: int
+    piece_index: int
+    x: float
+    y: float
+    angle: float
+    speed: float
+    offset: float
+
+
+class FleetStateFrame(NamedTuple):
+    frame_number: int
+    tick: int
+    cars: List[CarState]
+
+
+def _get_names_offset() -> int:
+    return _HEADER.size
+
+def _get_slots_offset(max_cars: int) -> int:
+    return _get_names_offset() + _SEQUENCE.size + max_cars * _NAME_LENGTH
+
+def _get_slot_size(max_cars: int) -> int:
+    return _SLOT_HEADER.size + max_cars * _CAR_RECORD.size
+
+
+class FleetStateWriter():
+    """
+    Publishes the state of the cars of a FleetSimulator after every tick into a memory mapped
+    file, so local processes (scoreboard, video overlay, analytics) can read it at the full
+    tick rate without Socket.IO. The file holds a ring buffer of the last frames protected
+    by seqlocks, so the simulation never waits for readers. Read it with the FleetStateReader.
+    Thread-safe
+    """
+    def __init__(self, path: str, fleet_simulator: FleetSimulator, slot_count: int = 64, max_cars: int = 64):
+        """
+        path: the shared file. An existing file is replaced. On Linux a file in /dev/shm
+            stays in memory
+        fleet_simulator: FleetSimulator that advances the published cars
+        slot_count: amount of frames kept for readers that can't keep up
+        max_cars: maximum amount of cars that can be published at the same time
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._fleet_simulator: FleetSimulator = fleet_simulator
+        self._slot_count: int = slot_count
+        self._max_cars: int = max_cars
+        self._slots_offset: int = _get_slots_offset(max_cars)
+        self._slot_size: int = _get_slot_size(max_cars)
+        size = self._slots_offset + slot_count * self._slot_size
+        with open(path, 'wb') as shared_file:
+            shared_file.truncate(size)
+        self._file = open(path, 'r+b')
+        self._buffer: mmap.mmap | None = mmap.mmap(self._file.fileno(), size)
+        _HEADER.pack_into(self._buffer, 0, _MAGIC, _VERSION, slot_count, max_cars, _NAME_LENGTH, 0)
+
+        self._mutex: Lock = Lock()
+        self._cars: Tuple[Tuple[int, LocationService], ...] = ()
+        self._names: List[str | None] = [None] * max_cars
+        self._name_sequence: int = 0
+        self._frame_number: int = 0
+
+        fleet_simulator.add_tick_listener(self._on_tick)
+
+    def add_car(self, location_service: LocationService, name: str) -> int:
+        """
+        Starts publishing a car
+        returns: the index of the car in the frames or -1, if all indices are used
+        """
+        with self._mutex:
+            if self._buffer is None:
+                self.logger.error("It was attempted to publish a car with a closed FleetStateWriter. Ignoring the request!")
+                return -1
+            if None not in self._names:
+                self.logger.error("It was attempted to publish more than %i cars. Ignoring the request!", self._max_cars)
+                return -1
+            car_index = self._names.index(None)
+            self._names[car_index] = name
+            self._write_name(car_index, name)
+            self._cars = self._cars + ((car_index, location_service),)
+        return car_index
+
+    def remove_car(self, location_service: LocationService):
+        """
+        Stops publishing a car. Its index can be reused afterwards
+        """
+        with self._mutex:
+            for car_index, published in self._cars:
+                if published is location_service:
+                    self._cars = tuple(car for car in self._cars if car[1] is not location_service)
+                    self._names[car_index] = None
+                    if self._buffer is not None:
+                        self._write_name(car_index, '')
+                    return
+
+    def _write_name(self, car_index: int, name: str):
+        """
+        Not Thread-safe
+        """
+        names_offset = _get_names_offset()
+        self._name_sequence += 1
+        _SEQUENCE.pack_into(self._buffer, names_offset, self._name_sequence)
+        encoded = name.encode('utf-8')[:_NAME_LENGTH]
+        struct.pack_into(f'{_NAME_LENGTH}s', self._buffer, names_offset + _SEQUENCE.size + car_index * _NAME_LENGTH, encoded)
+        self._name_sequence += 1
+        _SEQUENCE.pack_into(self._buffer, names_offset, self._name_sequence)
+
+    def close(self):
+        """
+        Stops publishing and closes the shared file. Readers keep the last frames
+        """
+        self._fleet_simulator.remove_tick_listener(self._on_tick)
+        with self._mutex:
+            self._cars = ()
+            if self._buffer is not None:
+                self._buffer.close()
+                self._buffer = None
+                self._file.close()
+
+    def _on_tick(self, tick: int):
+        # only held briefly by adding and removing cars, so the simulation doesn't wait for it
+        with self._mutex:
+            buffer = self._buffer
+            if buffer is None:
+                return
+            frame = self._frame_number + 1
+            slot_offset = self._slots_offset + (frame % self._slot_count) * self._slot_size
+            _SEQUENCE.pack_into(buffer, slot_offset, 2 * frame - 1)
+            record_offset = slot_offset + _SLOT_HEADER.size
+            for car_index, s in self._cars:
+                # the tick listener runs in the simulation thread, so the state can't change meanwhile
+                _CAR_RECORD.pack_into(buffer, record_offset, car_index, s._current_piece_index, s._current_position.get_x(),
+                                      s._current_position.get_y(), s._stop_direction.get_deg(), s._actual_speed,
+                                      s._actual_offset * s._direction_mult * -1)
+                record_offset += _CAR_RECORD.size
+            _SLOT_CONTENT_HEADER.pack_into(buffer, slot_offset + _SEQUENCE.size, tick, len(self._cars))
+            _SEQUENCE.pack_into(buffer, slot_offset, 2 * frame)
+            _LATEST_FRAME.pack_into(buffer, _LATEST_FRAME_OFFSET, frame)
+            self._frame_number = frame
+
+
+class FleetStateReader():
+    """
+    Reads the frames a FleetStateWriter publishes. Can be used by any local process;
+    it only needs this module.
+    Not Thread-safe
+    """
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._buffer: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._slot_count, self._max_cars, name_length, _ = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC or version != _VERSION or name_length != _NAME_LENGTH:
+            self.close()
+            raise ValueError(f"{path} isn't a fleet state buffer of version {_VERSION}")
+        self._slots_offset: int = _get_slots_offset(self._max_cars)
+        self._slot_size: int = _get_slot_size(self._max_cars)
+        self._last_read_frame: int = 0
+        self.missed_frames: int = 0
+
+    def close(self):
+        self._buffer.close()
+        self._file.close()
+
+    def get_latest_frame_number(self) -> int:
+        """
+        Get the number of the last completely written frame. 0 if there's none yet
+        """
+        return _LATEST_FRAME.unpack_from(self._buffer, _LATEST_FRAME_OFFSET)[0]
+
+    def read_frame(self, frame_number: int) -> FleetStateFrame | None:
+        """
+        Get a frame by its number
+        returns: the frame or None, if it wasn't written yet or was already overwritten
+        """
+        slot_offset = self._slots_offset + (frame_number % self._slot_count) * self._slot_size
+        for _ in range(0, _READ_ATTEMPTS):
+            sequence = _SEQUENCE.unpack_from(self._buffer, slot_offset)[0]
+            if sequence != 2 * frame_number:
+                # odd: the writer is writing the slot right now
+                if sequence == 2 * frame_number - 1:
+                    continue
+                return None
+            data = self._buffer[slot_offset:slot_offset + self._slot_size]
+            if _SEQUENCE.unpack_from(self._buffer, slot_offset)[0] != sequence:
+                continue
+            _, tick, car_count = _SLOT_HEADER.unpack_from(data, 0)
+            cars = [CarState._make(_CAR_RECORD.unpack_from(data, _SLOT_HEADER.size + i * _CAR_RECORD.size))
+                    for i in range(0, car_count)]
+            return FleetStateFrame(frame_number, tick, cars)
+        return None
+
+    def read_latest(self) -> FleetStateFrame | None:
+        """
+        Get the newest frame or None, if nothing was written yet
+        """
+        for _ in range(0, _READ_ATTEMPTS):
+            frame_number = self.get_latest_frame_number()
+            if frame_number == 0:
+                return None
+            frame = self.read_frame(frame_number)
+            if frame is not None:
+                return frame
+        return None
+
+    def read_new_frames(self) -> List[FleetStateFrame]:
+        """
+        Get all frames that were written since the last call. Frames that were already
+        overwritten are counted in missed_frames
+        """
+        latest = self.get_latest_frame_number()
+        frames: List[FleetStateFrame] = []
+        first = max(self._last_read_frame + 1, latest - self._slot_count + 1)
+        self.missed_frames += max(0, first - self._last_read_frame - 1)
+        for frame_number in range(first, latest + 1):
+            frame = self.read_frame(frame_number)
+            if frame is None:
+                self.missed_frames += 1
+            else:
+                frames.append(frame)
+        self._last_read_frame = max(self._last_read_frame, latest)
+        return frames
+
+    def get_car_names(self) -> Dict[int, str]:
+        """
+        Get the names of the published cars by their index
+        """
+        names_offset = _get_names_offset()
+        for _ in range(0, _READ_ATTEMPTS):
+            sequence = _SEQUENCE.unpack_from(self._buffer, names_offset)[0]
+            if sequence % 2 == 1:
+                continue
+            data = self._buffer[names_offset + _SEQUENCE.size:names_offset + _SEQUENCE.size + self._max_cars * _NAME_LENGTH]
+            if _SEQUENCE.unpack_from(self._buffer, names_offset)[0] != sequence:
+                continue
+            names = {}
+            for i in range(0, self._max_cars):
+                name = data[i * _NAME_LENGTH:(i + 1) * _NAME_LENGTH].rstrip(b'\0')
+                if len(name) > 0:
+                    names[i] = name.decode('utf-8', errors='replace')
+            return names
+        return {}
@@ -0,0 +1,88 @@
+import time
+import argparse
+from typing import List
+
+from LocationService.Clock import VirtualClock
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.LocationService import LocationService
+from LocationService.Track import FullTrack
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+
+
+class HeadlessRunner():
+    """
+    Runs the simulation of many virtual cars faster than real time without any UI or
+    vehicles. The cars are advanced by a FleetSimulator on a VirtualClock, so M simulated
+    seconds take only as long as the CPU needs for the ticks. Used for regression tests
+    and capacity planning.
+    Not Thread-safe
+    """
+    def __init__(self, car_count: int, simulation_ticks_per_second: int = 24, use_vectorized_engine: bool = False,
+                 track: FullTrack | None = None):
+        """
+        car_count: amount of simulated cars. They get different speeds and offsets
+        simulation_ticks_per_second: simulated tick rate
+        use_vectorized_engine: advance the cars with the VectorizedFleetEngine (requires numpy)
+        track: track to drive on. Defaults to the same loop the EnvironmentManager uses
+        """
+        self._clock: VirtualClock = VirtualClock()
+        self._fleet_simulator: FleetSimulator = FleetSimulator(simulation_ticks_per_second, start_on_register=False,
+                                                               use_vectorized_engine=use_vectorized_engine, clock=self._clock)
+        if track is None:
+            track = TrackLoader().load()
+        self._update_count: int = 0
+        self._location_services: List[LocationService] = []
+        for i in range(0, car_count):
+            location_service = LocationService(track, self._on_update, simulation_ticks_per_second=simulation_ticks_per_second)
+            location_service.set_speed_percent(50 + i % 50)
+            location_service.set_offset_int(i % 7 - 3)
+            self._fleet_simulator.register(location_service)
+            self._location_services.append(location_service)
+
+    def _on_update(self, pos: Position, angle: Angle, data: dict):
+        self._update_count += 1
+
+    def get_location_services(self) -> List[LocationService]:
+        return self._location_services
+
+    def run(self, simulated_seconds: float) -> dict:
+        """
+        Advances all cars by the given simulated time as fast as possible
+        returns: a report with the amount of ticks, the needed wall time and the
+            reached rate
+        """
+        self._update_count = 0
+        start = time.perf_counter()
+        ticks = self._fleet_simulator.run_for(simulated_seconds)
+        wall_time = time.perf_counter() - start
+        car_count = len(self._location_services)
+        return {
+            'cars': car_count,
+            'simulated_seconds': simulated_seconds,
+            'ticks': ticks,
+            'updates': self._update_count,
+            'wall_time': wall_time,
+            'ticks_per_second': ticks / wall_time if wall_time > 0 else 0,
+            'car_ticks_per_second': ticks * car_count / wall_time if wall_time > 0 else 0,
+            'real_time_factor': simulated_seconds / wall_time if wall_time > 0 else 0
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the simulation of virtual cars faster than real time")
+    parser.add_argument('--cars', type=int, default=10, help="amount of simulated cars")
+    parser.add_argument('--seconds', type=float, default=600, help="simulated time in seconds")
+    parser.add_argument('--ticks-per-second', type=int, default=24, help="simulated tick rate")
+    parser.add_argument('--vectorized', action='store_true', help="use the numpy based VectorizedFleetEngine")
+    args = parser.parse_args()
+
+    runner = HeadlessRunner(args.cars, args.ticks_per_second, args.vectorized)
+    report = runner.run(args.seconds)
+    print(f"Simulated {report['simulated_seconds']} s with {report['cars']} cars in {report['wall_time']:.2f} s: "
+          f"{report['ticks']} ticks, {report['ticks_per_second']:.0f} ticks/s, "
+          f"{report['car_ticks_per_second']:.0f} car ticks/s, {report['real_time_factor']:.1f}x real time")
+
+
+if __name__ == '__main__':
+    main()
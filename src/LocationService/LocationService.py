@@ -1,15 +1,19 @@
 import time
 import math
 import logging
-from typing import Tuple, Callable
+from typing import List, Tuple, Callable
 from threading import Event, Lock, Thread
 
 from LocationService.Trigo import Position, Angle
 from LocationService.Track import FullTrack
+from LocationService.DeadlineTicker import DeadlineTicker, OverrunPolicy, TickStatistics
+from LocationService.Clock import Clock
+from LocationService.UpdatePublisher import UpdatePublisher
 
 
 class LocationService():
-    def __init__(self, track: FullTrack, on_update_callback: Callable[[Position, Angle, dict], None] | None, starting_offset: float = 0, simulation_ticks_per_second: int = 24, start_immeaditly: bool = False):
+    def __init__(self, track: FullTrack, on_update_callback: Callable[[Position, Angle, dict], None] | None, starting_offset: float = 0, simulation_ticks_per_second: int = 24, start_immeaditly: bool = False,
+                 overrun_policy: OverrunPolicy = OverrunPolicy.CATCH_UP, clock: Clock | None = None):
         """
         Init the location service
         track: List of all Track Pieces
@@ -23,8 +27,14 @@ class LocationService():
                 speed: simulated actual speed of the car
                 going_clockwise: true, if the car is going clockwise (assuming a round track)
                 uturn_in_progress: True, if it's currently doing a U-Turn
+        overrun_policy: what the own simulation thread does with ticks that couldn't be run
+            in time. Not used if the LocationService is advanced by a FleetSimulator
+        clock: time source of the own simulation thread. Defaults to the wall time; a
+            VirtualClock runs the simulation as fast as possible
         """
         self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT = 0.30
+        # upper bound for crossed pieces in one step. Only reached if the simulation has a bug
+        self.__MAX_TRANSITIONS_PER_STEP = 10000
         self._simulation_ticks_per_second = simulation_ticks_per_second
 
         # Taken from AnkiController
@@ -46,15 +56,29 @@ class LocationService():
         self._stop_direction: Angle = Angle(90)
 
         self._uturn_override: UTurnOverride | None = None
+        # set while the car is idle (see _is_idle()). Suspended cars aren't simulated and
+        # don't call the update callback until an input wakes them up
+        self._suspended: bool = False
+        self._wake_event: Event = Event()
+        # amount of simulation steps done so far. Used to timestamp inputs deterministically
+        self._step_count: int = 0
+        # called with the step count, the name and the arguments of every input. Used by the SimulationRecorder
+        self._input_listener: Callable[[int, str, tuple], None] | None = None
+        # set every time the target values change. Used by engines that keep their own copy
+        # of the state (like the VectorizedFleetEngine) to only sync changed inputs
+        self._inputs_changed: bool = True
 
         self._track: FullTrack = track
         self._current_piece_index: int = 0
         self._progress_on_current_piece: float = 0
-        first_piece, _ = self._track.get_entry_tupel(0)
+        first_piece, global_track_offset = self._track.get_entry_tupel(0)
         _, self._current_position = first_piece.process_update(0, 0, starting_offset)
+        self._current_position = self._current_position + global_track_offset
+        self._stop_direction = first_piece.get_heading(0, starting_offset)
 
         self._stop_event: Event = Event()
         self._simulation_thread: Thread | None = None
+        self._ticker: DeadlineTicker = DeadlineTicker(simulation_ticks_per_second, overrun_policy, clock=clock)
 
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
@@ -62,6 +86,8 @@ class LocationService():
         self.logger.addHandler(console_handler)
 
         self._on_update_callback: Callable[[Position, Angle, dict], None] | None = on_update_callback
+        # if set, the update callback is called by the emitter thread of the publisher instead
+        self._update_publisher: UpdatePublisher | None = None
 
         if start_immeaditly:
             self.start()
@@ -76,9 +102,11 @@ class LocationService():
         Thread-Safe
         """
         with self._value_mutex:
+            self._notify_input('uturn', ())
             # block a U-Turn in a U-Turn
             if self._uturn_override is None:
                 self._uturn_override = UTurnOverride(self, self._actual_offset > 0)
+                self._wake_up()
 
     def set_speed_percent(self, speed: int, acceleration: int = 1000):
         """
@@ -88,6 +116,7 @@ class LocationService():
         acceleration: used acceleration in mm/s^2
         """
         with self._value_mutex:
+            self._notify_input('speed', (speed, acceleration))
             self._set_speed_mm(self.__MAX_ANKI_SPEED * speed / 100, acceleration)
 
     def _set_speed_mm(self, speed_mm: float, acceleration: int = 1000):
@@ -99,6 +128,8 @@ class LocationService():
         """
         self._target_speed = speed_mm
         self._acceleration = acceleration
+        self._inputs_changed = True
+        self._wake_up()
 
     def set_offset_int(self, offset: int):
         """
@@ -110,9 +141,25 @@ class LocationService():
                 in the AnkiController)
         """
         with self._value_mutex:
+            self._notify_input('offset', (offset,))
             # TODO: This doesn't check for out of bounds driving
             self._set_offset_mm(self.__LANE_OFFSET * offset)
 
+    def set_input_listener(self, listener: Callable[[int, str, tuple], None] | None):
+        """
+        Sets a listener that's called with the step count, the name ('speed', 'offset' or
+        'uturn') and the arguments of every input. The inputs take effect in the step after
+        the given amount of steps. It's called while the values are locked, so it must not
+        call the LocationService itself.
+        Thread-safe
+        """
+        with self._value_mutex:
+            self._input_listener = listener
+
+    def _notify_input(self, name: str, args: tuple):
+        if self._input_listener is not None:
+            self._input_listener(self._step_count, name, args)
+
     def _set_offset_mm(self, offset: float):
         """
         Sets the targeted offset where the car should drive on the track.
@@ -121,6 +168,31 @@ class LocationService():
                 distance to the track center
         """
         self._target_offset = offset * -1 * self._direction_mult
+        self._inputs_changed = True
+        self._wake_up()
+
+    def _wake_up(self):
+        """
+        Resumes the simulation of a suspended car
+        Not Thread-safe
+        """
+        if self._suspended:
+            self._suspended = False
+            self._wake_event.set()
+
+    def _is_idle(self) -> bool:
+        """
+        Returns whether the next steps can't change anything: the car stands, doesn't
+        accelerate and isn't doing a U-Turn. The offset can't change without driving
+        Not Thread-safe
+        """
+        return self._actual_speed == 0 and self._target_speed == 0 and self._uturn_override is None
+
+    def is_suspended(self) -> bool:
+        """
+        Returns whether the car is idle and isn't simulated until the next input
+        """
+        return self._suspended
 
     def _adjust_speed(self):
         """
@@ -192,74 +264,224 @@ class LocationService():
         returns: The new position and the Angle where the car is pointing
         """
         with self._value_mutex:
+            offset = self._actual_offset
             if self._uturn_override is not None:
                 trav_distance = self._uturn_override.override_simulation()
             else:
                 self._adjust_speed()
                 trav_distance = self._adjust_offset(self._actual_speed / self._simulation_ticks_per_second)
-            return self._run_simulation_step(trav_distance * self._direction_mult)
+            pos, rot, _ = self._run_simulation_step(trav_distance * self._direction_mult, self._actual_offset != offset)
+            self._step_count += 1
+            # the update of this step is the last one until an input wakes the car
+            if self._is_idle():
+                self._suspended = True
+            return (pos, rot)
 
-    def _run_simulation_step(self, distance: float) -> Tuple[Position, Angle]:
+    def _run_simulation_step(self, distance: float, offset_changed: bool = True) -> Tuple[Position, Angle, List[Tuple[int, int]]]:
         """
         Advance the simulation one step without threadsafety. Should only be called
-        internally.
+        internally. The car can cross any number of pieces in a single step.
         distance: Distance to travel
-        returns: The new position and the Angle where the car is pointing
+        offset_changed: whether the offset was changed for this step. Otherwise the car points
+            along the lane, so the heading is read from the track piece instead of being
+            calculated from the movement
+        returns: The new position, the Angle where the car is pointing and a list of all
+            crossed piece transitions as tuple of (previous piece index, new piece index)
         """
-        # prevent "maximum recursion depth exceeded" Errors in case the simulation has a bug
-        if self._direction_mult == -1 and distance > 0:
-            self.logger.critical("The leftover distance is positive while driving in opposing direction. This would create a infinite recursion. Breaking the loop to prevent this!")
-            return (self._current_position, self._stop_direction)
-        elif self._direction_mult == 1 and distance < 0:
-            self.logger.critical("The leftover distance is negative while driving in default direction. This would create a infinite recursion. Breaking the loop to prevent this!")
-            return (self._current_position, self._stop_direction)
-
         old_pos = self._current_position
-        piece, global_track_offset = self._track.get_entry_tupel(self._current_piece_index)
-        leftover_distance, new_pos = piece.process_update(self._progress_on_current_piece, distance, self._actual_offset)
-        self._progress_on_current_piece += distance
-        if leftover_distance != 0:
+        travel_distance = distance
+        transitions: List[Tuple[int, int]] = []
+        # bounded loop instead of an endless one, in case the simulation has a bug
+        for _ in range(0, self.__MAX_TRANSITIONS_PER_STEP + 1):
+            if self._direction_mult == -1 and distance > 0:
+                self.logger.critical("The leftover distance is positive while driving in opposing direction. This would create a infinite loop. Breaking the loop to prevent this!")
+                return (self._current_position, self._stop_direction, transitions)
+            elif self._direction_mult == 1 and distance < 0:
+                self.logger.critical("The leftover distance is negative while driving in default direction. This would create a infinite loop. Breaking the loop to prevent this!")
+                return (self._current_position, self._stop_direction, transitions)
+
+            piece, global_track_offset = self._track.get_entry_tupel(self._current_piece_index)
+            # same as TrackPiece.process_update(), but the position is only calculated on the last piece
+            end = self._progress_on_current_piece + distance
+            length = piece.get_length(self._actual_offset)
+            if end >= length:
+                leftover_distance = end - length
+                end = length
+            elif end <= 0:
+                leftover_distance = end
+                end = 0
+            else:
+                leftover_distance = 0
+            self._progress_on_current_piece += distance
+            if leftover_distance == 0:
+                break
+            previous_piece_index = self._current_piece_index
             self._current_piece_index = (self._current_piece_index + self._direction_mult) % self._track.get_len()
+            transitions.append((previous_piece_index, self._current_piece_index))
             if self._direction_mult == 1:
                 self._progress_on_current_piece = 0
             else:
                 new_piece, _ = self._track.get_entry_tupel(self._current_piece_index)
                 self._progress_on_current_piece = new_piece.get_length(self._actual_offset)
-            return self._run_simulation_step(leftover_distance)
-        self._current_position = new_pos + global_track_offset
-        distance = self._current_position.distance_to(old_pos)
-        if distance < 0.1:
-            rot = self._stop_direction
+            distance = leftover_distance
         else:
-            rot = self._current_position.calculate_angle_to(old_pos)
-            self._stop_direction = rot
-        return (self._current_position, rot)
+            self.logger.critical("The car crossed more than %i pieces in a single step. Stopping the step to prevent an endless loop!",
+                                 self.__MAX_TRANSITIONS_PER_STEP)
+            return (self._current_position, self._stop_direction, transitions)
+
+        x, y, heading = piece.get_pose(end, self._actual_offset)
+        self._current_position = Position(x + global_track_offset.get_x(), y + global_track_offset.get_y())
+        if offset_changed:
+            if self._current_position.distance_to(old_pos) >= 0.1:
+                self._stop_direction = self._current_position.calculate_angle_to(old_pos)
+        elif abs(travel_distance) >= 0.1:
+            # the heading of the pieces is the one of the default direction
+            if self._direction_mult == -1:
+                heading = (heading + 180) % 360
+            # on straight pieces the heading doesn't change, so the Angle is kept
+            if heading != self._stop_direction.get_deg():
+                self._stop_direction = Angle(heading)
+        return (self._current_position, self._stop_direction, transitions)
+
+    def _run_tick(self) -> Tuple[float, float]:
+        """
+        Runs a single simulation step and notifies the update callback about
+        the result. This is either called by the own simulation thread or by
+        a FleetSimulator that advances multiple cars at once
+        returns: the time in seconds needed for the step and for the callback
+        """
+        if self._suspended:
+            return (0.0, 0.0)
+        start = time.perf_counter()
+        pos, rot = self._run_simulation_step_threadsafe()
+        step_done = time.perf_counter()
+        self._notify_update(pos, rot)
+        return (step_done - start, time.perf_counter() - step_done)
+
+    def set_update_publisher(self, update_publisher: UpdatePublisher | None):
+        """
+        Sets an UpdatePublisher that calls the update callback in its own thread, so a
+        slow callback doesn't delay the simulation. Without it the callback is called
+        by the simulation thread
+        """
+        self._update_publisher = update_publisher
+
+    def _notify_update(self, pos: Position, rot: Angle):
+        """
+        Calls the update callback with the current simulation state or hands it to
+        the UpdatePublisher
+        """
+        if self._on_update_callback is not None:
+            data: dict = {
+                'offset': self._actual_offset * self._direction_mult * -1,
+                'speed': self._actual_speed,
+                'going_clockwise': self._direction_mult == 1,
+                'uturn_in_progress': self._uturn_override is not None
+            }
+            update_publisher = self._update_publisher
+            if update_publisher is not None:
+                update_publisher.publish(self, pos, rot, data)
+            else:
+                self._on_update_callback(pos, rot, data)
 
     def _run_task(self):
         """
         Runs the simulation asynchronously in an own thread
         """
+        self._ticker.reset()
         while not self._stop_event.is_set():
-            pos, rot = self._run_simulation_step_threadsafe()
-            if self._on_update_callback is not None:
-                data: dict = {
-                    'offset': self._actual_offset * self._direction_mult * -1,
-                    'speed': self._actual_speed,
-                    'going_clockwise': self._direction_mult == 1,
-                    'uturn_in_progress': self._uturn_override is not None
-                }
-                self._on_update_callback(pos, rot, data)
-            time.sleep(1 / self._simulation_ticks_per_second)
+            if self._suspended:
+                self._wake_event.wait()
+                self._wake_event.clear()
+                # don't catch up the time the car was suspended
+                self._ticker.reset()
+                continue
+            ticks = self._ticker.wait_for_next_tick(self._stop_event)
+            for _ in range(0, ticks):
+                step_time, callback_time = self._run_tick()
+                self._ticker.statistics.record_tick(step_time, callback_time)
+
+    def get_tick_statistics(self) -> TickStatistics:
+        """
+        Get the timing statistics of the own simulation thread
+        """
+        return self._ticker.statistics
+
+    def get_position_and_angle(self) -> Tuple[Position, Angle]:
+        """
+        Get the last simulated position and the Angle where the car is pointing
+        Thread-safe
+        """
+        with self._value_mutex:
+            return (self._current_position.clone(), Angle(self._stop_direction.get_deg()))
+
+    def get_track_location(self) -> Tuple[int, float]:
+        """
+        Get the index of the piece the car is on and its progress on it
+        Thread-safe
+        """
+        with self._value_mutex:
+            return (self._current_piece_index, self._progress_on_current_piece)
+
+    def get_track_distance(self) -> float:
+        """
+        Get the distance from the start of the first piece to the car
+        Thread-safe
+        """
+        with self._value_mutex:
+            return self._track.get_distance_for_location(self._current_piece_index, self._progress_on_current_piece,
+                                                         self._actual_offset)
+
+    def get_distance_to(self, other: 'LocationService') -> float:
+        """
+        Get the distance along the track this car has to drive in its current direction
+        to reach the other car. Both cars have to be on the same track; the offset of
+        this car is used for measuring.
+        Thread-safe
+        """
+        other_location = other.get_track_location()
+        with self._value_mutex:
+            own_location = (self._current_piece_index, self._progress_on_current_piece)
+            if self._direction_mult == 1:
+                return self._track.get_distance_between(own_location, other_location, self._actual_offset)
+            return self._track.get_distance_between(other_location, own_location, self._actual_offset)
+
+    def predict_position(self, seconds: float) -> Position:
+        """
+        Get the position the car will have after the given time, if it keeps its
+        current speed and offset
+        Thread-safe
+        """
+        with self._value_mutex:
+            distance = self._track.get_distance_for_location(self._current_piece_index, self._progress_on_current_piece,
+                                                             self._actual_offset)
+            distance += self._actual_speed * seconds * self._direction_mult
+            piece_index, progress = self._track.get_location_for_distance(distance, self._actual_offset)
+            piece, global_track_offset = self._track.get_entry_tupel(piece_index)
+            position = piece.get_position(progress, self._actual_offset)
+            position.add_position(global_track_offset)
+            return position
+
+    def get_simulation_ticks_per_second(self) -> int:
+        return self._simulation_ticks_per_second
+
+    def is_running(self) -> bool:
+        """
+        Returns whether the LocationService runs in its own simulation thread
+        """
+        return self._simulation_thread is not None
 
     def start(self):
         """
-        Start the thread that's responsible for the simulation
+        Start the thread that's responsible for the simulation. Don't use this
+        if the LocationService is registered in a FleetSimulator
         """
         if self._simulation_thread is not None:
             self.logger.error("It was attempted to start an already running LocationService Thread. Ignoring the request!")
             return
         self._stop_event.clear()
-        # TODO: Check if Flask-SocketIO's start_background_task is needed here
+        # with the eventlet server mode threading is monkey patched, so this is a green thread like
+        # the ones of Flask-SocketIO's start_background_task
         self._simulation_thread = Thread(target=self._run_task)
         self._simulation_thread.start()
 
@@ -271,6 +493,7 @@ class LocationService():
             self.logger.error("It was attempted to stop an already stopped LocationService Thread. Ignoring the request!")
             return
         self._stop_event.set()
+        self._wake_event.set()
         self._simulation_thread.join()
         self._simulation_thread = None
 
@@ -303,6 +526,7 @@ class UTurnOverride():
 
         # Point around which the U-Turn will resolve. Generally dx is the length and dy the offset
         self._last_curve_pos: Position = Position(0, self._angle_multiplier)
+        self._step_rotation: Angle = Angle(self._DEGREE_PER_STEP * self._angle_multiplier)
         self._orig_mult = self._location_service._direction_mult
 
     def override_simulation(self) -> float:
@@ -343,12 +567,12 @@ class UTurnOverride():
         Does a single curve step by applying the changed offset and returning the
         travelled distance
         """
-        new_pos = self._last_curve_pos.clone()
-        new_pos.rotate_around_0_0(Angle(self._DEGREE_PER_STEP * self._angle_multiplier))
-        dx = new_pos.get_x() - self._last_curve_pos.get_x()
-        dy = new_pos.get_y() - self._last_curve_pos.get_y()
+        old_x = self._last_curve_pos.get_x()
+        old_y = self._last_curve_pos.get_y()
+        self._last_curve_pos.rotate_around_0_0(self._step_rotation)
+        dx = self._last_curve_pos.get_x() - old_x
+        dy = self._last_curve_pos.get_y() - old_y
 
-        self._last_curve_pos = new_pos
         dx *= self._CIRCLE_RADIUS
         dy *= self._CIRCLE_RADIUS
 
@@ -0,0 +1,298 @@
+import os
+import pickle
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, List, Tuple
+from threading import Lock, Thread
+
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.LocationService import LocationService
+from LocationService.UpdatePublisher import UpdatePublisher
+from LocationService.Trigo import Angle, Position
+
+# Messages are tuples that start with their type. Web process to simulation process:
+# ('add', car id, pickled track or None for the last sent track, state), ('remove', car id),
+# ('input', car id, input name, arguments), ('stop',)
+# Simulation process to web process: ('updates', [(car id, x, y, angle, data), ...])
+
+
+def _get_state(location_service: LocationService) -> tuple:
+    """
+    Not Thread-safe
+    """
+    s = location_service
+    return (s._current_piece_index, s._progress_on_current_piece, s._actual_offset, s._target_offset, s._actual_speed,
+            s._target_speed, s._acceleration, s._direction_mult, s._current_position.get_x(), s._current_position.get_y(),
+            s._stop_direction.get_deg())
+
+
+def _set_state(location_service: LocationService, state: tuple):
+    s = location_service
+    (s._current_piece_index, s._progress_on_current_piece, s._actual_offset, s._target_offset, s._actual_speed,
+     s._target_speed, s._acceleration, s._direction_mult, x, y, deg) = state
+    s._current_position = Position(x, y)
+    s._stop_direction = Angle(deg)
+
+
+def _run_simulation_process(connection: Connection, simulation_ticks_per_second: int, use_vectorized_engine: bool):
+    """
+    Entry point of the simulation process. Simulates the cars sent by the web process
+    with a FleetSimulator until the connection is closed
+    """
+    # a monkey patched (eventlet) web process creates the pipe non-blocking
+    os.set_blocking(connection.fileno(), True)
+    update_publisher = UpdatePublisher()
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second, start_on_register=False,
+                                     use_vectorized_engine=use_vectorized_engine, update_publisher=update_publisher)
+    cars: Dict[int, LocationService] = {}
+    # updates collected by the emitter thread of the publisher until it drained
+    updates: List[tuple] = []
+
+    def on_update(car_id: int, pos: Position, rot: Angle, data: dict):
+        updates.append((car_id, pos.get_x(), pos.get_y(), rot.get_deg(), data))
+
+    def send_updates():
+        if len(updates) == 0:
+            return
+        batch = list(updates)
+        updates.clear()
+        try:
+            connection.send(('updates', batch))
+        except (OSError, EOFError):
+            # the web process is gone. The main loop ends with the closed connection
+            pass
+
+    update_publisher.add_drain_listener(send_updates)
+    fleet_simulator.start()
+    track = None
+    try:
+        while True:
+            message = connection.recv()
+            match message[0]:
+                case 'add':
+                    _, car_id, pickled_track, state = message
+                    if pickled_track is not None:
+                        track = pickle.loads(pickled_track)
+                    location_service = LocationService(track, lambda pos, rot, data, car_id=car_id: on_update(car_id, pos, rot, data),
+                                                       simulation_ticks_per_second=simulation_ticks_per_second)
+                    _set_state(location_service, state)
+                    cars[car_id] = location_service
+                    fleet_simulator.register(location_service)
+                case 'remove':
+                    location_service = cars.pop(message[1], None)
+                    if location_service is not None:
+                        fleet_simulator.unregister(location_service)
+                case 'input':
+                    _, car_id, name, args = message
+                    location_service = cars.get(car_id)
+                    if location_service is None:
+                        continue
+                    match name:
+                        case 'speed':
+                            location_service.set_speed_percent(*args)
+                        case 'offset':
+                            location_service.set_offset_int(*args)
+                        case 'uturn':
+                            location_service.do_uturn()
+                case 'stop':
+                    break
+    except EOFError:
+        pass
+    finally:
+        fleet_simulator.stop()
+
+
+class SimulationProcess():
+    """
+    Runs the simulation of the virtual cars in a separate process, so load in the web
+    process (request handling, Socket.IO fan-out) can't delay the simulation and both
+    sides can use their own core. It's used like a FleetSimulator: registered
+    LocationServices aren't simulated locally but mirrored. Their inputs are sent to the
+    simulation process over a local pipe (a Unix socket on Linux) and its updates are
+    written back into them before their update callbacks are called in a receiver thread.
+    The mirrors only get the position, the angle and the values of the update data.
+    Thread-safe
+    """
+    def __init__(self, simulation_ticks_per_second: int = 24, use_vectorized_engine: bool = False):
+        """
+        simulation_ticks_per_second: how many steps should be ran per second in the simulation process
+        use_vectorized_engine: use the VectorizedFleetEngine in the simulation process (requires numpy)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._simulation_ticks_per_second: int = simulation_ticks_per_second
+        self._use_vectorized_engine: bool = use_vectorized_engine
+        self._send_mutex: Lock = Lock()
+        self._register_mutex: Lock = Lock()
+        # copy-on-write like in the FleetSimulator, so the receiver thread doesn't need a lock
+        self._cars: Dict[int, LocationService] = {}
+        self._car_ids: Dict[LocationService, int] = {}
+        self._next_car_id: int = 0
+        self._last_sent_track: bytes | None = None
+        self._tick_listeners: Tuple[Callable[[int], None], ...] = ()
+        self._tick_number: int = 0
+
+        self._connection: Connection | None = None
+        self._process = None
+        self._receiver_thread: Thread | None = None
+
+    def start(self):
+        """
+        Starts the simulation process and the thread that receives its updates
+        """
+        if self._process is not None:
+            self.logger.error("It was attempted to start an already running SimulationProcess. Ignoring the request!")
+            return
+        # spawn instead of fork, since the web process already runs threads
+        context = multiprocessing.get_context('spawn')
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=_run_simulation_process, name="simulation_process", daemon=True,
+                                        args=(child_connection, self._simulation_ticks_per_second, self._use_vectorized_engine))
+        self._process.start()
+        child_connection.close()
+        self._last_sent_track = None
+        self._receiver_thread = Thread(target=self._run_receiver, name="simulation_receiver_thread", daemon=True)
+        self._receiver_thread.start()
+
+    def stop(self):
+        """
+        Stops the simulation process
+        """
+        if self._process is None:
+            self.logger.error("It was attempted to stop an already stopped SimulationProcess. Ignoring the request!")
+            return
+        self._send(('stop',))
+        self._process.join()
+        self._connection.close()
+        self._receiver_thread.join()
+        self._process = None
+        self._receiver_thread = None
+
+    def is_running(self) -> bool:
+        return self._process is not None
+
+    def _send(self, message: tuple):
+        with self._send_mutex:
+            try:
+                self._connection.send(message)
+            except (OSError, EOFError):
+                self.logger.error("The simulation process isn't reachable. Dropping the message %s!", message[0])
+
+    def register(self, location_service: LocationService) -> bool:
+        """
+        Starts simulating a LocationService in the simulation process with its current state.
+        It mustn't be simulated locally anymore
+        Thread-safe
+        returns: True, if the LocationService was added
+        """
+        if self._process is None:
+            self.logger.error("It was attempted to register a LocationService in a stopped SimulationProcess. Ignoring the request!")
+            return False
+        if location_service.get_simulation_ticks_per_second() != self._simulation_ticks_per_second:
+            self.logger.error("It was attempted to register a LocationService with %i ticks per second in a SimulationProcess "
+                              "running with %i ticks per second. Ignoring the request!",
+                              location_service.get_simulation_ticks_per_second(), self._simulation_ticks_per_second)
+            return False
+        with self._register_mutex:
+            if location_service in self._car_ids:
+                self.logger.warning("It was attempted to register an already registered LocationService. Ignoring the request!")
+                return False
+            car_id = self._next_car_id
+            self._next_car_id += 1
+            # the track is only sent, if it differs from the last one
+            pickled_track = pickle.dumps(location_service._track)
+            if pickled_track == self._last_sent_track:
+                pickled_track = None
+            else:
+                self._last_sent_track = pickled_track
+            with location_service._value_mutex:
+                state = _get_state(location_service)
+                location_service._input_listener = lambda step, name, args: self._send(('input', car_id, name, args))
+                # sent while the inputs are locked, so no input can overtake it
+                self._send(('add', car_id, pickled_track, state))
+            self._car_ids = {**self._car_ids, location_service: car_id}
+            self._cars = {**self._cars, car_id: location_service}
+        return True
+
+    def unregister(self, location_service: LocationService) -> bool:
+        """
+        Stops simulating a LocationService
+        Thread-safe
+        returns: True, if the LocationService was registered before
+        """
+        with self._register_mutex:
+            car_id = self._car_ids.get(location_service)
+            if car_id is None:
+                return False
+            location_service.set_input_listener(None)
+            self._car_ids = {s: i for s, i in self._car_ids.items() if i != car_id}
+            self._cars = {i: s for i, s in self._cars.items() if i != car_id}
+            self._send(('remove', car_id))
+        return True
+
+    def _run_receiver(self):
+        """
+        Writes the updates of the simulation process into the mirrored LocationServices
+        and calls their update callbacks
+        """
+        while True:
+            try:
+                message = self._connection.recv()
+            except (OSError, EOFError):
+                return
+            if message[0] != 'updates':
+                continue
+            cars = self._cars
+            for car_id, x, y, deg, data in message[1]:
+                location_service = cars.get(car_id)
+                if location_service is None:
+                    continue
+                with location_service._value_mutex:
+                    pos = Position(x, y)
+                    rot = Angle(deg)
+                    location_service._current_position = pos
+                    location_service._stop_direction = rot
+                    location_service._actual_speed = data['speed']
+                    if not data['uturn_in_progress']:
+                        location_service._uturn_override = None
+                if location_service._on_update_callback is not None:
+                    location_service._on_update_callback(pos.clone(), Angle(deg), data)
+            self._tick_number += 1
+            for listener in self._tick_listeners:
+                listener(self._tick_number)
+
+    def add_tick_listener(self, listener: Callable[[int], None]):
+        """
+        Adds a listener that's called in the receiver thread after the updates of a tick
+        were handled
+        Thread-safe
+        """
+        with self._register_mutex:
+            self._tick_listeners = self._tick_listeners + (listener,)
+
+    def remove_tick_listener(self, listener: Callable[[int], None]):
+        with self._register_mutex:
+            self._tick_listeners = tuple(l for l in self._tick_listeners if l is not listener)
+
+    def get_tick_number(self) -> int:
+        """
+        Get the amount of received update batches
+        """
+        return self._tick_number
+
+    def get_update_publisher(self) -> UpdatePublisher | None:
+        # the receiver thread already decouples the callbacks from the simulation
+        return None
+
+    def get_simulation_ticks_per_second(self) -> int:
+        return self._simulation_ticks_per_second
+
+    def is_vectorized(self) -> bool:
+        return self._use_vectorized_engine
+
+    def get_registered_count(self) -> int:
+        return len(self._cars)
@@ -0,0 +1,277 @@
+import time
+import struct
+import logging
+from typing import BinaryIO, Deque, Dict, Tuple
+from collections import deque
+from threading import Lock
+
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.LocationService import LocationService
+from LocationService.Track import FullTrack
+from LocationService.Trigo import Angle, Position
+
+# The log starts with a header followed by records. Every record starts with its type.
+# All values are little endian; floats are stored as doubles so the state can be
+# compared bit by bit.
+_MAGIC = b'IAVR'
+_VERSION = 1
+# magic, version, simulation ticks per second, vectorized engine used
+_HEADER = struct.Struct('<4sHHB')
+# car index, tick number, step count, piece, progress, actual offset, target offset,
+# actual speed, target speed, acceleration, direction, x, y, stop direction
+_CAR_ADDED = struct.Struct('<HIIHddddddbddd')
+# car index, tick number
+_CAR_REMOVED = struct.Struct('<HI')
+# car index, step count, seconds since the start of the recording, input, 2 arguments
+_INPUT = struct.Struct('<HIdBdd')
+# car index, tick number, step count, piece, progress, actual offset, actual speed,
+# direction, x, y, stop direction
+_STATE = struct.Struct('<HIIHdddbddd')
+
+_RECORD_CAR_ADDED = b'C'
+_RECORD_CAR_REMOVED = b'R'
+_RECORD_INPUT = b'I'
+_RECORD_STATE = b'S'
+
+_INPUT_CODES: Dict[str, int] = {'speed': 0, 'offset': 1, 'uturn': 2}
+_INPUT_NAMES: Dict[int, str] = {code: name for name, code in _INPUT_CODES.items()}
+
+
+def _pack_state(car_index: int, tick: int, location_service: LocationService) -> bytes:
+    s = location_service
+    return _STATE.pack(car_index, tick, s._step_count, s._current_piece_index, s._progress_on_current_piece,
+                       s._actual_offset, s._actual_speed, s._direction_mult, s._current_position.get_x(),
+                       s._current_position.get_y(), s._stop_direction.get_deg())
+
+
+class SimulationRecorder():
+    """
+    Records the inputs and the state after every tick of the cars simulated by a
+    FleetSimulator into a compact append-only binary log. The inputs are
+    timestamped with the step of the car they take effect in, so the
+    SimulationReplayer can re-drive the simulation bit-identically.
+    Thread-safe
+    """
+    def __init__(self, path: str, fleet_simulator: FleetSimulator, state_interval: int = 1):
+        """
+        path: file the log is written to. An existing file is replaced
+        fleet_simulator: FleetSimulator that advances the recorded cars
+        state_interval: the state is recorded every state_interval ticks. Higher values
+            make the log smaller but the replay can only compare at these ticks
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._fleet_simulator: FleetSimulator = fleet_simulator
+        self._state_interval: int = state_interval
+        self._flush_interval: int = fleet_simulator.get_simulation_ticks_per_second()
+        self._start_time: float = time.monotonic()
+        self._file_mutex: Lock = Lock()
+        self._file: BinaryIO | None = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, fleet_simulator.get_simulation_ticks_per_second(),
+                                      fleet_simulator.is_vectorized()))
+        # copy-on-write, so the tick listener doesn't need a lock
+        self._cars: Tuple[Tuple[int, LocationService], ...] = ()
+        self._next_car_index: int = 0
+
+        if fleet_simulator.is_vectorized():
+            self.logger.warning("The recorded FleetSimulator uses the vectorized engine. The replay uses the scalar "
+                                "simulation, so it won't be bit-identical!")
+        fleet_simulator.add_tick_listener(self._on_tick)
+
+    def add_car(self, location_service: LocationService) -> int:
+        """
+        Starts recording a car. Its current state is recorded as starting point
+        returns: the index of the car in the log
+        """
+        if location_service._uturn_override is not None:
+            self.logger.error("It was attempted to record a car during a U-Turn. Ignoring the request!")
+            return -1
+        # same lock order as the inputs: first the car, then the file
+        with location_service._value_mutex, self._file_mutex:
+            if self._file is None:
+                self.logger.error("It was attempted to record a car with a closed recorder. Ignoring the request!")
+                return -1
+            car_index = self._next_car_index
+            self._next_car_index += 1
+            s = location_service
+            self._write(_RECORD_CAR_ADDED, _CAR_ADDED.pack(
+                car_index, self._fleet_simulator.get_tick_number(), s._step_count, s._current_piece_index,
+                s._progress_on_current_piece, s._actual_offset, s._target_offset, s._actual_speed, s._target_speed,
+                s._acceleration, s._direction_mult, s._current_position.get_x(), s._current_position.get_y(),
+                s._stop_direction.get_deg()))
+            s._input_listener = lambda step, name, args: self._on_input(car_index, step, name, args)
+            self._cars = self._cars + ((car_index, location_service),)
+        return car_index
+
+    def remove_car(self, location_service: LocationService):
+        """
+        Stops recording a car
+        """
+        location_service.set_input_listener(None)
+        with self._file_mutex:
+            for car_index, recorded in self._cars:
+                if recorded is location_service:
+                    if self._file is not None:
+                        self._write(_RECORD_CAR_REMOVED, _CAR_REMOVED.pack(car_index, self._fleet_simulator.get_tick_number()))
+                    self._cars = tuple(car for car in self._cars if car[1] is not location_service)
+                    return
+
+    def close(self):
+        """
+        Stops the recording and closes the log
+        """
+        self._fleet_simulator.remove_tick_listener(self._on_tick)
+        for _, location_service in self._cars:
+            location_service.set_input_listener(None)
+        with self._file_mutex:
+            self._cars = ()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, record_type: bytes, data: bytes):
+        """
+        Not Thread-safe
+        """
+        self._file.write(record_type)
+        self._file.write(data)
+
+    def _on_input(self, car_index: int, step: int, name: str, args: tuple):
+        values = list(args) + [0.0] * (2 - len(args))
+        with self._file_mutex:
+            if self._file is None:
+                return
+            self._write(_RECORD_INPUT, _INPUT.pack(car_index, step, time.monotonic() - self._start_time,
+                                                   _INPUT_CODES[name], values[0], values[1]))
+
+    def _on_tick(self, tick: int):
+        record_state = tick % self._state_interval == 0
+        with self._file_mutex:
+            if self._file is None:
+                return
+            if record_state:
+                for car_index, location_service in self._cars:
+                    self._write(_RECORD_STATE, _pack_state(car_index, tick, location_service))
+            if tick % self._flush_interval == 0:
+                self._file.flush()
+
+
+class SimulationReplayer():
+    """
+    Re-drives the cars of a log written by the SimulationRecorder headless and
+    compares their state with the recorded one bit by bit.
+    Not Thread-safe
+    """
+    def __init__(self, path: str, track: FullTrack):
+        """
+        path: log written by the SimulationRecorder
+        track: the track the recorded cars were driving on
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._path: str = path
+        self._track: FullTrack = track
+
+    def replay(self) -> dict:
+        """
+        Replays the whole log
+        returns: a summary with the amount of replayed cars and compared states, the
+            amount of mismatches and the (tick, car index) of the first mismatch or None
+        """
+        with open(self._path, 'rb') as log_file:
+            data = log_file.read()
+        magic, version, ticks_per_second, vectorized = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{self._path} isn't a simulation log of version {_VERSION}")
+
+        cars: Dict[int, LocationService] = {}
+        # inputs that weren't applied yet per car as (step, name, arguments)
+        pending_inputs: Dict[int, Deque[Tuple[int, str, tuple]]] = {}
+        compared_states = 0
+        mismatches = 0
+        first_mismatch: Tuple[int, int] | None = None
+        last_tick = 0
+        index = _HEADER.size
+        while index < len(data):
+            record_type = data[index:index + 1]
+            index += 1
+            if record_type == _RECORD_CAR_ADDED:
+                values = _CAR_ADDED.unpack_from(data, index)
+                index += _CAR_ADDED.size
+                cars[values[0]] = self._create_car(values, ticks_per_second)
+                pending_inputs[values[0]] = deque()
+            elif record_type == _RECORD_CAR_REMOVED:
+                car_index, _ = _CAR_REMOVED.unpack_from(data, index)
+                index += _CAR_REMOVED.size
+                cars.pop(car_index, None)
+            elif record_type == _RECORD_INPUT:
+                car_index, step, _, code, first_value, second_value = _INPUT.unpack_from(data, index)
+                index += _INPUT.size
+                name = _INPUT_NAMES[code]
+                args = {'speed': (first_value, second_value), 'offset': (first_value,), 'uturn': ()}[name]
+                pending_inputs[car_index].append((step, name, args))
+            elif record_type == _RECORD_STATE:
+                recorded = data[index:index + _STATE.size]
+                car_index, tick, step = struct.unpack_from('<HII', recorded, 0)
+                index += _STATE.size
+                last_tick = tick
+                location_service = cars[car_index]
+                self._advance_to_step(location_service, pending_inputs[car_index], step)
+                compared_states += 1
+                if _pack_state(car_index, tick, location_service) != recorded:
+                    mismatches += 1
+                    if first_mismatch is None:
+                        first_mismatch = (tick, car_index)
+                        self.logger.warning("The replayed state of car %i differs from the recording at tick %i", car_index, tick)
+            else:
+                raise ValueError(f"Unknown record type {record_type} at byte {index - 1} of {self._path}")
+
+        if vectorized:
+            self.logger.warning("The log was recorded with the vectorized engine. The scalar replay isn't bit-identical to it")
+        return {
+            'cars': len(pending_inputs),
+            'ticks': last_tick,
+            'compared_states': compared_states,
+            'mismatches': mismatches,
+            'first_mismatch': first_mismatch
+        }
+
+    def _create_car(self, values: tuple, ticks_per_second: int) -> LocationService:
+        (_, _, step, piece, progress, actual_offset, target_offset, actual_speed, target_speed, acceleration, direction,
+         x, y, stop_deg) = values
+        location_service = LocationService(self._track, None, simulation_ticks_per_second=ticks_per_second)
+        location_service._step_count = step
+        location_service._current_piece_index = piece
+        location_service._progress_on_current_piece = progress
+        location_service._actual_offset = actual_offset
+        location_service._target_offset = target_offset
+        location_service._actual_speed = actual_speed
+        location_service._target_speed = target_speed
+        location_service._acceleration = acceleration
+        location_service._direction_mult = direction
+        location_service._current_position = Position(x, y)
+        location_service._stop_direction = Angle(stop_deg)
+        return location_service
+
+    def _advance_to_step(self, location_service: LocationService, inputs: Deque[Tuple[int, str, tuple]], step: int):
+        """
+        Runs the steps of a car up to the given step count and applies the inputs
+        right before the step they took effect in
+        """
+        while location_service._step_count < step:
+            while len(inputs) > 0 and inputs[0][0] <= location_service._step_count:
+                _, name, args = inputs.popleft()
+                match name:
+                    case 'speed':
+                        location_service.set_speed_percent(*args)
+                    case 'offset':
+                        location_service.set_offset_int(*args)
+                    case 'uturn':
+                        location_service.do_uturn()
+            location_service._run_simulation_step_threadsafe()
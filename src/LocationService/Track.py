@@ -1,4 +1,7 @@
+import json
+import hashlib
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
 from typing import List, Tuple
 
 from LocationService.Trigo import Position, Angle
@@ -31,8 +34,15 @@ class TrackPiece(ABC):
     """
     def __init__(self, rotation_deg: int):
         self._rotation = Angle(rotation_deg)
+        # Position/heading tables sampled by progress. The outer list is the lane offset
+        # and the inner one the progress. They are None until precompute_lookup_tables() is called
+        self._lane_offsets: List[float] | None = None
+        self._table_x: List[List[float]] | None = None
+        self._table_y: List[List[float]] | None = None
+        self._table_tangent_x: List[List[float]] | None = None
+        self._table_tangent_y: List[List[float]] | None = None
+        self._table_heading: List[List[float]] | None = None
 
-    @abstractmethod
     def process_update(self, start_progress: float, distance: float, offset: float) -> Tuple[float, Position]:
         """
         Drive a distance on the piece. Returns a tupe with the leftover distance that can be used on the next piece
@@ -40,8 +50,218 @@ class TrackPiece(ABC):
         (which should be ignored, if there is a leftover distance).
         To drive in the opposing direction start at the end (by getting the length) and then providing a negative distance.
         """
+        end = start_progress + distance
+        left = 0
+        travel_len = self.get_length(offset)
+        # handle the car driving more than the piece is long
+        if end >= travel_len:
+            left = end - travel_len
+            end = travel_len
+        elif end <= 0:
+            left = end
+            end = 0
+        return (left, self.get_position(end, offset))
+
+    @abstractmethod
+    def _calculate_local_position(self, progress: float, offset: float) -> Tuple[float, float]:
+        """
+        Calculate the position for a progress on the piece at a given offset relativ to the
+        center of the track piece, but without applying the rotation of the piece
+        """
         raise NotImplementedError
 
+    def _calculate_position(self, progress: float, offset: float) -> Position:
+        """
+        Calculate the position relativ to the center of the track piece for a progress
+        on the piece at a given offset
+        """
+        x, y = self._calculate_local_position(progress, offset)
+        position = Position(x, y)
+        position.rotate_around_0_0(self._rotation)
+        return position
+
+    def precompute_lookup_tables(self, lane_offsets: List[float], samples: int):
+        """
+        Precomputes position and heading tables for the given (ascending, equally spaced)
+        lane offsets with the given amount of samples along the progress. Afterwards
+        positions are interpolated from the tables instead of being calculated.
+        The positions are interpolated with cubic hermite splines along the progress, so
+        the tables also contain the tangent at every sample (scaled to the sample
+        distance). Between the lanes the interpolation is linear since the position
+        at the same share of progress is linear in the offset for all pieces.
+        """
+        # distance used for the numerical derivative. The local functions are defined
+        # slightly outside the piece as well, so the central difference is used everywhere
+        epsilon = 0.001
+        tables_x: List[List[float]] = []
+        tables_y: List[List[float]] = []
+        tables_tangent_x: List[List[float]] = []
+        tables_tangent_y: List[List[float]] = []
+        tables_heading: List[List[float]] = []
+        for offset in lane_offsets:
+            length = self.get_length(offset)
+            sample_distance = length / (samples - 1)
+            xs: List[float] = []
+            ys: List[float] = []
+            tangents_x: List[float] = []
+            tangents_y: List[float] = []
+            headings: List[float] = []
+            for i in range(0, samples):
+                progress = sample_distance * i
+                position = self._calculate_position(progress, offset)
+                behind = self._calculate_position(progress - epsilon, offset)
+                ahead = self._calculate_position(progress + epsilon, offset)
+                xs.append(position.get_x())
+                ys.append(position.get_y())
+                tangents_x.append((ahead.get_x() - behind.get_x()) / (2 * epsilon) * sample_distance)
+                tangents_y.append((ahead.get_y() - behind.get_y()) / (2 * epsilon) * sample_distance)
+                # same definition as used by the LocationService: the angle from the new to the old position
+                headings.append(ahead.calculate_angle_to(behind).get_deg())
+            tables_x.append(xs)
+            tables_y.append(ys)
+            tables_tangent_x.append(tangents_x)
+            tables_tangent_y.append(tangents_y)
+            tables_heading.append(headings)
+        self.set_lookup_tables(lane_offsets, {
+            'x': tables_x,
+            'y': tables_y,
+            'tangent_x': tables_tangent_x,
+            'tangent_y': tables_tangent_y,
+            'heading': tables_heading
+        })
+
+    def get_lookup_tables(self) -> dict | None:
+        """
+        Get the precomputed tables as plain lists (e.g. to store them), or None if they
+        weren't precomputed
+        """
+        if self._table_x is None:
+            return None
+        return {
+            'x': self._table_x,
+            'y': self._table_y,
+            'tangent_x': self._table_tangent_x,
+            'tangent_y': self._table_tangent_y,
+            'heading': self._table_heading
+        }
+
+    def set_lookup_tables(self, lane_offsets: List[float], tables: dict):
+        """
+        Uses tables computed by precompute_lookup_tables() for the same lane offsets
+        raises: ValueError, if the tables don't have a row of equally many samples per lane offset
+        """
+        names = ('x', 'y', 'tangent_x', 'tangent_y', 'heading')
+        if len(lane_offsets) < 2 or any(len(tables.get(name, ())) != len(lane_offsets) for name in names):
+            raise ValueError("The lookup tables don't match the lane offsets")
+        samples = len(tables['x'][0])
+        if samples < 2 or any(len(row) != samples for name in names for row in tables[name]):
+            raise ValueError("The lookup tables don't have the same amount of samples for every lane")
+        self._lane_offsets = list(lane_offsets)
+        self._first_lane_offset = lane_offsets[0]
+        self._lanes_per_mm = 1 / (lane_offsets[1] - lane_offsets[0])
+        self._last_lane_index = len(lane_offsets) - 1
+        self._last_sample = samples - 1
+        self._table_x = [[float(v) for v in row] for row in tables['x']]
+        self._table_y = [[float(v) for v in row] for row in tables['y']]
+        self._table_tangent_x = [[float(v) for v in row] for row in tables['tangent_x']]
+        self._table_tangent_y = [[float(v) for v in row] for row in tables['tangent_y']]
+        self._table_heading = [[float(v) for v in row] for row in tables['heading']]
+
+    def share_lookup_tables(self, piece: 'TrackPiece'):
+        """
+        Uses the tables of another piece with the same geometry (the same TrackPieceType)
+        instead of own copies. The tables are only read after they were set, so they can be shared
+        """
+        self._lane_offsets = piece._lane_offsets
+        self._first_lane_offset = piece._first_lane_offset
+        self._lanes_per_mm = piece._lanes_per_mm
+        self._last_lane_index = piece._last_lane_index
+        self._last_sample = piece._last_sample
+        self._table_x = piece._table_x
+        self._table_y = piece._table_y
+        self._table_tangent_x = piece._table_tangent_x
+        self._table_tangent_y = piece._table_tangent_y
+        self._table_heading = piece._table_heading
+
+    def get_position(self, progress: float, offset: float) -> Position:
+        """
+        Get the position relativ to the center of the track piece for a progress on the
+        piece at a given offset. Uses the lookup tables, if they were precomputed
+        """
+        x, y, _ = self.get_pose(progress, offset)
+        return Position(x, y)
+
+    def get_pose(self, progress: float, offset: float) -> Tuple[float, float, float]:
+        """
+        Get the position relativ to the center of the track piece and the heading in degrees
+        (like get_heading()) for a progress on the piece at a given offset. It's called in
+        every simulation step, so it returns plain floats and looks up the tables only once
+        """
+        if self._table_x is None:
+            position = self._calculate_position(progress, offset)
+            return (position.get_x(), position.get_y(), self.get_heading(progress, offset).get_deg())
+        # indices of the lower sample and lane and the interpolation factors. Offsets outside of the
+        # lanes are extrapolated
+        sample = progress / self.get_length(offset) * self._last_sample
+        i = int(sample)
+        if i >= self._last_sample:
+            i = self._last_sample - 1
+        elif i < 0:
+            i = 0
+        t = sample - i
+        lane = (offset - self._first_lane_offset) * self._lanes_per_mm
+        lane_index = int(lane)
+        if lane_index > self._last_lane_index - 1:
+            lane_index = self._last_lane_index - 1
+        elif lane_index < 0:
+            lane_index = 0
+        lane_factor = lane - lane_index
+        # the heading is the same for all lanes at the same share of progress, so the nearest lane is used
+        headings = self._table_heading[lane_index + 1 if lane_factor > 0.5 else lane_index]
+        heading = headings[i]
+        diff = headings[i + 1] - heading
+        # don't interpolate the long way around the circle
+        if diff > 180:
+            diff -= 360
+        elif diff < -180:
+            diff += 360
+        heading = (heading + t * diff) % 360
+        # hermite basis functions. h00 is expressed as 1 - h01 by using a + h01 * (b - a), so
+        # values that are equal in the table (like the x of a vertical piece) stay exactly the same
+        t2 = t * t
+        t3 = t2 * t
+        h01 = 3 * t2 - 2 * t3
+        h10 = t3 - 2 * t2 + t
+        h11 = t3 - t2
+        xs = self._table_x[lane_index]
+        ys = self._table_y[lane_index]
+        txs = self._table_tangent_x[lane_index]
+        tys = self._table_tangent_y[lane_index]
+        x = xs[i] + h01 * (xs[i + 1] - xs[i]) + h10 * txs[i] + h11 * txs[i + 1]
+        y = ys[i] + h01 * (ys[i + 1] - ys[i]) + h10 * tys[i] + h11 * tys[i + 1]
+        # most of the time cars are driving exactly on a lane
+        if lane_factor == 0:
+            return (x, y, heading)
+        lane_index += 1
+        xs = self._table_x[lane_index]
+        ys = self._table_y[lane_index]
+        txs = self._table_tangent_x[lane_index]
+        tys = self._table_tangent_y[lane_index]
+        x2 = xs[i] + h01 * (xs[i + 1] - xs[i]) + h10 * txs[i] + h11 * txs[i + 1]
+        y2 = ys[i] + h01 * (ys[i + 1] - ys[i]) + h10 * tys[i] + h11 * tys[i + 1]
+        return (x + lane_factor * (x2 - x), y + lane_factor * (y2 - y), heading)
+
+    def get_heading(self, progress: float, offset: float) -> Angle:
+        """
+        Get the direction in which a car is pointing at the given progress and offset
+        when it's driving in the default direction
+        """
+        if self._table_heading is None:
+            ahead = self._calculate_position(progress + 0.001, offset)
+            behind = self._calculate_position(progress - 0.001, offset)
+            return ahead.calculate_angle_to(behind)
+        return Angle(self.get_pose(progress, offset)[2])
+
     @abstractmethod
     def get_used_space_horiz(self):
         raise NotImplementedError
@@ -90,8 +310,14 @@ class FullTrack():
     """
     Class that represents an entire track. The upper left corner of the upper left
     track piece is at the coordinate 0, 0. All units are in mm.
+    The track isn't changed after it was built, so one instance can be shared by all cars.
     """
-    def __init__(self, pieces: list[TrackPiece]):
+    def __init__(self, pieces: list[TrackPiece], lane_offsets: List[float] | None = None):
+        """
+        pieces: the pieces of the track in driving order
+        lane_offsets: offsets the arc-length index is built for in ascending order.
+            Lengths at other offsets are interpolated between them
+        """
         self.track_entries: list[TrackEntry] = list()
         cur_y = 0
         cur_x = 0
@@ -123,6 +349,90 @@ class FullTrack():
         diff_y = -min_y + max_used_vert / 2
         for entry in self.track_entries:
             entry.get_global_offset().add_offset(diff_x, diff_y)
+        self._build_arc_length_index(lane_offsets if lane_offsets is not None else [0.0])
+        # serialized lazily once, since the track doesn't change
+        self._json: str | None = None
+        self._etag: str | None = None
+
+    def _build_arc_length_index(self, lane_offsets: List[float]):
+        """
+        Builds the cumulative length of the track for every lane offset, so
+        distances along the track can be mapped to pieces by binary search. The
+        entry i is the distance from the start of the first piece to the start
+        of piece i; the last entry is the length of the whole track.
+        """
+        self._lane_offsets: List[float] = list(lane_offsets)
+        self._cumulative_lengths: List[List[float]] = []
+        for lane_offset in self._lane_offsets:
+            cumulative = [0.0]
+            for entry in self.track_entries:
+                cumulative.append(cumulative[-1] + entry.get_piece().get_length(lane_offset))
+            self._cumulative_lengths.append(cumulative)
+
+    def _get_lane_weights(self, offset: float) -> Tuple[List[float], List[float], float]:
+        """
+        Get the cumulative lengths of the lanes around the offset and the weight of
+        the second one. The lengths of all pieces are linear in the offset, so the
+        (extrapolated) interpolation is exact.
+        """
+        if len(self._lane_offsets) == 1:
+            return (self._cumulative_lengths[0], self._cumulative_lengths[0], 0)
+        lane = bisect_left(self._lane_offsets, offset) - 1
+        lane = min(max(lane, 0), len(self._lane_offsets) - 2)
+        first_offset = self._lane_offsets[lane]
+        weight = (offset - first_offset) / (self._lane_offsets[lane + 1] - first_offset)
+        return (self._cumulative_lengths[lane], self._cumulative_lengths[lane + 1], weight)
+
+    def get_track_length(self, offset: float) -> float:
+        """
+        Get the length of one lap at a given offset
+        """
+        first, second, weight = self._get_lane_weights(offset)
+        return first[-1] + weight * (second[-1] - first[-1])
+
+    def get_distance_for_location(self, piece_index: int, progress: float, offset: float) -> float:
+        """
+        Get the distance from the start of the first piece to the progress on a piece
+        """
+        first, second, weight = self._get_lane_weights(offset)
+        return first[piece_index] + weight * (second[piece_index] - first[piece_index]) + progress
+
+    def get_location_for_distance(self, distance: float, offset: float) -> Tuple[int, float]:
+        """
+        Get the piece and the progress on it for a distance from the start of the
+        first piece. Distances outside of a lap are wrapped around.
+        O(log n) with n pieces
+        returns: the index of the piece and the progress on it
+        """
+        first, second, weight = self._get_lane_weights(offset)
+        track_length = first[-1] + weight * (second[-1] - first[-1])
+        distance %= track_length
+        index = bisect_right(range(0, len(first)), distance,
+                             key=lambda i: first[i] + weight * (second[i] - first[i])) - 1
+        index = min(index, len(self.track_entries) - 1)
+        piece_start = first[index] + weight * (second[index] - first[index])
+        return (index, distance - piece_start)
+
+    def get_distance_between(self, from_location: Tuple[int, float], to_location: Tuple[int, float], offset: float) -> float:
+        """
+        Get the distance along the track from one location to another one in the
+        default driving direction. Both locations are tuples of (piece index, progress)
+        returns: the distance in the range [0, track length)
+        """
+        from_distance = self.get_distance_for_location(from_location[0], from_location[1], offset)
+        to_distance = self.get_distance_for_location(to_location[0], to_location[1], offset)
+        return (to_distance - from_distance) % self.get_track_length(offset)
+
+    def get_size(self) -> Tuple[float, float]:
+        """
+        Get the width and the height of the track. The track starts at 0, 0, so these are
+        also the largest coordinates of a position on it
+        """
+        width = max(entry.get_global_offset().get_x() + entry.get_piece().get_used_space_horiz() / 2
+                    for entry in self.track_entries)
+        height = max(entry.get_global_offset().get_y() + entry.get_piece().get_used_space_vert() / 2
+                     for entry in self.track_entries)
+        return (width, height)
 
     def get_entry_tupel(self, num: int) -> Tuple[TrackPiece, Position]:
         entry = self.track_entries[num]
@@ -142,3 +452,19 @@ class FullTrack():
             })
 
         return l
+
+    def get_as_json(self) -> str:
+        """
+        Get get_as_list() as JSON. It's only serialized on the first call
+        """
+        if self._json is None:
+            self._json = json.dumps(self.get_as_list(), separators=(',', ':'))
+        return self._json
+
+    def get_etag(self) -> str:
+        """
+        Get a hash of the serialized track, e.g. for HTTP caching
+        """
+        if self._etag is None:
+            self._etag = hashlib.sha256(self.get_as_json().encode('utf-8')).hexdigest()[:32]
+        return self._etag
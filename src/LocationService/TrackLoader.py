@@ -0,0 +1,195 @@
+import os
+import json
+import stat
+import hashlib
+import logging
+from typing import List, Tuple
+
+from LocationService.Track import FullTrack, TrackPieceType
+from LocationService.TrackPieces import TrackBuilder
+
+# Increase, if the geometry that's computed when building a track changes, so old cache
+# files aren't used anymore
+TRACK_CACHE_VERSION = 3
+
+DEFAULT_TRACK_FILE = os.path.join(os.path.dirname(__file__), 'tracks', 'default_loop.json')
+
+# grid cell that's reached by leaving a piece in a direction (the y axis points south)
+_DIRECTION_STEPS = {
+    'N': (0, -1),
+    'E': (1, 0),
+    'S': (0, 1),
+    'W': (-1, 0)
+}
+_OPPOSITE_DIRECTIONS = {'N': 'S', 'E': 'W', 'S': 'N', 'W': 'E'}
+
+
+def get_default_track_cache_dir() -> str:
+    """
+    Get the cache directory of the current user ($XDG_CACHE_HOME or ~/.cache)
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'iav_distortion', 'tracks')
+
+
+def parse_track_definition(text: str) -> List[TrackPieceType]:
+    """
+    Parses a track definition. It's a JSON list with the names of the TrackPieceTypes in
+    driving order, e.g. ["STRAIGHT_WE", "CURVE_WS", ...], or an object with that list in
+    "pieces" and optionally further information like {"name": "Loop", "pieces": [...]}
+    raises: ValueError, if the definition is malformed or contains unknown pieces
+    """
+    try:
+        definition = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"The track definition isn't valid JSON: {e}")
+    if isinstance(definition, dict):
+        definition = definition.get('pieces')
+    if not isinstance(definition, list):
+        raise ValueError("The track definition has to be a list of pieces or an object with a list of pieces")
+    pieces: List[TrackPieceType] = []
+    for i, name in enumerate(definition):
+        if not isinstance(name, str) or name not in TrackPieceType.__members__:
+            raise ValueError(f"Piece {i} of the track definition is unknown: {name}")
+        pieces.append(TrackPieceType[name])
+    return pieces
+
+
+def _get_entry_and_exit(piece: TrackPieceType) -> Tuple[str, str]:
+    # the names end with the side a car enters the piece from and the side it leaves it to
+    sides = piece.name.split('_')[1]
+    return (sides[0], sides[1])
+
+
+def validate_track_closure(pieces: List[TrackPieceType]) -> None:
+    """
+    Checks that every piece leaves to the side the next one is entered from and that the
+    last piece leads back into the first one. All pieces have the same size, so they're
+    placed on a grid
+    raises: ValueError, if the track isn't a closed loop
+    """
+    if len(pieces) == 0:
+        raise ValueError("The track has no pieces")
+    x, y = (0, 0)
+    for i, piece in enumerate(pieces):
+        _, exit_side = _get_entry_and_exit(piece)
+        next_piece = pieces[(i + 1) % len(pieces)]
+        next_entry, _ = _get_entry_and_exit(next_piece)
+        if next_entry != _OPPOSITE_DIRECTIONS[exit_side]:
+            raise ValueError(f"Piece {i} ({piece.name}) leaves to {exit_side}, but piece {(i + 1) % len(pieces)} "
+                             f"({next_piece.name}) is entered from {next_entry}")
+        step_x, step_y = _DIRECTION_STEPS[exit_side]
+        x += step_x
+        y += step_y
+    if (x, y) != (0, 0):
+        raise ValueError(f"The last piece ends {x} pieces east and {y} pieces south of the first one")
+
+
+class TrackLoader():
+    """
+    Loads tracks from track definition files. The track is validated and compiled with the
+    TrackBuilder, which precomputes the piece offsets and the lookup tables. The lookup
+    tables (the expensive part) of every piece type are cached as JSON on disk keyed by the
+    hash of the file, so large layouts are only compiled once. The cache only contains data;
+    nothing in it is executed. It's still only used in a directory of the current user that others
+    can't write to.
+    Thread-safe
+    """
+    def __init__(self, cache_dir: str | None = None):
+        """
+        cache_dir: directory for the compiled tracks, e.g. get_default_track_cache_dir().
+            It's created with mode 0700. None disables the cache
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._cache_dir: str | None = cache_dir
+
+    def load(self, path: str = DEFAULT_TRACK_FILE) -> FullTrack:
+        """
+        Loads a track definition file
+        raises: OSError, if the file can't be read. ValueError, if it isn't a valid closed track
+        """
+        with open(path, 'rb') as definition_file:
+            content = definition_file.read()
+        cache_path = self._get_cache_path(content)
+        pieces = parse_track_definition(content.decode('utf-8'))
+        validate_track_closure(pieces)
+        builder = TrackBuilder()
+        for piece in pieces:
+            builder.append(piece)
+        if cache_path is not None:
+            track = self._read_cache(cache_path, builder)
+            if track is not None:
+                return track
+        track = builder.build()
+        if cache_path is not None:
+            self._write_cache(cache_path, builder, track)
+        return track
+
+    def _get_cache_path(self, content: bytes) -> str | None:
+        if self._cache_dir is None or not self._prepare_cache_dir():
+            return None
+        file_hash = hashlib.sha256(content).hexdigest()
+        return os.path.join(self._cache_dir, f'track_{file_hash}_v{TRACK_CACHE_VERSION}.json')
+
+    def _prepare_cache_dir(self) -> bool:
+        """
+        Creates the cache directory only accessible by the current user
+        returns: True, if the directory belongs to the current user and others can't write to it
+        """
+        try:
+            os.makedirs(self._cache_dir, mode=0o700, exist_ok=True)
+            info = os.stat(self._cache_dir)
+        except OSError as e:
+            self.logger.warning("The track cache directory %s can't be created (%s). Not caching the track.",
+                                self._cache_dir, e)
+            return False
+        if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+            self.logger.warning("The track cache directory %s belongs to another user. Not caching the track.",
+                                self._cache_dir)
+            return False
+        if stat.S_IMODE(info.st_mode) != 0o700:
+            # an own directory that existed before (or was created under another umask)
+            try:
+                os.chmod(self._cache_dir, 0o700)
+            except OSError as e:
+                self.logger.warning("The access to the track cache directory %s can't be restricted (%s). "
+                                    "Not caching the track.", self._cache_dir, e)
+                return False
+        return True
+
+    def _read_cache(self, cache_path: str, builder: TrackBuilder) -> FullTrack | None:
+        """
+        Builds the track of the builder with the cached lookup tables
+        returns: the track or None, if there's no usable cache file
+        """
+        try:
+            with open(cache_path, 'r') as cache_file:
+                cached = json.load(cache_file)
+            if cached['lane_offsets'] != builder.get_lane_offsets():
+                raise ValueError("the lane offsets changed")
+            return builder.build(cached['lookup_tables'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, KeyError, IndexError) as e:
+            self.logger.warning("The cached track %s can't be used (%s). Compiling the track again.", cache_path, e)
+            return None
+
+    def _write_cache(self, cache_path: str, builder: TrackBuilder, track: FullTrack):
+        cached = {
+            'lane_offsets': builder.get_lane_offsets(),
+            # the pieces of a type share their tables, so every type is only stored once
+            'lookup_tables': {piece_type.name: track.get_entry_tupel(i)[0].get_lookup_tables()
+                              for i, piece_type in enumerate(builder.piece_types)}
+        }
+        # written to a temporary file first, so other processes never read a partial file
+        temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary_path, 'w') as cache_file:
+                json.dump(cached, cache_file)
+            os.replace(temporary_path, cache_path)
+        except OSError as e:
+            self.logger.warning("The compiled track can't be cached in %s: %s", cache_path, e)
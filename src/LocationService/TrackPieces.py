@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 import math
 
 from LocationService.Track import Direction, FullTrack, TrackPiece, TrackPieceType
@@ -17,6 +17,12 @@ class StraightPiece(TrackPiece):
 
         self._length = length
         self._diameter = diameter
+        # straight pieces are calculated directly instead of interpolating the lookup tables,
+        # since that's faster. The heading is the same on the whole piece
+        self._rotation_sin: float = self._rotation.get_sin()
+        self._rotation_cos: float = self._rotation.get_cos()
+        self._heading_deg: float = self._calculate_position(0.001, 0).calculate_angle_to(
+            self._calculate_position(-0.001, 0)).get_deg()
 
     def get_used_space_vert(self):
         return self._vert_length
@@ -36,21 +42,16 @@ class StraightPiece(TrackPiece):
                 return Direction.WEST
         raise NotImplementedError
 
-    def process_update(self, start_progress: float, distance: float, offset: float) -> Tuple[float, Position]:
-        end = start_progress + distance
-        left = 0
-        # handle the car driving more than the piece is long
-        if end >= self._length:
-            left = end - self._length
-            end = self._length
-        elif end <= 0:
-            left = end
-            end = 0
+    def _calculate_local_position(self, progress: float, offset: float) -> Tuple[float, float]:
+        return (-offset, self._length / 2 - progress)
 
-        endposition = Position(-offset, self._length / 2 - end)
-        endposition.rotate_around_0_0(self._rotation)
+    def get_pose(self, progress: float, offset: float) -> Tuple[float, float, float]:
+        y = self._length / 2 - progress
+        return (-offset * self._rotation_cos - y * self._rotation_sin, -offset * self._rotation_sin + y * self._rotation_cos,
+                self._heading_deg)
 
-        return (left, endposition)
+    def get_heading(self, progress: float, offset: float) -> Angle:
+        return Angle(self._heading_deg)
 
     def get_length(self, offset: float) -> float:
         return self._length
@@ -128,28 +129,16 @@ class CurvedPiece(TrackPiece):
                     return Direction.EAST
         raise NotImplementedError
 
-    def process_update(self, start_progress: float, distance: float, offset: float):
-        end = start_progress + distance
-        left = 0
-        travel_len = self.get_length(offset)
-        # handle the car driving more than the piece is long
-        if end >= travel_len:
-            left = end - travel_len
-            end = travel_len
-        elif end <= 0:
-            left = end
-            end = 0
-        progress = end / travel_len
-        angle = Angle(progress * 90)
+    def _calculate_local_position(self, progress: float, offset: float) -> Tuple[float, float]:
+        angle = Angle(progress / self.get_length(offset) * 90)
         if self._is_mirrored:
             offset *= -1
         distance_to_middle = self._radius + offset
-        position = Position(distance_to_middle * angle.get_x_mult(), distance_to_middle * angle.get_y_mult())
-        position.add_offset(-self._size / 2, -self._size / 2)
+        x = distance_to_middle * angle.get_x_mult() - self._size / 2
+        y = distance_to_middle * angle.get_y_mult() - self._size / 2
         if self._is_mirrored:
-            position = Position(position.get_y() * -1, position.get_x() * -1)
-        position.rotate_around_0_0(self._rotation)
-        return (left, position)
+            return (y * -1, x * -1)
+        return (x, y)
 
     def get_length(self, offset: float) -> float:
         if self._is_mirrored:
@@ -188,6 +177,7 @@ class TrackBuilder():
     """
     def __init__(self):
         self.piece_list: List[TrackPiece] = [] 
+        self.piece_types: List[TrackPieceType] = []
         # Constants
         self.STRAIGHT_PIECE_LENGTH = 559
         self.PIECE_DIAMETER = 184
@@ -195,13 +185,48 @@ class TrackBuilder():
         # would need extra calculations to do the transition onto the piece; since every
         # piece we have fulfills this requirement the case isn't handled
         self.CURVE_PIECE_SIZE = self.STRAIGHT_PIECE_LENGTH
+        # Lanes the cars can drive on (like in the AnkiController). The lookup tables of
+        # the pieces are sampled for these offsets and interpolated in between
+        self.LANE_OFFSET = 22.25
+        self.LANE_COUNT = 7
+        self.LOOKUP_TABLE_SAMPLES = 65
 
     def append(self, track_piece: TrackPieceType):
         self.piece_list.append(self._get_track_piece(track_piece))
+        self.piece_types.append(track_piece)
         return self
 
-    def build(self) -> FullTrack:
-        return FullTrack(self.piece_list)
+    def build(self, lookup_tables: Dict[str, dict] | None = None) -> FullTrack:
+        """
+        The lookup tables only depend on the type of a piece, so they are computed once per
+        TrackPieceType and shared by all pieces of that type.
+        lookup_tables: tables (TrackPiece.get_lookup_tables()) by the name of the TrackPieceType
+            of an earlier build with the same lane offsets. They're used instead of computing them again
+        raises: ValueError, if the given tables don't fit the pieces
+        """
+        lane_offsets = self.get_lane_offsets()
+        # first piece of every type, which holds the tables of the type
+        table_pieces: Dict[TrackPieceType, TrackPiece] = {}
+        for piece_type, piece in zip(self.piece_types, self.piece_list):
+            table_piece = table_pieces.get(piece_type)
+            if table_piece is not None:
+                piece.share_lookup_tables(table_piece)
+                continue
+            if lookup_tables is None:
+                piece.precompute_lookup_tables(lane_offsets, self.LOOKUP_TABLE_SAMPLES)
+            elif piece_type.name not in lookup_tables:
+                raise ValueError(f"There are no lookup tables for {piece_type.name}")
+            else:
+                piece.set_lookup_tables(lane_offsets, lookup_tables[piece_type.name])
+            table_pieces[piece_type] = piece
+        return FullTrack(self.piece_list, lane_offsets)
+
+    def get_lane_offsets(self) -> List[float]:
+        """
+        Get the offsets of all lanes in ascending order
+        """
+        middle = self.LANE_COUNT // 2
+        return [(i - middle) * self.LANE_OFFSET for i in range(0, self.LANE_COUNT)]
 
     # This isn't the best way but it works for now
     def _get_track_piece(self, track_piece_type: TrackPieceType) -> TrackPiece:
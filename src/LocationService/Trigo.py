@@ -3,16 +3,30 @@ from typing import Dict, Tuple
 
 class Angle():
     """
-    Generic class for angles where 0° means the Angle is pointing up/north
+    Generic class for angles where 0° means the Angle is pointing up/north.
+    The sine and cosine are calculated lazily once per set angle
     """
+    __slots__ = ('_angle_degree', '_sin', '_cos')
+
     def __init__(self, degree = 0.0):
         self._angle_degree = degree
+        self._sin: float | None = None
+        self._cos: float | None = None
+
+    def _calculate_trig(self):
+        rad = math.radians(self._angle_degree)
+        self._sin = math.sin(rad)
+        self._cos = math.cos(rad)
 
-    def get_sin(self):
-        return math.sin(math.radians(self._angle_degree))
+    def get_sin(self) -> float:
+        if self._sin is None:
+            self._calculate_trig()
+        return self._sin
 
-    def get_cos(self):
-        return math.cos(math.radians(self._angle_degree))
+    def get_cos(self) -> float:
+        if self._cos is None:
+            self._calculate_trig()
+        return self._cos
 
     def get_x_mult(self):
         return self.get_cos()
@@ -22,6 +36,8 @@ class Angle():
 
     def set_deg(self, degree):
         self._angle_degree = degree
+        self._sin = None
+        self._cos = None
 
     def get_deg(self):
         return self._angle_degree
@@ -30,14 +46,17 @@ class Angle():
         return f"{round(self._angle_degree)}"
 
     def get_as_x_y(self) -> Tuple[float, float]:
-        deg = self._angle_degree - 90
-        return (math.cos(math.radians(deg)), math.sin(math.radians(deg)))
+        # rotating by -90° turns (cos, sin) into (sin, -cos)
+        return (self.get_sin(), -self.get_cos())
 
 
 class Position():
     """
-    Generic Position in a 2 dimensional space
+    Generic Position in a 2 dimensional space. The methods that don't return a
+    new Position change the Position in place
     """
+    __slots__ = ('_x', '_y')
+
     def __init__(self, x = 0.0, y = 0.0):
         self._x = x
         self._y = y
@@ -48,6 +67,14 @@ class Position():
     def set_y(self, y):
         self._y = y
 
+    def set_x_y(self, x, y):
+        self._x = x
+        self._y = y
+
+    def copy_from(self, other):
+        self._x = other._x
+        self._y = other._y
+
     def add_offset_with_angle(self, change, angle):
         self._x += angle.get_x_mult() * change
         self._y += angle.get_y_mult() * change
@@ -68,16 +95,32 @@ class Position():
         comb_y = self._y - other._y
         return Position(comb_x, comb_y)
 
+    def add_position(self, other):
+        """
+        In place variant of +
+        """
+        self._x += other._x
+        self._y += other._y
+
+    def subtract_position(self, other):
+        """
+        In place variant of -
+        """
+        self._x -= other._x
+        self._y -= other._y
+
     def add_offset(self, x, y):
         self._x += x
         self._y += y
-    
+
     def get_as_dict(self):
         return {'x' : self._x, 'y' : self._y }
 
     def rotate_around_0_0(self, rotation: Angle):
-        new_x = self._x * rotation.get_cos() - self._y * rotation.get_sin()
-        new_y = self._x * rotation.get_sin() + self._y * rotation.get_cos()
+        sin = rotation.get_sin()
+        cos = rotation.get_cos()
+        new_x = self._x * cos - self._y * sin
+        new_y = self._x * sin + self._y * cos
         self._x = new_x
         self._y = new_y
 
@@ -85,18 +128,16 @@ class Position():
         return f"({round(self._x)}, {round(self._y)})"
 
     def calculate_angle_to(self, other) -> Angle:
-        pos = other - self
         # yes atan2 takes y first and x second!
         # the - 0.5 * math.pi is here because atan2 defines pointing right as 0 degree
-        rad = math.atan2(pos.get_y(), pos.get_x()) - 0.5 * math.pi
+        rad = math.atan2(other._y - self._y, other._x - self._x) - 0.5 * math.pi
         if rad < 0:
             rad += 2 * math.pi
         deg = math.degrees(rad)
         return Angle(deg)
-    
+
     def distance_to(self, other) -> float:
-        in_sqrt = math.pow(self.get_x() - other.get_x(), 2) + math.pow(self.get_y() - other.get_y(), 2)
-        return math.sqrt(in_sqrt)
+        return math.hypot(self._x - other._x, self._y - other._y)
 
     def clone(self):
         return Position(self._x, self._y)
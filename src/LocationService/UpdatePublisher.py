@@ -0,0 +1,136 @@
+import logging
+from typing import Callable, Dict, Tuple
+from threading import Condition, Thread
+
+from LocationService.Trigo import Angle, Position
+
+
+class UpdatePublisher():
+    """
+    Decouples the update callbacks of LocationServices from the simulation thread.
+    The simulation only stores a copy of the update in a slot per car and an own
+    emitter thread calls the callbacks. If the emitter is slower than the simulation
+    (e.g. because of a slow Socket.IO emit), the newest update of a car replaces the
+    older one that wasn't sent yet, so at most one update per car is waiting.
+    Thread-safe
+    """
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        # latest update of every car that wasn't sent yet
+        self._pending: Dict[object, Tuple[Position, Angle, dict]] = {}
+        self._condition: Condition = Condition()
+        # called in the emitter thread after all waiting updates were sent. Copy-on-write
+        self._drain_listeners: Tuple[Callable[[], None], ...] = ()
+        self._stopping: bool = False
+        self._emitter_thread: Thread | None = None
+
+        self._published_count: int = 0
+        self._delivered_count: int = 0
+        self._coalesced_count: int = 0
+        self._dropped_count: int = 0
+
+    def publish(self, location_service, pos: Position, rot: Angle, data: dict):
+        """
+        Stores an update of a LocationService for the emitter thread. An update of the same
+        LocationService that wasn't sent yet is replaced. The Position and Angle are copied,
+        so the simulation can keep changing them.
+        """
+        update = (pos.clone(), Angle(rot.get_deg()), data)
+        with self._condition:
+            self._published_count += 1
+            if location_service in self._pending:
+                self._coalesced_count += 1
+            self._pending[location_service] = update
+            self._condition.notify()
+
+    def discard(self, location_service):
+        """
+        Drops the waiting update of a LocationService, e.g. because it was removed
+        """
+        with self._condition:
+            if self._pending.pop(location_service, None) is not None:
+                self._dropped_count += 1
+
+    def add_drain_listener(self, listener: Callable[[], None]):
+        """
+        Adds a listener that's called in the emitter thread every time all waiting updates
+        were sent
+        """
+        with self._condition:
+            self._drain_listeners = self._drain_listeners + (listener,)
+
+    def remove_drain_listener(self, listener: Callable[[], None]):
+        with self._condition:
+            self._drain_listeners = tuple(l for l in self._drain_listeners if l is not listener)
+
+    def get_statistics(self) -> dict:
+        """
+        Get the amount of published and delivered updates, how many were replaced by a newer
+        update of the same car before they were sent and how many were dropped otherwise
+        """
+        with self._condition:
+            return {
+                'published': self._published_count,
+                'delivered': self._delivered_count,
+                'coalesced': self._coalesced_count,
+                'dropped': self._dropped_count
+            }
+
+    def is_running(self) -> bool:
+        return self._emitter_thread is not None
+
+    def _run_task(self):
+        """
+        Sends the waiting updates in an own thread
+        """
+        while True:
+            with self._condition:
+                while len(self._pending) == 0 and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                pending = self._pending
+                self._pending = {}
+            for location_service, (pos, rot, data) in pending.items():
+                callback = location_service._on_update_callback
+                if callback is None:
+                    continue
+                try:
+                    callback(pos, rot, data)
+                except Exception:
+                    self.logger.exception("An update callback failed. Continuing with the next update")
+            with self._condition:
+                self._delivered_count += len(pending)
+            for listener in self._drain_listeners:
+                listener()
+
+    def start(self):
+        """
+        Start the emitter thread
+        """
+        if self._emitter_thread is not None:
+            self.logger.error("It was attempted to start an already running UpdatePublisher Thread. Ignoring the request!")
+            return
+        self._stopping = False
+        self._emitter_thread = Thread(target=self._run_task, name="update_publisher_thread", daemon=True)
+        self._emitter_thread.start()
+
+    def stop(self):
+        """
+        Stops the emitter thread. Updates that weren't sent yet are dropped
+        """
+        if self._emitter_thread is None:
+            self.logger.error("It was attempted to stop an already stopped UpdatePublisher Thread. Ignoring the request!")
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._emitter_thread.join()
+        self._emitter_thread = None
+        with self._condition:
+            self._dropped_count += len(self._pending)
+            self._pending = {}
@@ -0,0 +1,367 @@
+import math
+import time
+import logging
+from typing import Dict, List, Tuple
+from threading import RLock
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional. Without it the FleetSimulator uses the scalar simulation
+    np = None
+
+from LocationService.LocationService import LocationService
+from LocationService.Track import FullTrack
+from LocationService.TrackPieces import CurvedPiece, StraightPiece
+from LocationService.Trigo import Position, Angle
+
+
+def is_available() -> bool:
+    """
+    Returns whether the vectorized engine can be used (numpy is installed)
+    """
+    return np is not None
+
+
+class _TrackGeometry():
+    """
+    Geometry of all pieces of a FullTrack as struct of arrays, so that the piece
+    data for every car can be looked up with a single indexing operation
+    """
+    def __init__(self, track: FullTrack):
+        self.piece_count: int = track.get_len()
+        is_curve = []
+        base_length = []
+        length_slope = []
+        radius = []
+        half_size = []
+        mirror_mult = []
+        rot_cos = []
+        rot_sin = []
+        offset_x = []
+        offset_y = []
+        straight_heading_deg = []
+        for i in range(0, self.piece_count):
+            piece, global_offset = track.get_entry_tupel(i)
+            if isinstance(piece, CurvedPiece):
+                mult = -1 if piece._is_mirrored else 1
+                is_curve.append(True)
+                # get_length(offset) is (radius + mult * offset) * pi / 2
+                base_length.append(piece._radius * math.pi / 2)
+                length_slope.append(mult * math.pi / 2)
+                radius.append(piece._radius)
+                half_size.append(piece._size / 2)
+                mirror_mult.append(mult)
+                straight_heading_deg.append(0)
+            elif isinstance(piece, StraightPiece):
+                is_curve.append(False)
+                base_length.append(piece._length)
+                length_slope.append(0)
+                radius.append(0)
+                half_size.append(0)
+                mirror_mult.append(1)
+                straight_heading_deg.append(piece.get_heading(0, 0).get_deg())
+            else:
+                raise NotImplementedError(f"The vectorized engine doesn't support pieces of type {type(piece)}")
+            rot_cos.append(piece._rotation.get_cos())
+            rot_sin.append(piece._rotation.get_sin())
+            offset_x.append(global_offset.get_x())
+            offset_y.append(global_offset.get_y())
+
+        self.is_curve = np.array(is_curve, dtype=bool)
+        self.base_length = np.array(base_length, dtype=np.float64)
+        self.length_slope = np.array(length_slope, dtype=np.float64)
+        self.radius = np.array(radius, dtype=np.float64)
+        self.half_size = np.array(half_size, dtype=np.float64)
+        self.is_mirrored = np.array(mirror_mult, dtype=np.float64) < 0
+        self.mirror_mult = np.array(mirror_mult, dtype=np.float64)
+        self.rot_cos = np.array(rot_cos, dtype=np.float64)
+        self.rot_sin = np.array(rot_sin, dtype=np.float64)
+        self.offset_x = np.array(offset_x, dtype=np.float64)
+        self.offset_y = np.array(offset_y, dtype=np.float64)
+        self.straight_heading_deg = np.array(straight_heading_deg, dtype=np.float64)
+
+    def get_length(self, piece, offset):
+        return self.base_length[piece] + self.length_slope[piece] * offset
+
+
+class _FleetBuffers():
+    """
+    Struct of arrays with the simulation state of all cars that drive on the
+    same track
+    """
+    _FIELDS = ['actual_speed', 'target_speed', 'acceleration', 'actual_offset', 'target_offset',
+               'direction', 'piece', 'progress', 'pos_x', 'pos_y', 'stop_deg']
+
+    def __init__(self, track: FullTrack):
+        self.geometry = _TrackGeometry(track)
+        self.location_services: List[LocationService] = []
+        self.actual_speed = np.zeros(0, dtype=np.float64)
+        self.target_speed = np.zeros(0, dtype=np.float64)
+        self.acceleration = np.zeros(0, dtype=np.float64)
+        self.actual_offset = np.zeros(0, dtype=np.float64)
+        self.target_offset = np.zeros(0, dtype=np.float64)
+        self.direction = np.zeros(0, dtype=np.int64)
+        self.piece = np.zeros(0, dtype=np.int64)
+        self.progress = np.zeros(0, dtype=np.float64)
+        self.pos_x = np.zeros(0, dtype=np.float64)
+        self.pos_y = np.zeros(0, dtype=np.float64)
+        self.stop_deg = np.zeros(0, dtype=np.float64)
+
+    def add(self, location_service: LocationService):
+        self.location_services.append(location_service)
+        for field in self._FIELDS:
+            setattr(self, field, np.append(getattr(self, field), 0).astype(getattr(self, field).dtype))
+        self.pull_from_service(len(self.location_services) - 1)
+
+    def remove(self, location_service: LocationService):
+        index = self.location_services.index(location_service)
+        del self.location_services[index]
+        for field in self._FIELDS:
+            setattr(self, field, np.delete(getattr(self, field), index))
+
+    def pull_from_service(self, i: int):
+        """
+        Copies the complete state of a LocationService into the buffers
+        """
+        s = self.location_services[i]
+        with s._value_mutex:
+            self.actual_speed[i] = s._actual_speed
+            self.target_speed[i] = s._target_speed
+            self.acceleration[i] = s._acceleration
+            self.actual_offset[i] = s._actual_offset
+            self.target_offset[i] = s._target_offset
+            self.direction[i] = s._direction_mult
+            self.piece[i] = s._current_piece_index
+            self.progress[i] = s._progress_on_current_piece
+            self.pos_x[i] = s._current_position.get_x()
+            self.pos_y[i] = s._current_position.get_y()
+            self.stop_deg[i] = s._stop_direction.get_deg()
+            s._inputs_changed = False
+
+
+class VectorizedFleetEngine():
+    """
+    Alternative to LocationService._run_simulation_step that advances all cars
+    of a fleet with numpy array operations. The LocationServices stay the
+    owner of the inputs (target speed, offset, U-Turns) and get the results
+    written back every tick, so callbacks and setters work unchanged. Cars
+    that are doing a U-Turn are simulated with the scalar implementation.
+    """
+    def __init__(self, simulation_ticks_per_second: int):
+        if np is None:
+            raise RuntimeError("The VectorizedFleetEngine requires numpy to be installed")
+        self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT = 0.30
+        self._simulation_ticks_per_second = simulation_ticks_per_second
+
+        # cars are grouped by the track object they are driving on
+        self._buffers: Dict[int, _FleetBuffers] = {}
+        self._mutex: RLock = RLock()
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+    def add(self, location_service: LocationService):
+        """
+        Add a LocationService to the engine.
+        Thread-safe
+        """
+        with self._mutex:
+            key = id(location_service._track)
+            buffers = self._buffers.get(key)
+            if buffers is None:
+                buffers = _FleetBuffers(location_service._track)
+                self._buffers[key] = buffers
+            buffers.add(location_service)
+
+    def remove(self, location_service: LocationService):
+        """
+        Remove a LocationService from the engine. The LocationService keeps
+        the state of the last tick.
+        Thread-safe
+        """
+        with self._mutex:
+            key = id(location_service._track)
+            buffers = self._buffers.get(key)
+            if buffers is None or location_service not in buffers.location_services:
+                return
+            buffers.remove(location_service)
+            if len(buffers.location_services) == 0:
+                del self._buffers[key]
+
+    def run_tick(self) -> Tuple[float, float]:
+        """
+        Advances all cars by a single simulation step and calls their update callbacks
+        Thread-safe
+        returns: the time in seconds needed for the steps and for the callbacks
+        """
+        step_time = 0.0
+        callback_time = 0.0
+        with self._mutex:
+            for buffers in list(self._buffers.values()):
+                group_step_time, group_callback_time = self._run_tick_for(buffers)
+                step_time += group_step_time
+                callback_time += group_callback_time
+        return (step_time, callback_time)
+
+    def _run_tick_for(self, b: _FleetBuffers) -> Tuple[float, float]:
+        services = b.location_services
+        if len(services) == 0:
+            return (0.0, 0.0)
+        start = time.perf_counter()
+        for i, s in enumerate(services):
+            if s._inputs_changed:
+                with s._value_mutex:
+                    b.target_speed[i] = s._target_speed
+                    b.acceleration[i] = s._acceleration
+                    b.target_offset[i] = s._target_offset
+                    s._inputs_changed = False
+        scalar_indices = [i for i, s in enumerate(services) if s._uturn_override is not None]
+
+        old_x = b.pos_x.copy()
+        old_y = b.pos_y.copy()
+        old_offset = b.actual_offset.copy()
+        self._adjust_speed(b)
+        distance = self._adjust_offset(b, b.actual_speed / self._simulation_ticks_per_second) * b.direction
+        self._advance_on_track(b, distance)
+        self._update_positions(b, old_x, old_y, b.actual_offset != old_offset, distance)
+
+        # U-Turns use the scalar implementation. Its state wasn't written back yet, so it
+        # starts from the state of the last tick
+        scalar_results = {}
+        for i in scalar_indices:
+            scalar_results[i] = services[i]._run_simulation_step_threadsafe()
+            b.pull_from_service(i)
+
+        step_done = time.perf_counter()
+        self._write_back(b, scalar_results)
+        return (step_done - start, time.perf_counter() - step_done)
+
+    def _adjust_speed(self, b: _FleetBuffers):
+        max_change = b.acceleration / self._simulation_ticks_per_second
+        b.actual_speed = np.where(b.actual_speed < b.target_speed,
+                                  np.minimum(b.actual_speed + max_change, b.target_speed),
+                                  np.where(b.actual_speed > b.target_speed,
+                                           np.maximum(b.actual_speed - max_change, b.target_speed),
+                                           b.actual_speed))
+
+    def _adjust_offset(self, b: _FleetBuffers, travel_distance):
+        """
+        Vectorized version of LocationService._adjust_offset
+        returns: leftover distance that can be traveled straight
+        """
+        g = b.geometry
+        needed_offset = np.abs(b.actual_offset - b.target_offset)
+        change = np.minimum(self.__MAX_USED_DISTANCE_FOR_OFFSET_PERCENT * travel_distance, needed_offset)
+        new_offset = np.where(b.target_offset > b.actual_offset, b.actual_offset + change, b.actual_offset - change)
+        # equivalent progress; on straight pieces the progress doesn't change
+        is_curve = g.is_curve[b.piece]
+        old_length = g.get_length(b.piece, b.actual_offset)
+        new_length = g.get_length(b.piece, new_offset)
+        b.progress = np.where(is_curve, b.progress / old_length * new_length, b.progress)
+        b.actual_offset = new_offset
+        return np.sqrt(travel_distance * travel_distance - change * change)
+
+    def _advance_on_track(self, b: _FleetBuffers, distance):
+        """
+        Moves all cars the given distance along the track, including transitions
+        onto following pieces
+        """
+        g = b.geometry
+        cars = np.arange(len(b.location_services))
+        max_iterations = g.piece_count * 2 + 2
+        for _ in range(0, max_iterations):
+            pieces = b.piece[cars]
+            length = g.get_length(pieces, b.actual_offset[cars])
+            end = b.progress[cars] + distance
+            leftover = np.where(end >= length, end - length, np.where(end <= 0, end, 0.0))
+            transition = leftover != 0
+            b.progress[cars] = np.where(transition, b.progress[cars], end)
+            if not transition.any():
+                return
+            cars = cars[transition]
+            distance = leftover[transition]
+            b.piece[cars] = (b.piece[cars] + b.direction[cars]) % g.piece_count
+            new_length = g.get_length(b.piece[cars], b.actual_offset[cars])
+            b.progress[cars] = np.where(b.direction[cars] == 1, 0.0, new_length)
+        self.logger.critical("Cars passed more pieces in a single step than the track has. Stopping the traversal to prevent an infinite loop!")
+
+    def _update_positions(self, b: _FleetBuffers, old_x, old_y, offset_changed, distance):
+        """
+        Vectorized version of the end of LocationService._run_simulation_step: calculates
+        the positions and the headings
+        """
+        g = b.geometry
+        p = b.piece
+        offset = b.actual_offset
+        length = g.get_length(p, offset)
+        # straight pieces
+        straight_x = -offset
+        straight_y = length / 2 - b.progress
+        # curved pieces
+        curve_angle = np.radians(b.progress / length * 90)
+        distance_to_middle = g.radius[p] + offset * g.mirror_mult[p]
+        curve_x = distance_to_middle * np.cos(curve_angle) - g.half_size[p]
+        curve_y = distance_to_middle * np.sin(curve_angle) - g.half_size[p]
+        mirrored = g.is_mirrored[p]
+        curve_x, curve_y = np.where(mirrored, -curve_y, curve_x), np.where(mirrored, -curve_x, curve_y)
+
+        is_curve = g.is_curve[p]
+        local_x = np.where(is_curve, curve_x, straight_x)
+        local_y = np.where(is_curve, curve_y, straight_y)
+        cos = g.rot_cos[p]
+        sin = g.rot_sin[p]
+        b.pos_x = local_x * cos - local_y * sin + g.offset_x[p]
+        b.pos_y = local_x * sin + local_y * cos + g.offset_y[p]
+
+        # cars that changed the offset point in the direction of the movement. Same as Position.calculate_angle_to()
+        dx = old_x - b.pos_x
+        dy = old_y - b.pos_y
+        moved = np.hypot(dx, dy) >= 0.1
+        rad = np.arctan2(dy, dx) - 0.5 * math.pi
+        rad = np.where(rad < 0, rad + 2 * math.pi, rad)
+        movement_deg = np.degrees(rad)
+        # the other cars point along the lane like the heading of the pieces (TrackPiece.get_pose()).
+        # The direction from ahead to behind on a curve is (sin, -cos) of the curve angle, mirrored (cos, -sin)
+        tangent_x = np.where(mirrored, np.cos(curve_angle), np.sin(curve_angle))
+        tangent_y = np.where(mirrored, -np.sin(curve_angle), -np.cos(curve_angle))
+        rad = np.arctan2(tangent_x * sin + tangent_y * cos, tangent_x * cos - tangent_y * sin) - 0.5 * math.pi
+        rad = np.where(rad < 0, rad + 2 * math.pi, rad)
+        lane_deg = np.where(is_curve, np.degrees(rad), g.straight_heading_deg[p])
+        lane_deg = np.where(b.direction == -1, (lane_deg + 180) % 360, lane_deg)
+        b.stop_deg = np.where(offset_changed, np.where(moved, movement_deg, b.stop_deg),
+                              np.where(np.abs(distance) >= 0.1, lane_deg, b.stop_deg))
+
+    def _write_back(self, b: _FleetBuffers, scalar_results: dict):
+        """
+        Writes the new state into the LocationServices and calls their update callbacks
+        """
+        speeds = b.actual_speed.tolist()
+        offsets = b.actual_offset.tolist()
+        pieces = b.piece.tolist()
+        progresses = b.progress.tolist()
+        xs = b.pos_x.tolist()
+        ys = b.pos_y.tolist()
+        degs = b.stop_deg.tolist()
+        for i, s in enumerate(b.location_services):
+            # suspended cars are idle, so their state didn't change
+            if s._suspended:
+                continue
+            result = scalar_results.get(i)
+            if result is None:
+                with s._value_mutex:
+                    s._actual_speed = speeds[i]
+                    s._actual_offset = offsets[i]
+                    s._current_piece_index = pieces[i]
+                    s._progress_on_current_piece = progresses[i]
+                    s._current_position = Position(xs[i], ys[i])
+                    s._stop_direction = Angle(degs[i])
+                    s._step_count += 1
+                    if s._is_idle():
+                        s._suspended = True
+                s._notify_update(s._current_position, s._stop_direction)
+            else:
+                pos, rot = result
+                s._notify_update(pos, rot)
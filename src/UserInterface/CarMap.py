@@ -1,15 +1,49 @@
-from flask import Blueprint, render_template
+import hashlib
+from typing import Tuple
+
+from flask import Blueprint, Response, jsonify, make_response, render_template, request
 from EnvironmentManagement.EnvironmentManager import EnvironmentManager
 
 class CarMap:
     def __init__(self, environment_manager: EnvironmentManager):
         self.carMap_blueprint: Blueprint = Blueprint(name='carMap_bp', import_name='carMap_bp')
         self._environment_manager = environment_manager
+        # the page only contains the track and the colors, which don't change, so it's rendered once
+        # (page, ETag)
+        self._page: Tuple[str, str] | None = None
 
         def home_car_map():
-            track = environment_manager.get_track().get_as_list()
-            return render_template("car_map.html", track=track, color_map=environment_manager.get_car_color_map())
+            if self._page is None:
+                page = render_template("car_map.html", track=environment_manager.get_track().get_as_list(),
+                                       color_map=environment_manager.get_car_color_map())
+                self._page = (page, hashlib.sha256(page.encode('utf-8')).hexdigest()[:32])
+            page, etag = self._page
+            # the browser revalidates with the ETag, so repeat loads only get a 304
+            if etag in request.if_none_match:
+                return self._get_cached_response(Response(status=304), etag)
+            return self._get_cached_response(make_response(page), etag)
         self.carMap_blueprint.add_url_rule("", "home_car_map", view_func=home_car_map)
 
+        def get_track():
+            track = environment_manager.get_track()
+            if track.get_etag() in request.if_none_match:
+                return self._get_cached_response(Response(status=304), track.get_etag())
+            response = make_response(track.get_as_json())
+            response.mimetype = 'application/json'
+            return self._get_cached_response(response, track.get_etag())
+        self.carMap_blueprint.add_url_rule("/track", "track", view_func=get_track)
+
+        def get_car_positions():
+            # parked cars don't send updates, so new car map clients need the last positions
+            response = jsonify(environment_manager.get_car_positions())
+            response.cache_control.no_store = True
+            return response
+        self.carMap_blueprint.add_url_rule("/car_positions", "car_positions", view_func=get_car_positions)
+
+    def _get_cached_response(self, response: Response, etag: str) -> Response:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+
     def get_blueprint(self) -> Blueprint:
         return self.carMap_blueprint
@@ -8,15 +8,25 @@
 #
 
 from flask import Blueprint, render_template ,request
+from flask_socketio import join_room
 import uuid
 
 from EnvironmentManagement.EnvironmentManager import EnvironmentManager
+from UserInterface.StaffUI import STAFF_ROOM
+
+
+def get_player_room(player: str) -> str:
+    """
+    Get the Socket.IO room of a player. The player id is sent by the client, so the rooms
+    are prefixed to prevent joining the staff room or the room of a session id with it
+    """
+    return f"player:{player}"
+
 
 class DriverUI:
 
     def __init__(self, behaviour_ctrl, environment_mng, socketio, name=__name__) -> None:
         self.driverUI_blueprint: Blueprint = Blueprint(name='driverUI_bp', import_name='driverUI_bp')
-        self.vehicles: list = environment_mng.get_vehicle_list()
         self.behaviour_ctrl = behaviour_ctrl
         self.socketio = socketio
         self.environment_mng: EnvironmentManager = environment_mng
@@ -51,6 +61,8 @@ class DriverUI:
         @self.socketio.on('handle_connect')
         def handle_connected(data):
             player = data["player"]
+            # every player gets an own room, so driving data is only sent to the own browser
+            join_room(get_player_room(player))
             vehicle = self.get_vehicle_by_player(player=player)
             print(f"Driver {player} connected with vehicle {vehicle}!")
             if vehicle is None:
@@ -99,19 +111,21 @@ class DriverUI:
             return
 
     def update_driving_data(self, driving_data: dict) -> None:
-        self.socketio.emit('update_driving_data', driving_data)
+        """
+        Sends the driving data to the player controlling the vehicle and the staff. The
+        vehicles only send the values that changed, but always include vehicle_id and player
+        """
+        player = driving_data.get('player')
+        if player is None:
+            self.socketio.emit('update_driving_data', driving_data, to=STAFF_ROOM)
+        else:
+            self.socketio.emit('update_driving_data', driving_data, to=[get_player_room(player), STAFF_ROOM])
         return
 
     def get_blueprint(self) -> Blueprint:
         return self.driverUI_blueprint
 
     def get_vehicle_by_player(self, player: str):
-        temp_vehicle = [vehicle for vehicle in self.vehicles if vehicle.player == player]
-        if len(temp_vehicle) == 1:
-            return temp_vehicle[0]
-        elif len(temp_vehicle) < 1:
-            return None
-        else:
-            # Todo: define error reaction if same player is assigned to different vehicles
-            return None
+        # the registry of the EnvironmentManager only allows one vehicle per player
+        return self.environment_mng.get_car_from_player(player)
 
@@ -8,14 +8,23 @@
 #
 
 from flask import Blueprint, render_template, request, redirect, url_for
+from flask_socketio import join_room
+from threading import Lock, Timer
 import re
 import secrets
 from typing import Any, Dict, Tuple, List
 import logging
 
+# Socket.IO room all authenticated staff clients are joined to
+STAFF_ROOM = 'staff'
+
 class StaffUI:
 
-    def __init__(self, cybersecurity_mng, socketio, environment_mng, password: str):
+    def __init__(self, cybersecurity_mng, socketio, environment_mng, password: str, update_window: float = 0.1):
+        """
+        update_window: time in seconds changes are collected before they're sent to the staff
+            in a single update. With 0 every change is sent immediately
+        """
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
         console_handler = logging.StreamHandler()
@@ -31,6 +40,14 @@ class StaffUI:
         self.environment_mng = environment_mng
         self.devices: list = []
 
+        self._update_window: float = update_window
+        # last data sent to the staff room. Updates only contain the values that differ from it
+        self._published_data: Dict[str, list] = {}
+        self._update_timer: Timer | None = None
+        self._update_mutex: Lock = Lock()
+        # keeps the broadcasts and the complete data for new clients in order
+        self._send_mutex: Lock = Lock()
+
         self.environment_mng.set_staff_ui(self)
 
         def is_authenticated() -> bool:
@@ -91,7 +108,8 @@ class StaffUI:
             if not is_authenticated():
                 self.logger.warning("Not authenticated")
                 return
-            self.publish_new_data()
+            # the requesting client gets the complete data the following updates are diffed against
+            self._send_changed_data(requesting_sid=request.sid)
             return
 
         @self.socketio.on('connect')
@@ -101,7 +119,8 @@ class StaffUI:
                 return
             self.logger.info("Client connected")
             print('Client connected')
-            self.publish_new_data()
+            # the client requests the complete data with get_uuids
+            join_room(STAFF_ROOM)
             return
 
         @self.socketio.on('search_cars')
@@ -164,7 +183,7 @@ class StaffUI:
             data = {'activeScenarios': active_scenarios, 'uuids': self.environment_mng.get_controlled_cars_list(), 'names': names,
                     'descriptions': descriptions}
             self.logger.info("Updated hacking scenarios")
-            self.socketio.emit('update_hacking_scenarios', data)
+            self.socketio.emit('update_hacking_scenarios', data, to=request.sid)
             return
 
     def get_blueprint(self) -> Blueprint:
@@ -178,11 +197,50 @@ class StaffUI:
             scenario_descriptions.update({scenario['id']: scenario['description']})
         return scenario_names, scenario_descriptions
 
+    def _get_staff_data(self) -> Dict[str, list]:
+        return {"car_map": self.environment_mng.get_mapped_cars(), "car_queue": self.environment_mng.get_free_car_list(),
+                "player_queue": self.environment_mng.get_waiting_player_list()}
+
     def publish_new_data(self):
-        self.socketio.emit('update_uuids', {"car_map": self.environment_mng.get_mapped_cars(), "car_queue": self.environment_mng.get_free_car_list(),
-                                            "player_queue": self.environment_mng.get_waiting_player_list()})
+        """
+        Sends the changed vehicle and player lists to the staff. All calls within the update
+        window result in a single update that is sent when the window ended.
+        Thread-safe
+        """
+        if self._update_window <= 0:
+            self._send_changed_data()
+            return
+        with self._update_mutex:
+            if self._update_timer is not None:
+                return
+            self._update_timer = Timer(self._update_window, self._on_update_timer)
+            self._update_timer.daemon = True
+            self._update_timer.start()
         return
 
+    def _on_update_timer(self):
+        with self._update_mutex:
+            self._update_timer = None
+        self._send_changed_data()
+
+    def _send_changed_data(self, requesting_sid: str | None = None):
+        """
+        Sends the lists that differ from the last update to the staff room. Nothing is
+        sent if nothing changed. A requesting client gets the complete data instead, so it
+        has the same state the next updates are diffed against
+        """
+        with self._send_mutex:
+            data = self._get_staff_data()
+            with self._update_mutex:
+                changes = {key: value for key, value in data.items() if self._published_data.get(key) != value}
+                if len(changes) > 0:
+                    self._published_data = data
+                published_data = self._published_data
+            if len(changes) > 0:
+                self.socketio.emit('update_uuids', changes, to=STAFF_ROOM, skip_sid=requesting_sid)
+            if requesting_sid is not None:
+                self.socketio.emit('update_uuids', published_data, to=requesting_sid)
+
    # def update_uuids(self):
     #    self.socketio.emit('update_uuids', {"uuids": self.uuids, "car_queue": self.environment_mng._car_queue_list,
      #                                       "player_queue": self.environment_mng.get_player_queue()})
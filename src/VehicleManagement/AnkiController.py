@@ -1,13 +1,16 @@
-import asyncio
 import struct
 import logging
-from threading import Thread
 from VehicleManagement.VehicleController import VehicleController, Turns, TurnTrigger
+from VehicleManagement.BleEventLoop import BleEventLoop, get_shared_ble_event_loop
 from bleak import BleakClient, BleakGATTCharacteristic, BleakError
 
 
 class AnkiController(VehicleController):
-    def __init__(self) -> None:
+    def __init__(self, ble_event_loop: BleEventLoop | None = None) -> None:
+        """
+        ble_event_loop: loop the BLE I/O runs on (normally the one of the FleetController).
+            None uses the shared loop of the process
+        """
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
         console_handler = logging.StreamHandler()
@@ -16,11 +19,11 @@ class AnkiController(VehicleController):
         super().__init__()
         self.task_in_progress: bool = False
 
-        self._notification_thread: Thread = Thread(target=self.__on_receive_data,
-                                                   name="notification_thread",
-                                                   args=(BleakGATTCharacteristic, bytearray))
-
-        self.__loop = asyncio.new_event_loop()
+        # all controllers share one loop, so the amount of threads doesn't grow with the cars.
+        # The notifications are also received in its thread
+        if ble_event_loop is None:
+            ble_event_loop = get_shared_ble_event_loop()
+        self.__ble_event_loop: BleEventLoop = ble_event_loop
 
         self.__MAX_ANKI_SPEED = 1200  # mm/s
         self.__MAX_ANKI_ACCELERATION = 2500  # mm/s^2
@@ -43,9 +46,13 @@ class AnkiController(VehicleController):
         Run a asyncio awaitable task
         task: awaitable task
         """
-        asyncio.run_coroutine_threadsafe(task, self.__loop).result()
+        self.__ble_event_loop.run(task)
         # TODO: Log error, if the coroutine doesn't end successfully
 
+    def __on_command_done(self, future) -> None:
+        if isinstance(future.exception(), BleakError) and self.__car_not_reachable_callback is not None:
+            self.__car_not_reachable_callback("Anki car is not reachable. Can not send command.")
+
     def set_callbacks(self,
                       location_callback,
                       transition_callback,
@@ -67,7 +74,6 @@ class AnkiController(VehicleController):
             return False
 
         try:
-            Thread(target=self.__loop.run_forever).start()
             self.__run_async_task(ble_client.connect())
 
             if ble_client.is_connected:
@@ -91,9 +97,12 @@ class AnkiController(VehicleController):
             final_command = struct.pack("B", len(command)) + command
 
             try:
-                self.__run_async_task(
-                    self._connected_car.write_gatt_char("BE15BEE1-6186-407E-8381-0BD89C4D8DF4", final_command,
-                                                        None))
+                write = self._connected_car.write_gatt_char("BE15BEE1-6186-407E-8381-0BD89C4D8DF4", final_command, None)
+                if self.__ble_event_loop.is_loop_thread():
+                    # sent from a notification callback. Waiting would block the loop, so it's only scheduled
+                    self.__ble_event_loop.submit(write).add_done_callback(self.__on_command_done)
+                else:
+                    self.__run_async_task(write)
                 success = True
                 self.task_in_progress = False
             except BleakError:
@@ -106,7 +115,6 @@ class AnkiController(VehicleController):
 
     def __start_notifications_now(self) -> bool:
         try:
-            self._notification_thread.start()
             self.__run_async_task(self._connected_car.start_notify("BE15BEE0-6186-407E-8381-0BD89C4D8DF4",
                                                                    self.__on_receive_data))
             return True
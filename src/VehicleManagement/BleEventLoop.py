@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from concurrent.futures import Future
+from typing import Coroutine
+from threading import Lock, Thread, current_thread
+
+
+class BleEventLoop():
+    """
+    asyncio event loop in an own thread that runs all BLE I/O (scanning, connecting,
+    commands and notifications). It's shared by the FleetController and all AnkiControllers,
+    so the amount of threads doesn't grow with the amount of cars. The thread is started
+    with the first task.
+    Thread-safe
+    """
+    def __init__(self, name: str = "ble_event_loop_thread"):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._name: str = name
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self._thread: Thread | None = None
+        self._mutex: Lock = Lock()
+
+    def _ensure_running(self):
+        with self._mutex:
+            if self._thread is None:
+                self._thread = Thread(target=self._loop.run_forever, name=self._name, daemon=True)
+                self._thread.start()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules a coroutine on the loop without waiting for it. Also works in the loop
+        itself (e.g. in a notification callback)
+        """
+        self._ensure_running()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine: Coroutine, timeout: float | None = None):
+        """
+        Runs a coroutine on the loop and waits for it
+        returns: the result of the coroutine. Its exceptions are raised again
+        raises: RuntimeError, if it's called from the loop itself (e.g. in a notification
+            callback), since waiting would block the loop forever. Use submit() there
+        """
+        if self.is_loop_thread():
+            coroutine.close()
+            raise RuntimeError("A BLE task can't be waited for in the BLE event loop. Use submit() instead.")
+        return self.submit(coroutine).result(timeout)
+
+    def is_loop_thread(self) -> bool:
+        return self._thread is not None and current_thread() is self._thread
+
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def stop(self):
+        """
+        Stops the loop after the current task. Tasks that are submitted afterwards start it again
+        """
+        with self._mutex:
+            thread = self._thread
+            if thread is None:
+                return
+            if thread is current_thread():
+                self.logger.error("It was attempted to stop the BleEventLoop from one of its tasks. Ignoring the request!")
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        thread.join()
+        # only cleared after the loop ended, so it isn't started twice
+        with self._mutex:
+            if self._thread is thread:
+                self._thread = None
+
+
+_shared_loop: BleEventLoop | None = None
+_shared_loop_mutex: Lock = Lock()
+
+
+def get_shared_ble_event_loop() -> BleEventLoop:
+    """
+    Get the BleEventLoop of the process that's used, if no other loop is passed to the
+    FleetController or an AnkiController
+    """
+    global _shared_loop
+    with _shared_loop_mutex:
+        if _shared_loop is None:
+            _shared_loop = BleEventLoop()
+        return _shared_loop
@@ -7,18 +7,35 @@
 # file that should have been included as part of this package.
 #
 
-import asyncio
 import struct
 from bleak import BleakScanner
 
+from VehicleManagement.AnkiController import AnkiController
+from VehicleManagement.BleEventLoop import BleEventLoop, get_shared_ble_event_loop
+
 class FleetController:
 
-    def __init__(self):
+    def __init__(self, ble_event_loop: BleEventLoop | None = None):
+        """
+        ble_event_loop: loop all BLE I/O runs on. None uses the shared loop of the process
+        """
         self._connected_cars = {} # BleakClients
-        self.loop = asyncio.new_event_loop()
+        # the AnkiControllers of the physical cars use the same loop, so there's one BLE thread in total
+        if ble_event_loop is None:
+            ble_event_loop = get_shared_ble_event_loop()
+        self._ble_event_loop: BleEventLoop = ble_event_loop
+
+    def get_ble_event_loop(self) -> BleEventLoop:
+        return self._ble_event_loop
+
+    def create_vehicle_controller(self) -> AnkiController:
+        """
+        Creates the controller of a physical car. It runs its BLE I/O on the loop of the FleetController
+        """
+        return AnkiController(self._ble_event_loop)
 
     def scan_for_anki_cars(self) -> list[str]:
-        ble_devices = self.loop.run_until_complete(BleakScanner.discover(return_adv=True))
+        ble_devices = self._ble_event_loop.run(BleakScanner.discover(return_adv=True))
         _active_devices = [d[0].address for d in ble_devices.values() if d[0].name is not None and "Drive" in d[0].name]
         if _active_devices:
             return _active_devices
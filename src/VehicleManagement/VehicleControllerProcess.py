@@ -0,0 +1,346 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+from typing import Callable, Dict
+from threading import Lock, Thread
+
+from bleak import BleakClient
+
+from VehicleManagement.VehicleController import VehicleController, Turns, TurnTrigger
+
+# Messages are tuples that start with their type. Web process to vehicle controller process:
+# ('scan', request id), ('connect', request id, controller id, address, start notification),
+# ('command', controller id, method name, arguments), ('remove', controller id), ('stop',)
+# Vehicle controller process to web process: ('result', request id, result),
+# ('notification', controller id, callback name, value)
+
+# names of the callbacks of AnkiController.set_callbacks in their order
+_CALLBACK_NAMES = ('location', 'transition', 'offset', 'version', 'battery', 'car_not_reachable')
+_COMMANDS = ('change_speed_to', 'change_lane_to', 'do_turn_with', 'request_version', 'request_battery')
+
+
+def _serve(connection: Connection, fleet_ctrl, create_controller: Callable):
+    """
+    Handles the messages of the web process until the connection is closed or it's stopped.
+    Commands are ran in the order they arrive. Scanning and connecting take seconds, so they
+    run in own threads and don't delay the commands of other cars
+    fleet_ctrl: FleetController used for scanning
+    create_controller: creates the AnkiController of a car
+    """
+    send_mutex = Lock()
+    controllers: Dict[int, VehicleController] = {}
+
+    def send(message: tuple):
+        with send_mutex:
+            try:
+                connection.send(message)
+            except (OSError, EOFError):
+                # the web process is gone. The main loop ends with the closed connection
+                pass
+
+    def scan(request_id: int):
+        try:
+            result = fleet_ctrl.scan_for_anki_cars()
+        except Exception as e:
+            logging.getLogger(__name__).error("Scanning for Anki cars failed: %s", e)
+            result = []
+        send(('result', request_id, result))
+
+    def connect(request_id: int, controller: VehicleController, address: str, start_notification: bool):
+        try:
+            result = controller.connect_to_vehicle(BleakClient(address), start_notification)
+        except Exception as e:
+            logging.getLogger(__name__).error("Connecting to %s failed: %s", address, e)
+            result = False
+        send(('result', request_id, result))
+
+    def forward(controller_id: int, name: str) -> Callable:
+        return lambda value: send(('notification', controller_id, name, value))
+
+    try:
+        while True:
+            message = connection.recv()
+            match message[0]:
+                case 'scan':
+                    Thread(target=scan, args=(message[1],), name="vehicle_scan_thread", daemon=True).start()
+                case 'connect':
+                    _, request_id, controller_id, address, start_notification = message
+                    controller = create_controller()
+                    # the notifications are forwarded from the start, so none is lost before the car set its callbacks
+                    controller.set_callbacks(*[forward(controller_id, name) for name in _CALLBACK_NAMES])
+                    controllers[controller_id] = controller
+                    Thread(target=connect, args=(request_id, controller, address, start_notification),
+                           name="vehicle_connect_thread", daemon=True).start()
+                case 'command':
+                    _, controller_id, name, args = message
+                    controller = controllers.get(controller_id)
+                    if controller is not None and name in _COMMANDS:
+                        getattr(controller, name)(*args)
+                case 'remove':
+                    controller = controllers.pop(message[1], None)
+                    # the AnkiController and its BleakClient reference each other, so the garbage
+                    # collection would disconnect the car late
+                    if controller is not None:
+                        controller.__del__()
+                case 'stop':
+                    break
+    except EOFError:
+        pass
+
+
+def _run_vehicle_controller_process(connection: Connection):
+    """
+    Entry point of the vehicle controller process. Owns the BLE event loop, the
+    FleetController and the AnkiControllers of all physical cars
+    """
+    # a monkey patched (eventlet) web process creates the pipe non-blocking
+    os.set_blocking(connection.fileno(), True)
+    # imported here, so the web process doesn't need to load them
+    from VehicleManagement.AnkiController import AnkiController
+    from VehicleManagement.BleEventLoop import BleEventLoop
+    from VehicleManagement.FleetController import FleetController
+
+    ble_event_loop = BleEventLoop()
+    fleet_ctrl = FleetController(ble_event_loop)
+    try:
+        _serve(connection, fleet_ctrl, lambda: AnkiController(ble_event_loop))
+    finally:
+        ble_event_loop.stop()
+
+
+class RemoteAnkiController(VehicleController):
+    """
+    Stands in for the AnkiController of a physical car that runs in the vehicle controller
+    process. Commands are sent without waiting for them, the notifications of the car are
+    passed to the callbacks in the receiver thread of the VehicleControllerProcess.
+    Thread-safe
+    """
+    def __init__(self, vehicle_controller_process: 'VehicleControllerProcess', controller_id: int) -> None:
+        super().__init__()
+        self._vehicle_controller_process: 'VehicleControllerProcess' = vehicle_controller_process
+        self._controller_id: int = controller_id
+        self._callbacks: Dict[str, Callable] = {}
+
+    def __del__(self) -> None:
+        # like the AnkiController, it disconnects from the car. Its AnkiController is dropped in
+        # the vehicle controller process
+        self._vehicle_controller_process.remove(self)
+
+    def get_controller_id(self) -> int:
+        return self._controller_id
+
+    def set_callbacks(self,
+                      location_callback,
+                      transition_callback,
+                      offset_callback,
+                      version_callback,
+                      battery_callback,
+                      car_not_reachable_callback) -> None:
+        self._callbacks = dict(zip(_CALLBACK_NAMES, (location_callback, transition_callback, offset_callback,
+                                                     version_callback, battery_callback, car_not_reachable_callback)))
+        return
+
+    def connect_to_vehicle(self, ble_client: BleakClient, start_notification: bool = True) -> bool:
+        """
+        Connects to the car in the vehicle controller process. Only the address of the client is used
+        """
+        if ble_client is None or not isinstance(ble_client, BleakClient):
+            return False
+        if not self._vehicle_controller_process.connect(self, ble_client.address, start_notification):
+            return False
+        self._connected_car = ble_client.address
+        return True
+
+    def change_speed_to(self, velocity: int, acceleration: int = 1000, respect_speed_limit: bool = True) -> bool:
+        return self._send_command('change_speed_to', (velocity, acceleration, respect_speed_limit))
+
+    def change_lane_to(self, change_direction: int, velocity: int, acceleration: int = 1000) -> bool:
+        return self._send_command('change_lane_to', (change_direction, velocity, acceleration))
+
+    def do_turn_with(self, direction: Turns,
+                     turntrigger: TurnTrigger = TurnTrigger.VEHICLE_TURN_TRIGGER_IMMEDIATE) -> bool:
+        return self._send_command('do_turn_with', (direction, turntrigger))
+
+    def request_version(self) -> bool:
+        return self._send_command('request_version', ())
+
+    def request_battery(self) -> bool:
+        return self._send_command('request_battery', ())
+
+    def _send_command(self, name: str, args: tuple) -> bool:
+        return self._vehicle_controller_process.send_command(self, name, args)
+
+    def _on_notification(self, name: str, value) -> None:
+        callback = self._callbacks.get(name)
+        if callback is not None:
+            callback(value)
+
+
+class VehicleControllerProcess():
+    """
+    Runs the BLE I/O of the physical cars (scanning, connecting, commands and notifications)
+    in a separate process, so load in the web process (request handling, Socket.IO fan-out)
+    can't delay the car commands and both sides can use their own core. It's used like a
+    FleetController: scan_for_anki_cars() scans in the other process and
+    create_vehicle_controller() returns RemoteAnkiControllers, whose commands are sent over
+    a local pipe (a Unix socket on Linux). The notifications of the cars are received in a
+    receiver thread.
+    Thread-safe
+    """
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        console_handler = logging.StreamHandler()
+        self.logger.addHandler(console_handler)
+
+        self._send_mutex: Lock = Lock()
+        self._mutex: Lock = Lock()
+        # copy-on-write, so the receiver thread doesn't need a lock
+        self._controllers: Dict[int, RemoteAnkiController] = {}
+        self._next_controller_id: int = 0
+        self._requests: Dict[int, Future] = {}
+        self._next_request_id: int = 0
+
+        self._connection: Connection | None = None
+        self._process = None
+        self._receiver_thread: Thread | None = None
+
+    def start(self):
+        """
+        Starts the vehicle controller process and the thread that receives its messages
+        """
+        if self._process is not None:
+            self.logger.error("It was attempted to start an already running VehicleControllerProcess. Ignoring the request!")
+            return
+        # spawn instead of fork, since the web process already runs threads
+        context = multiprocessing.get_context('spawn')
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=_run_vehicle_controller_process, name="vehicle_controller_process",
+                                        daemon=True, args=(child_connection,))
+        self._process.start()
+        child_connection.close()
+        self._start_receiver()
+
+    def _start_receiver(self):
+        self._receiver_thread = Thread(target=self._run_receiver, name="vehicle_controller_receiver_thread", daemon=True)
+        self._receiver_thread.start()
+
+    def stop(self):
+        """
+        Stops the vehicle controller process. Requests that wait for it get no result
+        """
+        if self._process is None:
+            self.logger.error("It was attempted to stop an already stopped VehicleControllerProcess. Ignoring the request!")
+            return
+        self._send(('stop',))
+        self._process.join()
+        self._connection.close()
+        self._receiver_thread.join()
+        with self._send_mutex:
+            self._connection = None
+        # the AnkiControllers ended with the process. The RemoteAnkiControllers are released after
+        # the lock, since their __del__ calls remove()
+        with self._mutex:
+            controllers = self._controllers
+            self._controllers = {}
+        controllers.clear()
+        self._process = None
+        self._receiver_thread = None
+
+    def is_running(self) -> bool:
+        return self._process is not None
+
+    def _send(self, message: tuple) -> bool:
+        with self._send_mutex:
+            if self._connection is None:
+                self.logger.error("It was attempted to send a message to a stopped VehicleControllerProcess. Ignoring the request!")
+                return False
+            try:
+                self._connection.send(message)
+                return True
+            except (OSError, EOFError):
+                self.logger.error("The vehicle controller process isn't reachable. Dropping the message %s!", message[0])
+                return False
+
+    def _request(self, message_type: str, *args):
+        """
+        Sends a request and waits for its result
+        returns: the result or None, if the process isn't reachable
+        """
+        future = Future()
+        with self._mutex:
+            request_id = self._next_request_id
+            self._next_request_id += 1
+            self._requests[request_id] = future
+        if not self._send((message_type, request_id, *args)):
+            with self._mutex:
+                self._requests.pop(request_id, None)
+            return None
+        return future.result()
+
+    def scan_for_anki_cars(self) -> list[str]:
+        result = self._request('scan')
+        if result is None:
+            return []
+        return result
+
+    def create_vehicle_controller(self) -> RemoteAnkiController:
+        with self._mutex:
+            controller = RemoteAnkiController(self, self._next_controller_id)
+            self._next_controller_id += 1
+            self._controllers = {**self._controllers, controller.get_controller_id(): controller}
+        return controller
+
+    def connect(self, controller: RemoteAnkiController, address: str, start_notification: bool) -> bool:
+        """
+        Connects the AnkiController of a RemoteAnkiController to a car and waits for it
+        returns: True, if the car was connected
+        """
+        return self._request('connect', controller.get_controller_id(), address, start_notification) is True
+
+    def send_command(self, controller: RemoteAnkiController, name: str, args: tuple) -> bool:
+        """
+        Sends a command to the AnkiController of a RemoteAnkiController without waiting for it
+        """
+        return self._send(('command', controller.get_controller_id(), name, args))
+
+    def remove(self, controller: RemoteAnkiController) -> None:
+        """
+        Drops the AnkiController of a RemoteAnkiController, which disconnects from its car
+        """
+        with self._mutex:
+            if controller.get_controller_id() not in self._controllers:
+                return
+            self._controllers = {i: c for i, c in self._controllers.items() if c is not controller}
+        if self._connection is not None:
+            self._send(('remove', controller.get_controller_id()))
+
+    def _run_receiver(self):
+        """
+        Passes the results to the waiting requests and the notifications to the callbacks
+        of the RemoteAnkiControllers
+        """
+        while True:
+            try:
+                message = self._connection.recv()
+            except (OSError, EOFError):
+                break
+            match message[0]:
+                case 'result':
+                    with self._mutex:
+                        future = self._requests.pop(message[1], None)
+                    if future is not None:
+                        future.set_result(message[2])
+                case 'notification':
+                    _, controller_id, name, value = message
+                    controller = self._controllers.get(controller_id)
+                    if controller is not None:
+                        controller._on_notification(name, value)
+        # nobody answers the waiting requests anymore
+        with self._mutex:
+            requests = self._requests
+            self._requests = {}
+        for future in requests.values():
+            future.set_result(None)
@@ -9,29 +9,49 @@
 
 from typing import List
 from DataModel.Vehicle import Vehicle
+from EnvironmentManagement.VehicleRegistry import VehicleRegistry
+from VehicleMovementManagement.InputCoalescer import InputCoalescer
 
 
 class BehaviourController:
 
-    def __init__(self, vehicles: List[Vehicle]):
-        if all(isinstance(v_item, Vehicle) for v_item in vehicles):
-            self._vehicles = vehicles
+    def __init__(self, vehicles: VehicleRegistry | List[Vehicle], speed_coalescing_window: float = 0.05):
+        """
+        vehicles: registry of the vehicles (shared with the EnvironmentManager) or a fixed list of vehicles
+        speed_coalescing_window: speed requests of a vehicle within this time in seconds are
+            coalesced and only the latest one is applied. 0 applies every request immediately
+        """
+        if isinstance(vehicles, VehicleRegistry):
+            self._vehicle_registry: VehicleRegistry = vehicles
+        else:
+            self._vehicle_registry = VehicleRegistry([v_item for v_item in vehicles if isinstance(v_item, Vehicle)])
+        # the driver slider sends many requests while it's moved, but every applied one is a BLE write
+        self._speed_coalescer: InputCoalescer = InputCoalescer(speed_coalescing_window)
 
     def get_vehicle_by_uuid(self, uuid: str) -> Vehicle:
-        found_vehicle = next((o for o in self._vehicles if o.vehicle_id == uuid), None)
-        return found_vehicle
+        return self._vehicle_registry.get_vehicle(uuid)
 
     def on_vehicle_data_change(self, uuid):
         self.get_vehicle_by_uuid(uuid)
 
     # Driver Controller
     def request_speed_change_for(self, uuid: str, value_perc: float) -> None:
+        self._speed_coalescer.submit(uuid, value_perc, lambda value: self._apply_speed_change(uuid, value))
+        return
+
+    def _apply_speed_change(self, uuid: str, value_perc: float) -> None:
         vehicle = self.get_vehicle_by_uuid(uuid)
+        if vehicle is None:
+            print(f"Vehicle {uuid} was removed before its speed could be changed")
+            return
         vehicle.speed_request = value_perc
 
         print(f"Switch speed to {value_perc}. UUID: {uuid}")
         return
 
+    def get_speed_coalescing_statistics(self) -> dict:
+        return self._speed_coalescer.get_statistics()
+
     def request_lane_change_for(self, uuid: str, value: str) -> None:
         vehicle = self.get_vehicle_by_uuid(uuid)
         if value == "right":
@@ -0,0 +1,68 @@
+from typing import Callable, Dict, Tuple
+from threading import Lock
+
+from LocationService.DeadlineScheduler import DeadlineScheduler
+
+
+class InputCoalescer():
+    """
+    Coalesces bursts of inputs per key (e.g. per vehicle): the first input starts a short
+    window and only the last input submitted within it is applied, once the window ended.
+    Used for inputs where only the latest value matters, like the speed slider, so a burst
+    of events results in a single command. The inputs are applied one after another in
+    one worker thread, so inputs of the same key are applied in order.
+    Thread-safe
+    """
+    def __init__(self, window: float = 0.05):
+        """
+        window: time in seconds inputs are collected before the latest one is applied.
+            With 0 every input is applied immediately
+        """
+        self._window: float = window
+        # latest not yet applied input per key as (apply function, value)
+        self._pending: Dict[str, Tuple[Callable[[object], None], object]] = {}
+        self._mutex: Lock = Lock()
+        # applies the pending inputs once their window ended
+        self._scheduler: DeadlineScheduler = DeadlineScheduler("input_coalescer_thread")
+
+        self._submitted_count: int = 0
+        self._applied_count: int = 0
+
+    def submit(self, key: str, value, apply: Callable[[object], None]) -> None:
+        """
+        Submits an input. apply is called with the value, unless a newer input of the
+        same key is submitted before the window ends
+        """
+        if self._window <= 0:
+            with self._mutex:
+                self._submitted_count += 1
+                self._applied_count += 1
+            apply(value)
+            return
+        with self._mutex:
+            self._submitted_count += 1
+            window_running = key in self._pending
+            self._pending[key] = (apply, value)
+        if not window_running:
+            self._scheduler.schedule(key, self._window, lambda: self._apply_pending(key))
+
+    def _apply_pending(self, key: str) -> None:
+        with self._mutex:
+            # the key is dropped with its applied input, so finished windows leave nothing behind
+            entry = self._pending.pop(key, None)
+            if entry is None:
+                return
+            self._applied_count += 1
+        apply, value = entry
+        apply(value)
+
+    def get_statistics(self) -> dict:
+        """
+        Get the amount of submitted and applied inputs
+        """
+        with self._mutex:
+            return {
+                'submitted': self._submitted_count,
+                'applied': self._applied_count,
+                'coalesced': self._submitted_count - self._applied_count - len(self._pending)
+            }
@@ -6,32 +6,97 @@
 # and is released under the "Apache 2.0". Please see the LICENSE
 # file that should have been included as part of this package.
 #
+import os
+
+SERVER_MODE_DEVELOPMENT = 'development'
+SERVER_MODE_EVENTLET = 'eventlet'
+
+# eventlet has to replace the blocking parts of the standard library (threads, sockets, locks, ...) with green
+# versions before anything else imports them. The simulation, publisher and BLE threads then run as green threads
+# in the same event loop as the server, so they can emit without synchronizing with it. The BLE asyncio loop works
+# on the patched hub, since asyncio waits with the patched selectors.
+# The processes of SIMULATION_PROCESS=1 are spawned and import this file again as __mp_main__ with the inherited
+# SERVER_MODE. They don't serve clients, so they keep the real threads and a core of their own
+if os.environ.get('SERVER_MODE', SERVER_MODE_DEVELOPMENT) == SERVER_MODE_EVENTLET and __name__ != '__mp_main__':
+    import eventlet
+    eventlet.monkey_patch()
+
 import logging
 
 from VehicleManagement.VehicleController import VehicleController
 from VehicleManagement.FleetController import FleetController
+from VehicleManagement.VehicleControllerProcess import VehicleControllerProcess
 from VehicleMovementManagement.BehaviourController import BehaviourController
 from EnvironmentManagement.EnvironmentManager import EnvironmentManager
 from CyberSecurityManager.CyberSecurityManager import CyberSecurityManager
 from UserInterface.DriverUI import DriverUI
 from UserInterface.StaffUI import StaffUI
 from UserInterface.CarMap import CarMap
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.UpdatePublisher import UpdatePublisher
+from LocationService.SimulationProcess import SimulationProcess
+from LocationService.FleetStateBuffer import FleetStateWriter
+from LocationService.SimulationRecorder import SimulationRecorder
+from LocationService.TrackLoader import TrackLoader, DEFAULT_TRACK_FILE, get_default_track_cache_dir
 from flask import Flask
 from flask_socketio import SocketIO
 
-import os
 
-
-def main(admin_password: str):
+def create_app(server_mode: str = SERVER_MODE_DEVELOPMENT) -> tuple[Flask, SocketIO]:
+    """
+    Creates the Flask app and the SocketIO server for the given server mode.
+    development: Werkzeug development server with a thread per client
+    eventlet: eventlet WSGI server with green threads. Requires that the standard library
+        was monkey patched on import (SERVER_MODE=eventlet)
+    """
     app = Flask('IAV_Distortion', template_folder='UserInterface/templates', static_folder='UserInterface/static')
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
-    # Todo: using async_mode='threading' makes flask use the development server instead of the eventlet server.
-    #  change to use some production server
-
-    fleet_ctrl = FleetController()
-    environment_mng = EnvironmentManager(fleet_ctrl, socketio)
-    vehicles = environment_mng.get_vehicle_list()
-    behaviour_ctrl = BehaviourController(vehicles)
+    if server_mode == SERVER_MODE_EVENTLET:
+        socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+    else:
+        socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    return app, socketio
+
+
+def run_server(app: Flask, socketio: SocketIO, server_mode: str = SERVER_MODE_DEVELOPMENT, port: int = 5000):
+    if server_mode == SERVER_MODE_EVENTLET:
+        # no debug mode, since its reloader would start the simulation and BLE threads twice
+        socketio.run(app, host='0.0.0.0', port=port)
+    else:
+        socketio.run(app, debug=True, host='0.0.0.0', port=port, allow_unsafe_werkzeug=True)
+
+
+def main(admin_password: str, recording_path: str | None = None, binary_car_positions: bool = False,
+         server_mode: str = SERVER_MODE_DEVELOPMENT, simulation_process: bool = False, fleet_state_path: str | None = None,
+         track_file: str = DEFAULT_TRACK_FILE, track_cache_dir: str | None = None):
+    app, socketio = create_app(server_mode)
+    # fails on start instead of when the first car is added, if the track file is invalid
+    track = TrackLoader(track_cache_dir).load(track_file)
+
+    if simulation_process:
+        # the BLE I/O of the physical cars and the simulation of the virtual ones each run in an own process
+        fleet_ctrl = VehicleControllerProcess()
+        fleet_ctrl.start()
+        fleet_simulator = SimulationProcess()
+        fleet_simulator.start()
+    else:
+        fleet_ctrl = FleetController()
+        # the Socket.IO emits of the position updates are done by the publisher, so they can't stall the simulation
+        fleet_simulator = FleetSimulator(update_publisher=UpdatePublisher())
+    simulation_recorder = None
+    if recording_path is not None and simulation_process:
+        print("WARNING!!! The simulation can't be recorded while it runs in a separate process. Not recording.")
+    elif recording_path is not None:
+        # the state is only recorded once per second to keep the log of a whole day small
+        simulation_recorder = SimulationRecorder(recording_path, fleet_simulator,
+                                                 state_interval=fleet_simulator.get_simulation_ticks_per_second())
+    fleet_state_writer = None
+    if fleet_state_path is not None and simulation_process:
+        print("WARNING!!! The fleet state can't be shared while the simulation runs in a separate process. Not sharing.")
+    elif fleet_state_path is not None:
+        fleet_state_writer = FleetStateWriter(fleet_state_path, fleet_simulator)
+    environment_mng = EnvironmentManager(fleet_ctrl, socketio, fleet_simulator, simulation_recorder, binary_car_positions,
+                                         fleet_state_writer, track)
+    behaviour_ctrl = BehaviourController(environment_mng.get_vehicle_registry())
     cybersecurity_mng = CyberSecurityManager(behaviour_ctrl)
 
     driver_ui = DriverUI(behaviour_ctrl=behaviour_ctrl, environment_mng = environment_mng,socketio=socketio)
@@ -44,7 +109,7 @@ def main(admin_password: str):
     app.register_blueprint(driver_ui_blueprint, url_prefix='/driver')
     app.register_blueprint(staff_ui_blueprint, url_prefix='/staff')
     app.register_blueprint(car_map_blueprint, url_prefix='/car_map')
-    socketio.run(app, debug=True, host='0.0.0.0', allow_unsafe_werkzeug=True)
+    run_server(app, socketio, server_mode)
 
 
 if __name__ == '__main__':
@@ -55,5 +120,29 @@ if __name__ == '__main__':
               "Please change the password!")
         admin_pwd = '0000'
         
-    main(admin_pwd)
+    # records the virtual vehicles for a later replay with the SimulationReplayer
+    recording_path = os.environ.get('SIMULATION_RECORDING_PATH')
+
+    # sends the car positions to the car map in a compact binary format
+    binary_car_positions = os.environ.get('BINARY_CAR_POSITIONS') == '1'
+
+    # 'eventlet' serves the clients with the eventlet server instead of the Werkzeug development server
+    server_mode = os.environ.get('SERVER_MODE', SERVER_MODE_DEVELOPMENT)
+    if server_mode not in (SERVER_MODE_DEVELOPMENT, SERVER_MODE_EVENTLET):
+        print(f"WARNING!!! Unknown server mode '{server_mode}'. Using the development server.")
+        server_mode = SERVER_MODE_DEVELOPMENT
+
+    # simulates the virtual vehicles and runs the BLE I/O of the physical ones in separate processes, so load on the
+    # web server can't delay them
+    simulation_process = os.environ.get('SIMULATION_PROCESS') == '1'
+
+    # shares the state of the virtual vehicles after every tick in a memory mapped file (read it with the FleetStateReader)
+    fleet_state_path = os.environ.get('FLEET_STATE_PATH')
+
+    # track definition file (JSON list of track piece names) and the directory the compiled track is cached in
+    track_file = os.environ.get('TRACK_FILE', DEFAULT_TRACK_FILE)
+    track_cache_dir = os.environ.get('TRACK_CACHE_DIR', get_default_track_cache_dir())
+
+    main(admin_pwd, recording_path, binary_car_positions, server_mode, simulation_process, fleet_state_path,
+         track_file, track_cache_dir)
 
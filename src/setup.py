@@ -11,4 +11,5 @@ from setuptools import setup, find_packages
 
 setup(name='IAV Distortion',
       version='1.0.0',
-      packages=find_packages())
+      packages=find_packages(),
+      package_data={'LocationService': ['tracks/*.json']})
@@ -0,0 +1,46 @@
+"""
+Benchmarks for the simulation of many virtual cars. Run them from the src
+directory with `python -m pytest -s ../test/Benchmark/FleetSimulator_Benchmark.py`
+to see the measured times.
+"""
+import time
+import pytest
+
+from LocationService.LocationService import LocationService
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+from LocationService import VectorizedFleetEngine
+
+CAR_COUNT = 500
+TICKS_PER_SECOND = 24
+
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def measure_tick_time(use_vectorized_engine: bool) -> float:
+    """
+    Returns the average time in seconds that is needed to advance CAR_COUNT cars by one tick
+    """
+    track = TrackLoader().load()
+    fleet_simulator = FleetSimulator(TICKS_PER_SECOND, start_on_register=False, use_vectorized_engine=use_vectorized_engine)
+    for i in range(0, CAR_COUNT):
+        location_service = LocationService(track, do_nothing, simulation_ticks_per_second=TICKS_PER_SECOND)
+        location_service.set_speed_percent(50 + i % 50)
+        location_service.set_offset_int(i % 7 - 3)
+        fleet_simulator.register(location_service)
+    ticks = TICKS_PER_SECOND * 2
+    start = time.perf_counter()
+    for _ in range(0, ticks):
+        fleet_simulator._run_tick()
+    return (time.perf_counter() - start) / ticks
+
+@pytest.mark.parametrize("use_vectorized_engine", [(False), (True)])
+def test_fleet_tick_time(use_vectorized_engine: bool):
+    if use_vectorized_engine and not VectorizedFleetEngine.is_available():
+        pytest.skip("numpy isn't installed")
+    tick_time = measure_tick_time(use_vectorized_engine)
+    budget = 1 / TICKS_PER_SECOND
+    print(f"\n{CAR_COUNT} cars (vectorized: {use_vectorized_engine}): {tick_time * 1000:.2f} ms per tick, "
+          f"{tick_time / budget * 100:.1f}% of the tick budget")
@@ -0,0 +1,89 @@
+"""
+Benchmarks for the simulation of a single car. Run them from the src directory
+with `python -m pytest -s ../test/Benchmark/LocationService_Benchmark.py` to
+see the measured times.
+"""
+import sys
+import time
+import tracemalloc
+
+from LocationService.LocationService import LocationService
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+
+TICKS_PER_SECOND = 1
+SPEED = 1200
+STEPS = 5000
+
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def test_multi_piece_step_time():
+    """
+    At 1 tick per second and 1200 mm/s the car crosses multiple pieces in every step
+    """
+    location_service = LocationService(TrackLoader().load(), do_nothing, simulation_ticks_per_second=TICKS_PER_SECOND,
+                                       start_immeaditly=False)
+    location_service._set_speed_mm(SPEED, acceleration=SPEED)
+    transition_count = 0
+    start = time.perf_counter()
+    for _ in range(0, STEPS):
+        with location_service._value_mutex:
+            location_service._adjust_speed()
+            offset = location_service._actual_offset
+            distance = location_service._adjust_offset(location_service._actual_speed / TICKS_PER_SECOND)
+            _, _, transitions = location_service._run_simulation_step(distance, location_service._actual_offset != offset)
+        transition_count += len(transitions)
+    step_time = (time.perf_counter() - start) / STEPS
+    assert transition_count >= 2 * STEPS
+    print(f"\n{SPEED} mm/s at {TICKS_PER_SECOND} tick/s: {step_time * 1_000_000:.1f} us per step, "
+          f"{transition_count / STEPS:.2f} piece transitions per step")
+
+def count_trigo_objects_per_step(location_service: LocationService, steps: int) -> float:
+    """
+    Counts how many Position and Angle objects are created on average by a simulation step
+    """
+    created = 0
+
+    def profile(frame, event, arg):
+        nonlocal created
+        if event == 'call' and frame.f_code.co_name == '__init__' and frame.f_code in init_codes:
+            created += 1
+
+    init_codes = {Position.__init__.__code__, Angle.__init__.__code__}
+    sys.setprofile(profile)
+    try:
+        for _ in range(0, steps):
+            location_service._run_tick()
+    finally:
+        sys.setprofile(None)
+    return created / steps
+
+def test_step_allocations():
+    """
+    Allocations of the Trigo primitives per simulation step and the memory they need
+    """
+    location_service = LocationService(TrackLoader().load(), do_nothing, simulation_ticks_per_second=24, start_immeaditly=False)
+    location_service._set_speed_mm(800, acceleration=800)
+    location_service._set_offset_mm(22.25)
+    objects_per_step = count_trigo_objects_per_step(location_service, 1000)
+
+    location_service.do_uturn()
+    uturn_objects_per_step = count_trigo_objects_per_step(location_service, 24)
+
+    tracemalloc.start()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(0, 1000):
+        location_service._run_tick()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    positions = [Position(i, i) for i in range(0, 10000)]
+    angles = [Angle(i) for i in range(0, 10000)]
+    object_memory = tracemalloc.get_traced_memory()[0] - start_memory
+    tracemalloc.stop()
+    del positions, angles
+
+    print(f"\nPosition/Angle objects per step: {objects_per_step:.2f} (U-Turn: {uturn_objects_per_step:.2f}), "
+          f"peak memory of 1000 steps: {peak_memory - start_memory} bytes, "
+          f"memory per Position/Angle: {object_memory / 20000:.1f} bytes")
@@ -0,0 +1,164 @@
+"""
+Local load test of the server modes of main.py. For every mode a server is started
+in its own process with the same Flask-SocketIO setup main.py uses. It emits a probe
+event with the send time and a car_positions_batch sized payload to all clients at the
+simulation rate. Increasing amounts of clients are connected and receive the probes
+for a while; the emit latency is the time from the emit until a client received it.
+The highest amount of clients that could all connect with a p99 latency below the
+limit is reported as the maximum amount of concurrent clients.
+
+Requires the Socket.IO client with websocket support (pip install "python-socketio[client]").
+Run it from the src directory:
+python ../test/Benchmark/SocketIO_LoadTest.py [--modes development eventlet] [--max-clients 500]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import multiprocessing
+from typing import List, Tuple
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+PROBE_EVENT = 'load_test_probe'
+CAR_COUNT = 20
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def serve(mode: str, port: int, rate: int):
+    """
+    Runs the server. SERVER_MODE has to be set before, so main.py monkey patches eventlet
+    """
+    sys.path.insert(0, SRC_DIR)
+    import main
+
+    app, socketio = main.create_app(mode)
+    positions = [{'car': f'Virtual Vehicle {i}', 'position': {'x': 100.0 + i, 'y': 200.0 + i}, 'angle': 90.0}
+                 for i in range(0, CAR_COUNT)]
+
+    def emit_probes():
+        while True:
+            socketio.emit(PROBE_EVENT, {'sent': time.time(), 'positions': positions})
+            socketio.sleep(1 / rate)
+
+    socketio.start_background_task(emit_probes)
+    if mode == main.SERVER_MODE_EVENTLET:
+        socketio.run(app, host='127.0.0.1', port=port)
+    else:
+        # without the debug mode of main.py, since its reloader would start a second server
+        socketio.run(app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True)
+
+
+def run_clients(url: str, client_count: int, duration: float, result_queue):
+    """
+    Connects the clients, collects the latencies of the probes and puts
+    (connected clients, latencies) into the queue
+    """
+    import socketio
+
+    latencies: List[float] = []
+    clients = []
+    for _ in range(0, client_count):
+        client = socketio.Client(reconnection=False)
+        client.on(PROBE_EVENT, lambda data: latencies.append(time.time() - data['sent']))
+        try:
+            client.connect(url, transports=['websocket'], wait_timeout=10)
+            clients.append(client)
+        except Exception:
+            pass
+    # only measure while all clients are connected
+    time.sleep(1)
+    latencies.clear()
+    time.sleep(duration)
+    measured = list(latencies)
+    for client in clients:
+        client.disconnect()
+    result_queue.put((len(clients), measured))
+
+
+def measure(url: str, client_count: int, duration: float, client_processes: int) -> Tuple[int, List[float]]:
+    """
+    Connects the given amount of clients spread over multiple processes
+    returns: the amount of connected clients and all measured latencies
+    """
+    result_queue = multiprocessing.Queue()
+    processes = []
+    for i in range(0, client_processes):
+        count = client_count // client_processes + (1 if i < client_count % client_processes else 0)
+        if count == 0:
+            continue
+        process = multiprocessing.Process(target=run_clients, args=(url, count, duration, result_queue))
+        process.start()
+        processes.append(process)
+    connected = 0
+    latencies: List[float] = []
+    for _ in processes:
+        process_connected, process_latencies = result_queue.get()
+        connected += process_connected
+        latencies += process_latencies
+    for process in processes:
+        process.join()
+    return connected, latencies
+
+
+def run_mode(mode: str, args) -> int:
+    """
+    Runs the load test against a server in the given mode
+    returns: the highest amount of clients that passed
+    """
+    env = dict(os.environ, SERVER_MODE=mode)
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(args.port),
+                               '--rate', str(args.rate)], cwd=SRC_DIR, env=env)
+    max_clients = 0
+    try:
+        # wait for the server to listen
+        time.sleep(3)
+        url = f'http://127.0.0.1:{args.port}'
+        print(f"\n{mode}: clients | connected | p50 ms | p99 ms")
+        for client_count in range(args.step, args.max_clients + 1, args.step):
+            connected, latencies = measure(url, client_count, args.duration, args.client_processes)
+            if len(latencies) == 0:
+                print(f"{mode}: {client_count:7} | {connected:9} | no probes received")
+                break
+            p50 = percentile(latencies, 0.5) * 1000
+            p99 = percentile(latencies, 0.99) * 1000
+            print(f"{mode}: {client_count:7} | {connected:9} | {p50:6.1f} | {p99:6.1f}")
+            if connected < client_count or p99 > args.max_p99 * 1000:
+                break
+            max_clients = client_count
+    finally:
+        server.terminate()
+        server.wait()
+    return max_clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the server modes of main.py under load")
+    parser.add_argument('--modes', nargs='+', default=['development', 'eventlet'], help="server modes to test")
+    parser.add_argument('--max-clients', type=int, default=500, help="highest amount of concurrent clients")
+    parser.add_argument('--step', type=int, default=50, help="amount of clients added per round")
+    parser.add_argument('--duration', type=float, default=10, help="measured seconds per round")
+    parser.add_argument('--max-p99', type=float, default=0.1, help="highest acceptable p99 latency in seconds")
+    parser.add_argument('--rate', type=int, default=24, help="emitted probes per second")
+    parser.add_argument('--client-processes', type=int, default=4, help="processes the clients are spread over")
+    parser.add_argument('--port', type=int, default=5123)
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve, args.port, args.rate)
+        return
+
+    results = {mode: run_mode(mode, args) for mode in args.modes}
+    print()
+    for mode, max_clients in results.items():
+        print(f"{mode}: {max_clients} concurrent clients with a p99 emit latency below {args.max_p99 * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
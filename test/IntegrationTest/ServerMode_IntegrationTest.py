@@ -0,0 +1,214 @@
+"""
+Smoke tests of SERVER_MODE=eventlet. They run in own processes, so the monkey patching
+doesn't leak into the test process, and are skipped without eventlet. The server test
+starts main.py on port 5000 with SIMULATION_PROCESS=1 and talks Socket.IO over long
+polling, so it doesn't need a Socket.IO client library.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+import tempfile
+import importlib.util
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+from unittest import TestCase, skipUnless
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+PORT = 5000
+
+# The BLE I/O of bleak is asyncio socket I/O (D-Bus on Linux). A unix socket echo server on the loop stands in
+# for the car, while a green thread checks that the hub isn't blocked
+BLE_LOOP_SCRIPT = """
+import eventlet
+eventlet.monkey_patch()
+import os, sys, time, asyncio, tempfile, threading
+sys.path.insert(0, sys.argv[1])
+from VehicleManagement.BleEventLoop import BleEventLoop
+
+loop = BleEventLoop()
+path = os.path.join(tempfile.mkdtemp(), 'car')
+
+async def echo(reader, writer):
+    while data := await reader.readline():
+        writer.write(data)
+        await writer.drain()
+
+async def start_car():
+    return await asyncio.start_unix_server(echo, path)
+
+async def send_commands(count):
+    reader, writer = await asyncio.open_unix_connection(path)
+    for i in range(0, count):
+        writer.write(b'%i\\n' % i)
+        await writer.drain()
+        assert await reader.readline() == b'%i\\n' % i
+    writer.close()
+    return count
+
+ticks = []
+def tick():
+    for _ in range(0, 50):
+        ticks.append(time.monotonic())
+        time.sleep(0.005)
+
+loop.run(start_car(), timeout=5)
+ticker = threading.Thread(target=tick)
+ticker.start()
+print(loop.run(send_commands(500), timeout=20))
+ticker.join()
+print(max(b - a for a, b in zip(ticks, ticks[1:])))
+loop.stop()
+"""
+
+
+def is_eventlet_installed() -> bool:
+    return importlib.util.find_spec('eventlet') is not None
+
+
+def is_port_free(port: int) -> bool:
+    with socket.socket() as s:
+        return s.connect_ex(('127.0.0.1', port)) != 0
+
+
+class SocketIOPollingClient():
+    """
+    Minimal Socket.IO client (Engine.IO 4 long polling)
+    """
+    def __init__(self, base_url: str, cookie_jar: CookieJar | None = None):
+        self._base_url = base_url
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookie_jar or CookieJar()))
+        self._events = []
+        with self._opener.open(f'{base_url}/socket.io/?EIO=4&transport=polling', timeout=10) as response:
+            handshake = response.read().decode()
+        self._sid = json.loads(handshake[1:])['sid']
+        self._post('40')
+        self.wait_for(lambda: self._connected, 10)
+
+    @property
+    def _url(self) -> str:
+        return f'{self._base_url}/socket.io/?EIO=4&transport=polling&sid={self._sid}'
+
+    def _post(self, packet: str):
+        self._opener.open(urllib.request.Request(self._url, data=packet.encode(), method='POST'), timeout=10).read()
+
+    _connected = False
+
+    def _poll(self):
+        with self._opener.open(self._url, timeout=30) as response:
+            packets = response.read().decode().split('\x1e')
+        for packet in packets:
+            if packet == '2':
+                self._post('3')
+            elif packet.startswith('40'):
+                self._connected = True
+            elif packet.startswith('42'):
+                self._events.append(json.loads(packet[2:]))
+
+    def emit(self, event: str, *args):
+        self._post('42' + json.dumps([event, *args]))
+
+    def wait_for(self, condition, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            self._poll()
+        return True
+
+    def wait_for_event(self, event: str, timeout: float = 10):
+        found = []
+
+        def received() -> bool:
+            found.extend(e[1:] for e in self._events if e[0] == event)
+            return len(found) > 0
+        if not self.wait_for(received, timeout):
+            raise AssertionError(f"{event} wasn't received")
+        return found[0]
+
+
+@skipUnless(is_eventlet_installed(), "eventlet isn't installed")
+class ServerModeIntegrationTest(TestCase):
+
+    def test_ble_event_loop_runs_on_patched_hub(self):
+        # Act
+        result = subprocess.run([sys.executable, '-W', 'ignore', '-c', BLE_LOOP_SCRIPT, SRC_DIR],
+                                capture_output=True, text=True, timeout=60)
+
+        # Assert
+        assert result.returncode == 0, result.stderr
+        commands, max_tick_gap = result.stdout.split()
+        assert int(commands) == 500
+        assert float(max_tick_gap) < 0.1
+
+    @skipUnless(is_port_free(PORT), f"port {PORT} is in use")
+    def test_green_threads_in_eventlet_mode(self):
+        self._drive_virtual_vehicle(simulation_process=False)
+
+    @skipUnless(is_port_free(PORT), f"port {PORT} is in use")
+    def test_separate_processes_in_eventlet_mode(self):
+        self._drive_virtual_vehicle(simulation_process=True)
+
+    def _drive_virtual_vehicle(self, simulation_process: bool):
+        """
+        Adds a virtual vehicle as staff, drives it as player and checks that it moves. With
+        the separate processes, the cars are also scanned by the vehicle controller process
+        """
+        # Arrange
+        environment = {**os.environ, 'SERVER_MODE': 'eventlet', 'SIMULATION_PROCESS': '1' if simulation_process else '0',
+                       'ADMIN_PASSWORD': 'smoke', 'TRACK_CACHE_DIR': tempfile.mkdtemp()}
+        server = subprocess.Popen([sys.executable, '-W', 'ignore', 'main.py'], cwd=SRC_DIR, env=environment,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f'http://127.0.0.1:{PORT}'
+        try:
+            deadline = time.monotonic() + 30
+            while is_port_free(PORT):
+                assert server.poll() is None and time.monotonic() < deadline, "the server didn't start"
+                time.sleep(0.2)
+            cookie_jar = CookieJar()
+            login = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookie_jar))
+            login.open(f'{base_url}/staff/', data=urllib.parse.urlencode({'password': 'smoke'}).encode(), timeout=10)
+            staff = SocketIOPollingClient(base_url, cookie_jar)
+            driver = SocketIOPollingClient(base_url)
+
+            # Act
+            staff.emit('add_virtual_vehicle')
+            vehicle = staff.wait_for_event('device_added')[0]
+            found_cars = []
+            if simulation_process:
+                # scanned by the vehicle controller process. There's no BLE adapter needed for an (empty) answer
+                staff.emit('search_cars')
+                found_cars = staff.wait_for_event('new_devices', 60)[0]
+            driver.emit('handle_connect', {'player': 'smoke_player'})
+            time.sleep(1)
+            # like reloading the driver page, which assigns the waiting player to the free vehicle
+            urllib.request.urlopen(urllib.request.Request(f'{base_url}/driver/', headers={'Cookie': 'player=smoke_player'}),
+                                   timeout=10).read()
+            with urllib.request.urlopen(f'{base_url}/car_map/car_positions', timeout=10) as response:
+                start_position = json.load(response)[0]['position']
+            driver.emit('slider_changed', {'player': 'smoke_player', 'value': 80})
+            time.sleep(2)
+            with urllib.request.urlopen(f'{base_url}/car_map/car_positions', timeout=10) as response:
+                position = json.load(response)[0]['position']
+            children = [int(pid) for pid in open(f'/proc/{server.pid}/task/{server.pid}/children').read().split()] \
+                if os.path.exists(f'/proc/{server.pid}/task') else []
+            child_thread_counts = [len(os.listdir(f'/proc/{pid}/task')) for pid in children]
+
+            # Assert
+            assert vehicle == 'Virtual Vehicle 1'
+            assert isinstance(found_cars, list)
+            assert position != start_position
+            assert server.poll() is None
+            # the spawned processes aren't monkey patched, so the simulation has its real threads
+            if simulation_process and len(children) > 0:
+                assert max(child_thread_counts) > 1
+        finally:
+            server.terminate()
+            server.wait(10)
+            # the port is free again for the next test
+            deadline = time.monotonic() + 10
+            while not is_port_free(PORT) and time.monotonic() < deadline:
+                time.sleep(0.1)
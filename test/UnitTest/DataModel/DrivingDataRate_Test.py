@@ -0,0 +1,126 @@
+from threading import Event, Thread, active_count
+from time import sleep
+from unittest import TestCase
+from unittest.mock import Mock
+
+from DataModel.VirtualCar import VirtualCar
+from LocationService.TrackLoader import TrackLoader
+
+
+class DrivingDataRateTest(TestCase):
+
+    def setUp(self) -> None:
+        self.callback_mock = Mock()
+        self.mut = VirtualCar('Virtual Vehicle 1', TrackLoader().load(), Mock())
+        self.mut.player = 'Player 1'
+        self.mut.set_driving_data_callback(self.callback_mock)
+
+    def test_only_changes_are_sent(self):
+        # Arrange
+        self.mut.set_driving_data_rate(0)
+        self.mut._on_driving_data_change()
+        self.callback_mock.reset_mock()
+
+        # Act
+        self.mut._speed_actual = 42
+        self.mut._on_driving_data_change()
+        self.mut._on_driving_data_change()
+
+        # Assert
+        self.callback_mock.assert_called_once_with({'speed_actual': 42, 'vehicle_id': 'Virtual Vehicle 1',
+                                                    'player': 'Player 1'})
+
+    def test_first_update_is_complete(self):
+        # Act
+        self.mut._on_driving_data_change()
+
+        # Assert
+        self.callback_mock.assert_called_once_with(self.mut.get_driving_data())
+
+    def test_rate_limited_changes_are_sent_later(self):
+        # Arrange
+        self.mut.set_driving_data_rate(20)
+        self.mut._on_driving_data_change()
+        self.callback_mock.reset_mock()
+
+        # Act
+        for speed in range(1, 10):
+            self.mut._speed_actual = speed
+            self.mut._on_driving_data_change()
+        held_back_calls = self.callback_mock.call_count
+        sleep(0.2)
+
+        # Assert
+        assert held_back_calls == 0
+        self.callback_mock.assert_called_once_with({'speed_actual': 9, 'vehicle_id': 'Virtual Vehicle 1',
+                                                    'player': 'Player 1'})
+
+    def test_held_back_changes_start_no_threads(self):
+        # Arrange
+        other_car = VirtualCar('Virtual Vehicle 2', TrackLoader().load(), Mock())
+        other_callback_mock = Mock()
+        other_car.set_driving_data_callback(other_callback_mock)
+        for car in [self.mut, other_car]:
+            car.set_driving_data_rate(20)
+            car._on_driving_data_change()
+        thread_count = active_count()
+
+        # Act
+        for speed in range(1, 50):
+            for car in [self.mut, other_car]:
+                car._speed_actual = speed
+                car._on_driving_data_change()
+        burst_thread_count = active_count()
+        sleep(0.2)
+
+        # Assert
+        # at most the shared scheduler thread was started
+        assert burst_thread_count <= thread_count + 1
+        assert self.callback_mock.call_args.args[0]['speed_actual'] == 49
+        assert other_callback_mock.call_args.args[0]['speed_actual'] == 49
+
+    def test_hacking_scenario_is_sent_immediately(self):
+        # Arrange
+        self.mut.set_driving_data_rate(0.1)
+        self.mut._on_driving_data_change()
+        self.callback_mock.reset_mock()
+
+        # Act
+        self.mut.hacking_scenario = '1'
+
+        # Assert
+        self.callback_mock.assert_called_once_with({'active_hacking_scenario': '1', 'vehicle_id': 'Virtual Vehicle 1',
+                                                    'player': 'Player 1'})
+
+    def test_callback_is_called_without_holding_the_lock(self):
+        # Arrange
+        self.mut.set_driving_data_rate(0)
+        self.mut._on_driving_data_change()
+        emitting = Event()
+        release = Event()
+        sent = []
+
+        def slow_callback(changes: dict):
+            sent.append(changes)
+            emitting.set()
+            release.wait(1)
+        self.mut.set_driving_data_callback(slow_callback)
+        self.mut._speed_actual = 1
+        sender = Thread(target=self.mut._on_driving_data_change)
+        sender.start()
+        emitting.wait(1)
+
+        # Act
+        lock_is_free = self.mut._driving_data_mutex.acquire(timeout=0.5)
+        if lock_is_free:
+            self.mut._driving_data_mutex.release()
+        self.mut._speed_actual = 2
+        self.mut._on_driving_data_change()
+        calls_while_emitting = len(sent)
+        release.set()
+        sender.join(1)
+
+        # Assert
+        assert lock_is_free
+        assert calls_while_emitting == 1
+        assert [changes['speed_actual'] for changes in sent] == [1, 2]
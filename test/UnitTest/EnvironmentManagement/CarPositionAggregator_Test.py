@@ -0,0 +1,154 @@
+import json
+import struct
+from unittest import TestCase
+from unittest.mock import Mock
+
+from flask_socketio import SocketIO
+
+from EnvironmentManagement.CarPositionAggregator import CarPositionAggregator
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.Track import TrackPieceType
+from LocationService.TrackLoader import TrackLoader
+from LocationService.TrackPieces import TrackBuilder
+
+
+def dumps(value) -> str:
+    # Socket.IO serializes compact
+    return json.dumps(value, separators=(',', ':'))
+
+
+def get_position(car: str, x: float) -> dict:
+    return {'car': car, 'position': {'x': x, 'y': 2.5}, 'angle': 90.0}
+
+
+class CarPositionAggregatorTest(TestCase):
+
+    def setUp(self) -> None:
+        self.socketio_mock = Mock(spec=SocketIO)
+        self.fleet_simulator = FleetSimulator(start_on_register=False)
+        self.mut = CarPositionAggregator(self.socketio_mock, self.fleet_simulator)
+
+    def test_one_batch_per_tick(self):
+        # Act
+        self.mut.add_position(get_position('car 1', 1))
+        self.mut.add_position(get_position('car 2', 2))
+        self.mut.add_position(get_position('car 1', 3))
+        self.fleet_simulator._run_due_ticks()
+
+        # Assert
+        self.socketio_mock.emit.assert_called_once_with('car_positions_batch', [get_position('car 1', 3),
+                                                                                get_position('car 2', 2)])
+
+    def test_empty_tick_sends_nothing(self):
+        # Act
+        self.mut.flush()
+
+        # Assert
+        self.socketio_mock.emit.assert_not_called()
+
+    def test_statistics(self):
+        # Arrange
+        positions = [get_position(f'car {i}', i) for i in range(0, 20)]
+
+        # Act
+        for position in positions:
+            self.mut.add_position(position)
+        self.mut.flush()
+        statistics = self.mut.get_statistics()
+
+        # Assert
+        single_bytes = sum(len('42' + dumps(['car_positions', p])) for p in positions)
+        batch_bytes = len('42' + dumps(['car_positions_batch', positions]))
+        assert statistics['batches'] == 1
+        assert statistics['positions'] == 20
+        assert statistics['packets_saved'] == 19
+        assert statistics['bytes_saved'] == single_bytes - batch_bytes
+
+
+class BinaryCarPositionAggregatorTest(TestCase):
+
+    def setUp(self) -> None:
+        self.socketio_mock = Mock(spec=SocketIO)
+        self.fleet_simulator = FleetSimulator(start_on_register=False)
+        self.mut = CarPositionAggregator(self.socketio_mock, self.fleet_simulator, use_binary_encoding=True)
+
+    def test_id_table_and_records(self):
+        # Act
+        self.mut.add_position({'car': 'car 1', 'position': {'x': 1.4, 'y': 2.6}, 'angle': 359.996})
+        self.mut.add_position({'car': 'car 2', 'position': {'x': -5, 'y': 40000}, 'angle': 90.123})
+        self.mut.flush()
+
+        # Assert
+        self.socketio_mock.on_event.assert_called_once_with('request_car_position_ids', self.mut.get_id_table)
+        assert self.socketio_mock.emit.call_count == 2
+        self.socketio_mock.emit.assert_any_call('car_position_ids', {'version': 1, 'ids': ['car 1', 'car 2']})
+        event, frame = self.socketio_mock.emit.call_args_list[1].args
+        assert event == 'car_positions_binary'
+        assert frame == struct.pack('<H', 1) + struct.pack('<HhhH', 0, 1, 3, 0) + struct.pack('<HhhH', 1, -5, 32767, 9012)
+
+    def test_id_table_is_only_sent_on_change(self):
+        # Arrange
+        self.mut.add_position(get_position('car 1', 1))
+        self.mut.flush()
+        self.socketio_mock.reset_mock()
+
+        # Act
+        self.mut.add_position(get_position('car 1', 2))
+        self.mut.flush()
+
+        # Assert
+        self.socketio_mock.emit.assert_called_once()
+        assert self.socketio_mock.emit.call_args.args[0] == 'car_positions_binary'
+        assert self.mut.get_id_table() == {'version': 1, 'ids': ['car 1']}
+
+    def test_index_of_removed_car_is_reused(self):
+        # Arrange
+        for car in ['car 1', 'car 2', 'car 3']:
+            self.mut.add_position(get_position(car, 1))
+        self.mut.flush()
+
+        # Act
+        self.mut.remove_car('car 2')
+        self.mut.remove_car('car 3')
+        self.mut.add_position(get_position('car 4', 1))
+        self.mut.flush()
+
+        # Assert
+        assert self.mut.get_id_table() == {'version': 2, 'ids': ['car 1', 'car 4']}
+        event, frame = self.socketio_mock.emit.call_args.args
+        assert event == 'car_positions_binary'
+        assert frame[2:4] == struct.pack('<H', 1)
+
+    def test_track_that_does_not_fit_is_sent_as_json(self):
+        # Arrange
+        builder = TrackBuilder()
+        for _ in range(0, 60):
+            builder.append(TrackPieceType.STRAIGHT_WE)
+        builder.append(TrackPieceType.CURVE_WS).append(TrackPieceType.CURVE_NW)
+        for _ in range(0, 60):
+            builder.append(TrackPieceType.STRAIGHT_EW)
+        builder.append(TrackPieceType.CURVE_EN).append(TrackPieceType.CURVE_SE)
+
+        # Act
+        fitting = CarPositionAggregator(Mock(spec=SocketIO), self.fleet_simulator, True, TrackLoader().load())
+        too_large = CarPositionAggregator(self.socketio_mock, self.fleet_simulator, True, builder.build())
+        too_large.add_position(get_position('car 1', 1))
+        too_large.flush()
+
+        # Assert
+        assert fitting._use_binary_encoding
+        self.socketio_mock.emit.assert_called_once_with('car_positions_batch', [get_position('car 1', 1)])
+
+    def test_statistics(self):
+        # Arrange
+        positions = [get_position(f'car {i}', i) for i in range(0, 20)]
+
+        # Act
+        for position in positions:
+            self.mut.add_position(position)
+        self.mut.flush()
+
+        # Assert
+        single_bytes = sum(len('42' + dumps(['car_positions', p])) for p in positions)
+        binary_bytes = len('451-' + dumps(['car_positions_binary', {'_placeholder': True, 'num': 0}])) + 2 + 20 * 8
+        assert self.mut.get_statistics()['bytes_saved'] == single_bytes - binary_bytes
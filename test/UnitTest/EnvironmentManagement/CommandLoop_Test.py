@@ -0,0 +1,69 @@
+from threading import Thread, current_thread
+from unittest import TestCase
+
+from EnvironmentManagement.CommandLoop import CommandLoop
+
+
+class CommandLoopTest(TestCase):
+
+    def setUp(self) -> None:
+        self.mut = CommandLoop("test_command_loop")
+
+    def tearDown(self) -> None:
+        self.mut.stop()
+
+    def test_commands_of_all_threads_run_in_loop_thread(self):
+        # Arrange
+        threads_of_commands = set()
+        counter = [0]
+
+        def increment():
+            threads_of_commands.add(current_thread().name)
+            # not atomic, so lost updates would show up if commands ran in parallel
+            value = counter[0]
+            counter[0] = value + 1
+
+        def submit_many():
+            for _ in range(0, 200):
+                self.mut.execute(increment)
+        threads = [Thread(target=submit_many) for _ in range(0, 8)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert counter[0] == 1600
+        assert threads_of_commands == {"test_command_loop"}
+
+    def test_results_and_exceptions_are_returned(self):
+        # Arrange
+        def fail():
+            raise ValueError("failed")
+
+        # Act
+        result = self.mut.execute(lambda a, b: a + b, 1, 2)
+
+        # Assert
+        assert result == 3
+        with self.assertRaises(ValueError):
+            self.mut.execute(fail)
+        assert self.mut.execute(lambda: 4) == 4
+
+    def test_nested_commands_run_immediately(self):
+        # Act
+        result = self.mut.execute(lambda: self.mut.execute(lambda: 5) + 1)
+
+        # Assert
+        assert result == 6
+
+    def test_stopped_loop_ignores_commands(self):
+        # Act
+        self.mut.stop()
+        future = self.mut.submit(lambda: 1)
+
+        # Assert
+        assert not self.mut.is_running()
+        assert future.result() is None
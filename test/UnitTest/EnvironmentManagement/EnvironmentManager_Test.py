@@ -0,0 +1,91 @@
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from EnvironmentManagement.EnvironmentManager import EnvironmentManager
+from LocationService.FleetSimulator import FleetSimulator
+
+
+class EnvironmentManagerTest(TestCase):
+
+    def setUp(self) -> None:
+        self.fleet_simulator = FleetSimulator()
+        self.mut = EnvironmentManager(MagicMock(), MagicMock(), self.fleet_simulator)
+        self.mut.set_staff_ui(MagicMock())
+
+    def tearDown(self) -> None:
+        self.fleet_simulator.stop()
+
+    def test_players_get_vehicles_in_order(self):
+        # Arrange
+        self.mut.add_player('player 1')
+        self.mut.add_player('player 2')
+
+        # Act
+        name = self.mut.add_virtual_vehicle()
+        snapshot = self.mut.get_snapshot()
+
+        # Assert
+        assert name == 'Virtual Vehicle 1'
+        assert snapshot.mapped_cars == (('player 1', 'Virtual Vehicle 1'),)
+        assert snapshot.waiting_players == ('player 2',)
+        assert snapshot.free_cars == ()
+        assert self.mut.get_car_from_player('player 1').get_vehicle_id() == 'Virtual Vehicle 1'
+
+    def test_snapshots_are_not_changed(self):
+        # Arrange
+        self.mut.add_player('player 1')
+        old_snapshot = self.mut.get_snapshot()
+
+        # Act
+        self.mut.remove_player_from_waitlist('player 1')
+
+        # Assert
+        assert old_snapshot.waiting_players == ('player 1',)
+        assert self.mut.get_snapshot().waiting_players == ()
+
+    def test_concurrent_players_are_queued_consistently(self):
+        # Arrange
+        self.mut.add_virtual_vehicle()
+        self.mut.add_virtual_vehicle()
+
+        def join_and_leave(thread_number: int):
+            for i in range(0, 50):
+                player = f'player {thread_number} {i}'
+                self.mut.update_queues_and_get_vehicle(player)
+                if i % 2 == 0:
+                    self.mut.remove_player_from_waitlist(player)
+        threads = [Thread(target=join_and_leave, args=(n,)) for n in range(0, 8)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        snapshot = self.mut.get_snapshot()
+
+        # Assert
+        players = [player for player, _ in snapshot.mapped_cars] + list(snapshot.waiting_players)
+        assert len(snapshot.mapped_cars) == 2
+        assert len(players) == len(set(players))
+        # the players with an even number left the queue, the first two players got the vehicles
+        odd_mapped_count = sum(1 for p, _ in snapshot.mapped_cars if int(p.split()[-1]) % 2 == 1)
+        assert all(int(p.split()[-1]) % 2 == 1 for p in snapshot.waiting_players)
+        assert len(snapshot.waiting_players) == 8 * 25 - odd_mapped_count
+
+    def test_removed_vehicle_is_pruned_from_position_aggregator(self):
+        # Arrange
+        self.mut = EnvironmentManager(MagicMock(), MagicMock(), self.fleet_simulator, binary_car_positions=True)
+        self.mut.set_staff_ui(MagicMock())
+        name = self.mut.add_virtual_vehicle()
+        aggregator = self.mut.get_position_aggregator()
+        aggregator.add_position({'car': name, 'position': {'x': 1, 'y': 2}, 'angle': 0})
+        aggregator.flush()
+        aggregator.add_position({'car': name, 'position': {'x': 1, 'y': 2}, 'angle': 0})
+
+        # Act
+        self.mut.remove_vehicle(name)
+
+        # Assert
+        assert aggregator.get_id_table()['ids'] == []
+        assert aggregator._positions == {}
@@ -0,0 +1,83 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from DataModel.Vehicle import Vehicle
+from EnvironmentManagement.VehicleRegistry import VehicleRegistry
+
+
+def get_vehicle_mock(vehicle_id: str) -> Mock:
+    vehicle_mock = Mock(spec=Vehicle)
+    vehicle_mock.vehicle_id = vehicle_id
+    vehicle_mock.player = None
+    vehicle_mock.get_player.side_effect = lambda: vehicle_mock.player
+    vehicle_mock.is_free.side_effect = lambda: vehicle_mock.player is None
+    vehicle_mock.set_player.side_effect = lambda player: setattr(vehicle_mock, 'player', player)
+    vehicle_mock.remove_player.side_effect = lambda: setattr(vehicle_mock, 'player', None)
+    return vehicle_mock
+
+
+class VehicleRegistryTest(TestCase):
+
+    def setUp(self) -> None:
+        self.vehicle_1 = get_vehicle_mock('Virtual Vehicle 1')
+        self.vehicle_2 = get_vehicle_mock('Virtual Vehicle 2')
+        self.mut = VehicleRegistry([self.vehicle_1, self.vehicle_2])
+
+    def test_vehicles_are_found_by_id(self):
+        # Act
+        added_twice = self.mut.add_vehicle(get_vehicle_mock('Virtual Vehicle 1'))
+
+        # Assert
+        assert not added_twice
+        assert self.mut.get_vehicle('Virtual Vehicle 2') is self.vehicle_2
+        assert self.mut.get_vehicle('Virtual Vehicle 3') is None
+        assert self.mut.get_vehicles() == [self.vehicle_1, self.vehicle_2]
+
+    def test_assigned_players_are_indexed(self):
+        # Act
+        assigned = self.mut.assign_player(self.vehicle_2, 'player 1')
+        assigned_twice = self.mut.assign_player(self.vehicle_1, 'player 1')
+
+        # Assert
+        assert assigned
+        assert not assigned_twice
+        assert self.vehicle_2.player == 'player 1'
+        assert self.mut.get_vehicle_by_player('player 1') is self.vehicle_2
+        assert self.mut.get_free_vehicles() == [self.vehicle_1]
+
+    def test_released_and_removed_vehicles_free_the_player(self):
+        # Arrange
+        self.mut.assign_player(self.vehicle_1, 'player 1')
+        self.mut.assign_player(self.vehicle_2, 'player 2')
+
+        # Act
+        released = self.mut.release_player('player 1')
+        removed = self.mut.remove_vehicle('Virtual Vehicle 2')
+
+        # Assert
+        assert released is self.vehicle_1
+        assert removed is self.vehicle_2
+        assert self.vehicle_1.player is None
+        assert self.vehicle_2.player is None
+        assert self.mut.get_vehicle_by_player('player 1') is None
+        assert self.mut.get_vehicle_by_player('player 2') is None
+        assert self.mut.get_vehicle('Virtual Vehicle 2') is None
+        assert self.mut.remove_vehicle('Virtual Vehicle 2') is None
+
+    def test_queue_keeps_order_of_waiting_players(self):
+        # Arrange
+        for player in ['player 1', 'player 2', 'player 3', 'player 4']:
+            self.mut.enqueue_player(player)
+
+        # Act
+        enqueued_twice = self.mut.enqueue_player('player 3')
+        removed = self.mut.remove_waiting_player('player 2')
+        removed_twice = self.mut.remove_waiting_player('player 2')
+        first = self.mut.pop_waiting_player()
+
+        # Assert
+        assert not enqueued_twice
+        assert removed
+        assert not removed_twice
+        assert first == 'player 1'
+        assert self.mut.get_waiting_players() == ['player 3', 'player 4']
@@ -0,0 +1,48 @@
+import time
+from threading import Event
+
+from LocationService.DeadlineScheduler import DeadlineScheduler
+
+
+def test_callbacks_run_in_deadline_order():
+    scheduler = DeadlineScheduler()
+    called = []
+    done = Event()
+    scheduler.schedule('late', 0.1, lambda: (called.append('late'), done.set()))
+    scheduler.schedule('early', 0.02, lambda: called.append('early'))
+    assert done.wait(1)
+    assert called == ['early', 'late']
+    assert not scheduler.is_scheduled('late')
+
+def test_key_is_scheduled_once():
+    """
+    Test that a key keeps its first callback until it ran and can be scheduled again afterwards
+    """
+    scheduler = DeadlineScheduler()
+    called = []
+    done = Event()
+    assert scheduler.schedule('car', 0.02, lambda: (called.append(1), done.set()))
+    assert not scheduler.schedule('car', 0.01, lambda: called.append(2))
+    assert done.wait(1)
+    done.clear()
+    assert scheduler.schedule('car', 0.01, lambda: (called.append(3), done.set()))
+    assert done.wait(1)
+    assert called == [1, 3]
+
+def test_cancelled_callback_is_not_called():
+    scheduler = DeadlineScheduler()
+    called = []
+    done = Event()
+    scheduler.schedule('cancelled', 0.02, lambda: called.append('cancelled'))
+    scheduler.cancel('cancelled')
+    scheduler.schedule('other', 0.05, lambda: (called.append('other'), done.set()))
+    assert done.wait(1)
+    assert called == ['other']
+
+def test_failing_callback_does_not_stop_the_worker():
+    scheduler = DeadlineScheduler()
+    done = Event()
+    scheduler.schedule('failing', 0, lambda: 1 / 0)
+    time.sleep(0.02)
+    scheduler.schedule('other', 0, done.set)
+    assert done.wait(1)
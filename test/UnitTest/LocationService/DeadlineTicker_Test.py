@@ -0,0 +1,68 @@
+import time
+from threading import Event
+
+from LocationService.DeadlineTicker import DeadlineTicker, OverrunPolicy
+
+def test_waits_for_deadline():
+    """
+    Test that the ticker keeps a fixed rate independent of the time a tick takes
+    """
+    ticker = DeadlineTicker(50)
+    stop_event = Event()
+    start = time.monotonic()
+    for i in range(0, 10):
+        assert ticker.wait_for_next_tick(stop_event) == 1
+        # simulate some work that would slow down a sleep based loop
+        time.sleep(0.01)
+    # 10 ticks at 50 Hz: the first one is immediately, the last after 9 intervals
+    assert time.monotonic() - start < 9 / 50 + 0.05
+    assert ticker.statistics.overrun_count == 0
+
+def test_catch_up():
+    """
+    Test that missed ticks are run additionally up to the configured limit
+    """
+    ticker = DeadlineTicker(10, OverrunPolicy.CATCH_UP, max_catch_up_ticks=3)
+    stop_event = Event()
+    ticker.wait_for_next_tick(stop_event)
+    # pretend the last tick took 0.35 s: the next tick and 2 further ones are due
+    ticker._next_deadline -= 0.35
+    assert ticker.wait_for_next_tick(stop_event) == 3
+    # pretend the last tick took 1 s: only 3 of 10 missed ticks are caught up
+    ticker._next_deadline -= 1.1
+    assert ticker.wait_for_next_tick(stop_event) == 4
+    assert ticker.statistics.overrun_count == 2
+    assert ticker.statistics.caught_up_ticks == 5
+    assert ticker.statistics.skipped_ticks == 7
+
+def test_skip():
+    """
+    Test that missed ticks are dropped with OverrunPolicy.SKIP
+    """
+    ticker = DeadlineTicker(10, OverrunPolicy.SKIP)
+    stop_event = Event()
+    ticker.wait_for_next_tick(stop_event)
+    ticker._next_deadline -= 0.35
+    assert ticker.wait_for_next_tick(stop_event) == 1
+    assert ticker.statistics.skipped_ticks == 2
+    # the schedule continues in the future instead of running the missed ticks later
+    assert ticker._next_deadline > time.monotonic()
+
+def test_stop_interrupts_waiting():
+    ticker = DeadlineTicker(1)
+    stop_event = Event()
+    ticker.wait_for_next_tick(stop_event)
+    stop_event.set()
+    start = time.monotonic()
+    assert ticker.wait_for_next_tick(stop_event) == 0
+    assert time.monotonic() - start < 0.5
+
+def test_statistics_summary():
+    ticker = DeadlineTicker(10)
+    ticker.statistics.record_tick(0.02, 0.03)
+    ticker.statistics.record_tick(0.04, 0.01)
+    summary = ticker.statistics.get_summary()
+    assert summary['tick_count'] == 2
+    assert summary['max_step_time'] == 0.04
+    assert summary['avg_callback_time'] == 0.02
+    assert summary['load'] == 0.5
@@ -0,0 +1,66 @@
+import time
+
+from LocationService.TrackPieces import TrackBuilder, FullTrack
+from LocationService.LocationService import LocationService
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.Track import TrackPieceType
+from LocationService.Trigo import Position, Angle
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def get_two_straight_pieces() -> FullTrack:
+    track = TrackBuilder()\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .build()
+    return track
+
+def test_register_and_tick():
+    """
+    Test that a single tick advances all registered cars and nothing else
+    """
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=1, start_on_register=False)
+    registered = LocationService(get_two_straight_pieces(), do_nothing, simulation_ticks_per_second=1)
+    other = LocationService(get_two_straight_pieces(), do_nothing, simulation_ticks_per_second=1)
+    not_registered = LocationService(get_two_straight_pieces(), do_nothing, simulation_ticks_per_second=1)
+    for location_service in [registered, other, not_registered]:
+        location_service._set_speed_mm(10, acceleration=10)
+
+    assert fleet_simulator.register(registered)
+    assert fleet_simulator.register(other)
+    assert fleet_simulator.get_registered_count() == 2
+    fleet_simulator._run_tick()
+    assert registered._progress_on_current_piece == 10
+    assert other._progress_on_current_piece == 10
+    assert not_registered._progress_on_current_piece == 0
+
+    assert fleet_simulator.unregister(other)
+    fleet_simulator._run_tick()
+    assert registered._progress_on_current_piece == 20
+    assert other._progress_on_current_piece == 10
+    assert not fleet_simulator.unregister(other)
+
+def test_register_rejects_invalid():
+    """
+    Test that double registrations and different tick rates are rejected
+    """
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=24, start_on_register=False)
+    location_service = LocationService(get_two_straight_pieces(), do_nothing, simulation_ticks_per_second=24)
+    assert fleet_simulator.register(location_service)
+    assert not fleet_simulator.register(location_service)
+    other_rate = LocationService(get_two_straight_pieces(), do_nothing, simulation_ticks_per_second=10)
+    assert not fleet_simulator.register(other_rate)
+    assert fleet_simulator.get_registered_count() == 1
+
+def test_thread_runs_callbacks():
+    """
+    Test that the simulation thread gets started on registration and calls the update callbacks
+    """
+    calls = []
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=100)
+    location_service = LocationService(get_two_straight_pieces(), lambda pos, angle, data: calls.append(data), simulation_ticks_per_second=100)
+    fleet_simulator.register(location_service)
+    time.sleep(0.2)
+    fleet_simulator.stop()
+    assert len(calls) > 0
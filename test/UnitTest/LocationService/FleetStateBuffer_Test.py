@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+from LocationService.TrackPieces import TrackBuilder, FullTrack
+from LocationService.LocationService import LocationService
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.Clock import VirtualClock
+from LocationService.FleetStateBuffer import FleetStateWriter, FleetStateReader, _SEQUENCE
+from LocationService.Track import TrackPieceType
+from LocationService.Trigo import Position, Angle
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def get_two_straight_pieces() -> FullTrack:
+    track = TrackBuilder()\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .build()
+    return track
+
+def create_fleet(path: str, slot_count: int = 8):
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=1, start_on_register=False, clock=VirtualClock())
+    writer = FleetStateWriter(path, fleet_simulator, slot_count=slot_count, max_cars=4)
+    location_service = LocationService(get_two_straight_pieces(), do_nothing, simulation_ticks_per_second=1)
+    location_service._set_speed_mm(10, acceleration=10)
+    fleet_simulator.register(location_service)
+    writer.add_car(location_service, 'Virtual Vehicle 1')
+    return fleet_simulator, writer, location_service
+
+def test_reader_gets_state_of_every_tick():
+    """
+    Test that the reader gets the frames with the state the cars had after the tick
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fleet_state')
+        fleet_simulator, writer, location_service = create_fleet(path)
+        reader = FleetStateReader(path)
+        assert reader.read_latest() is None
+        assert reader.get_car_names() == {0: 'Virtual Vehicle 1'}
+
+        fleet_simulator._run_due_ticks()
+        fleet_simulator._run_due_ticks()
+        frames = reader.read_new_frames()
+
+        assert [frame.tick for frame in frames] == [1, 2]
+        car = frames[-1].cars[0]
+        position, angle = location_service.get_position_and_angle()
+        assert (car.index, car.x, car.y, car.angle) == (0, position.get_x(), position.get_y(), angle.get_deg())
+        assert car.speed == 10
+        assert reader.read_new_frames() == []
+        assert reader.read_latest() == frames[-1]
+
+        writer.remove_car(location_service)
+        fleet_simulator._run_due_ticks()
+        assert reader.read_latest().cars == []
+        assert reader.get_car_names() == {}
+        reader.close()
+        writer.close()
+
+def test_slow_reader_misses_overwritten_frames():
+    """
+    Test that frames overwritten in the ring buffer are counted as missed
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fleet_state')
+        fleet_simulator, writer, _ = create_fleet(path, slot_count=4)
+        reader = FleetStateReader(path)
+
+        for _ in range(0, 10):
+            fleet_simulator._run_due_ticks()
+        frames = reader.read_new_frames()
+
+        assert [frame.frame_number for frame in frames] == [7, 8, 9, 10]
+        assert reader.missed_frames == 6
+        assert reader.read_frame(3) is None
+        reader.close()
+        writer.close()
+
+def test_frame_in_progress_is_not_read():
+    """
+    Test that a frame isn't returned while its sequence number shows that it's written
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fleet_state')
+        fleet_simulator, writer, _ = create_fleet(path)
+        fleet_simulator._run_due_ticks()
+        reader = FleetStateReader(path)
+        slot_offset = writer._slots_offset + (1 % writer._slot_count) * writer._slot_size
+
+        _SEQUENCE.pack_into(writer._buffer, slot_offset, 1)
+
+        assert reader.read_frame(1) is None
+        reader.close()
+        writer.close()
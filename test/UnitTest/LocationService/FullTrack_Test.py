@@ -0,0 +1,112 @@
+import json
+import pytest
+
+from LocationService.TrackPieces import TrackBuilder, FullTrack
+from LocationService.LocationService import LocationService
+from LocationService.Track import TrackPieceType
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def get_piece_lengths(track: FullTrack, offset: float) -> list[float]:
+    return [track.get_entry_tupel(i)[0].get_length(offset) for i in range(0, track.get_len())]
+
+@pytest.mark.parametrize("offset", [(0), (22.25), (-66.75), (10), (-31), (90)])
+def test_track_length(offset: float):
+    """
+    Test the length of a lap on and between the lanes
+    """
+    track = TrackLoader().load()
+    assert track.get_track_length(offset) == pytest.approx(sum(get_piece_lengths(track, offset)))
+
+@pytest.mark.parametrize("direction", [(1), (-1)])
+def test_heading_points_along_the_movement(direction: int):
+    """
+    Test that the heading read from the pieces matches the direction of short steps in both directions
+    """
+    location_service = LocationService(TrackLoader().load(), do_nothing, start_immeaditly=False)
+    location_service._actual_offset = 22.25
+    location_service._direction_mult = direction
+    # the first step moves the car onto its lane
+    location_service._run_simulation_step(direction)
+    for _ in range(0, 3000):
+        old_position = location_service._current_position
+        position, heading, _ = location_service._run_simulation_step(direction, offset_changed=False)
+        expected = position.calculate_angle_to(old_position).get_deg()
+        assert (heading.get_deg() - expected + 180) % 360 - 180 == pytest.approx(0, abs=0.2)
+
+@pytest.mark.parametrize("offset", [(0), (44.5), (-12), (70)])
+def test_location_round_trip(offset: float):
+    """
+    Test mapping locations to distances and back
+    """
+    track = TrackLoader().load()
+    lengths = get_piece_lengths(track, offset)
+    distance = 0.0
+    for piece_index, length in enumerate(lengths):
+        for progress in [length * 0.01, length / 3, length * 0.99]:
+            assert track.get_distance_for_location(piece_index, progress, offset) == pytest.approx(distance + progress)
+            found_index, found_progress = track.get_location_for_distance(distance + progress, offset)
+            assert found_index == piece_index
+            assert found_progress == pytest.approx(progress)
+        distance += length
+
+def test_distance_wraps_around():
+    track = TrackLoader().load()
+    track_length = track.get_track_length(0)
+    assert track.get_location_for_distance(2 * track_length + 10, 0) == pytest.approx((0, 10))
+    index, progress = track.get_location_for_distance(-10, 0)
+    assert index == track.get_len() - 1
+    assert progress == pytest.approx(get_piece_lengths(track, 0)[-1] - 10)
+    assert track.get_distance_between((track.get_len() - 1, 0), (0, 5), 0) == pytest.approx(get_piece_lengths(track, 0)[-1] + 5)
+
+def test_large_track():
+    """
+    Test the lookup on a track with hundreds of pieces
+    """
+    builder = TrackBuilder()
+    for _ in range(0, 500):
+        builder.append(TrackPieceType.STRAIGHT_WE)
+    track = builder.build()
+    length = TrackBuilder().STRAIGHT_PIECE_LENGTH
+    index, progress = track.get_location_for_distance(length * 321.5, 0)
+    assert index == 321
+    assert progress == pytest.approx(length / 2)
+
+def test_distance_between_cars():
+    track = TrackLoader().load()
+    first_car = LocationService(track, do_nothing, simulation_ticks_per_second=1, start_immeaditly=False)
+    second_car = LocationService(track, do_nothing, simulation_ticks_per_second=1, start_immeaditly=False)
+    first_car._set_speed_mm(700, acceleration=700)
+    first_car._run_simulation_step_threadsafe()
+    assert second_car.get_distance_to(first_car) == pytest.approx(700)
+    assert first_car.get_distance_to(second_car) == pytest.approx(track.get_track_length(0) - 700)
+    assert first_car.get_track_distance() == pytest.approx(700)
+
+@pytest.mark.parametrize("offset", [(0), (22.25), (-44.5)])
+def test_predict_position(offset: float):
+    """
+    Test that the predicted position matches the simulated one at a constant speed
+    """
+    location_service = LocationService(TrackLoader().load(), do_nothing, simulation_ticks_per_second=1, start_immeaditly=False)
+    location_service._set_speed_mm(300, acceleration=300)
+    location_service._set_offset_mm(offset)
+    # reach the target speed and offset first
+    for _ in range(0, 5):
+        location_service._run_simulation_step_threadsafe()
+    predicted = location_service.predict_position(4)
+    for _ in range(0, 4):
+        position, _ = location_service._run_simulation_step_threadsafe()
+    assert predicted.distance_to(position) < 0.001
+
+def test_serialized_track_is_cached():
+    """
+    Test that the JSON of the track matches get_as_list and is only serialized once
+    """
+    track = TrackLoader().load()
+    serialized = track.get_as_json()
+    assert json.loads(serialized) == track.get_as_list()
+    assert track.get_as_json() is serialized
+    assert track.get_etag() == TrackLoader().load().get_etag()
@@ -0,0 +1,76 @@
+import time
+from threading import Event
+
+from LocationService.Clock import VirtualClock
+from LocationService.DeadlineTicker import DeadlineTicker
+from LocationService.HeadlessRunner import HeadlessRunner
+from LocationService.TrackLoader import TrackLoader
+from LocationService.LocationService import LocationService
+from LocationService.Trigo import Position, Angle
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def test_virtual_clock():
+    clock = VirtualClock(5)
+    stop_event = Event()
+    assert clock.wait(2.5, stop_event) == False
+    assert clock.now() == 7.5
+    # time can't go backwards
+    clock.advance(-1)
+    assert clock.now() == 7.5
+    stop_event.set()
+    assert clock.wait(1, stop_event) == True
+    assert clock.now() == 7.5
+
+def test_ticker_with_virtual_clock():
+    """
+    Test that the ticker keeps its schedule on the virtual time without sleeping
+    """
+    clock = VirtualClock()
+    ticker = DeadlineTicker(10, clock=clock)
+    stop_event = Event()
+    start = time.monotonic()
+    for _ in range(0, 1000):
+        assert ticker.wait_for_next_tick(stop_event) == 1
+    assert time.monotonic() - start < 1
+    assert abs(clock.now() - 99.9) < 1e-6
+    assert ticker.statistics.overrun_count == 0
+
+def test_headless_runner():
+    """
+    Test that a 10 minute race is simulated faster than real time
+    """
+    runner = HeadlessRunner(3, simulation_ticks_per_second=24)
+    report = runner.run(600)
+    assert report['ticks'] == 600 * 24
+    assert report['updates'] == 600 * 24 * 3
+    assert report['wall_time'] < 60
+    # consecutive runs continue the schedule
+    assert runner.run(1)['ticks'] == 24
+
+def test_headless_runner_matches_manual_steps():
+    """
+    Test that the runner simulates the same as stepping the cars manually
+    """
+    runner = HeadlessRunner(2, simulation_ticks_per_second=24)
+    runner.run(30)
+    track = TrackLoader().load()
+    for i, simulated in enumerate(runner.get_location_services()):
+        location_service = LocationService(track, do_nothing, simulation_ticks_per_second=24)
+        location_service.set_speed_percent(50 + i % 50)
+        location_service.set_offset_int(i % 7 - 3)
+        for _ in range(0, 30 * 24):
+            location_service._run_simulation_step_threadsafe()
+        assert simulated.get_track_location() == location_service.get_track_location()
+
+def test_location_service_thread_with_virtual_clock():
+    updates = []
+    location_service = LocationService(TrackLoader().load(), lambda pos, angle, data: updates.append(pos),
+                                       simulation_ticks_per_second=24, clock=VirtualClock())
+    location_service.set_speed_percent(50)
+    location_service.start()
+    time.sleep(0.2)
+    location_service.stop()
+    # in real time 0.2 s would be about 5 ticks
+    assert len(updates) > 100
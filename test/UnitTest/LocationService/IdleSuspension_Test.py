@@ -0,0 +1,92 @@
+import time
+import pytest
+
+from LocationService.LocationService import LocationService
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+from LocationService import VectorizedFleetEngine
+
+class UpdateCounter():
+    def __init__(self):
+        self.count = 0
+
+    def on_update(self, pos: Position, angle: Angle, data: dict):
+        self.count += 1
+
+def test_parked_car_is_suspended():
+    """
+    Test that a parked car sends a single update and is woken up by inputs
+    """
+    counter = UpdateCounter()
+    location_service = LocationService(TrackLoader().load(), counter.on_update)
+    for _ in range(0, 10):
+        location_service._run_tick()
+    assert counter.count == 1
+    assert location_service.is_suspended()
+
+    location_service.set_speed_percent(50)
+    assert not location_service.is_suspended()
+    for _ in range(0, 10):
+        location_service._run_tick()
+    assert counter.count == 11
+
+    # braking to a stop suspends the car again
+    location_service.set_speed_percent(0, acceleration=100000)
+    for _ in range(0, 10):
+        location_service._run_tick()
+    assert counter.count == 12
+    assert location_service.is_suspended()
+
+@pytest.mark.parametrize("wake_up", [("offset"), ("uturn")])
+def test_other_inputs_wake_up(wake_up: str):
+    counter = UpdateCounter()
+    location_service = LocationService(TrackLoader().load(), counter.on_update)
+    location_service._run_tick()
+    assert location_service.is_suspended()
+    if wake_up == "offset":
+        location_service.set_offset_int(2)
+    else:
+        location_service.do_uturn()
+    assert not location_service.is_suspended()
+    location_service._run_tick()
+    assert counter.count == 2
+
+def test_suspended_thread_wakes_up():
+    counter = UpdateCounter()
+    location_service = LocationService(TrackLoader().load(), counter.on_update, simulation_ticks_per_second=50)
+    location_service.start()
+    time.sleep(0.2)
+    assert counter.count == 1
+    location_service.set_speed_percent(50)
+    time.sleep(0.2)
+    # the suspended time isn't caught up
+    assert 5 < counter.count < 15
+    location_service.set_speed_percent(0, acceleration=100000)
+    time.sleep(0.1)
+    start = time.monotonic()
+    location_service.stop()
+    assert time.monotonic() - start < 0.5
+
+@pytest.mark.parametrize("use_vectorized_engine", [(False), (True)])
+def test_fleet_skips_suspended_cars(use_vectorized_engine: bool):
+    if use_vectorized_engine and not VectorizedFleetEngine.is_available():
+        pytest.skip("numpy isn't installed")
+    track = TrackLoader().load()
+    fleet_simulator = FleetSimulator(24, start_on_register=False, use_vectorized_engine=use_vectorized_engine)
+    parked_counter = UpdateCounter()
+    driving_counter = UpdateCounter()
+    parked = LocationService(track, parked_counter.on_update)
+    driving = LocationService(track, driving_counter.on_update)
+    driving.set_speed_percent(50)
+    fleet_simulator.register(parked)
+    fleet_simulator.register(driving)
+    for _ in range(0, 10):
+        fleet_simulator._run_tick()
+    assert parked_counter.count == 1
+    assert driving_counter.count == 10
+    parked.set_speed_percent(30)
+    for _ in range(0, 10):
+        fleet_simulator._run_tick()
+    assert parked_counter.count == 11
+    assert parked.get_track_distance() > 0
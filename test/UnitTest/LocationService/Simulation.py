@@ -178,3 +178,25 @@ def test_position_rotation():
     # now we are on a straight piece again and should point right
     _, rot = location_service._run_simulation_step_threadsafe()
     assert rot.get_deg() == 270
+
+@pytest.mark.parametrize("direction_mult", [(1), (-1)])
+def test_many_transitions_in_one_step(direction_mult: int):
+    """
+    Test that a single step can cross many pieces and reports every transition
+    """
+    track = get_loop_track()
+    location_service = LocationService(track, do_nothing, simulation_ticks_per_second=1, start_immeaditly=False)
+    location_service._direction_mult = direction_mult
+    if direction_mult == -1:
+        location_service._progress_on_current_piece = track.get_entry_tupel(0)[0].get_length(0)
+    lap_length = sum(track.get_entry_tupel(i)[0].get_length(0) for i in range(0, track.get_len()))
+    # three laps and half of the first piece
+    distance = 3 * lap_length + STRAIGHT_PIECE_LENGTH() / 2
+    _, _, transitions = location_service._run_simulation_step(distance * direction_mult)
+    assert len(transitions) == 3 * track.get_len()
+    assert transitions[0] == (0, 1 if direction_mult == 1 else track.get_len() - 1)
+    for (previous_piece, new_piece), (next_previous_piece, _) in zip(transitions, transitions[1:]):
+        assert new_piece == next_previous_piece
+        assert new_piece == (previous_piece + direction_mult) % track.get_len()
+    assert location_service._current_piece_index == 0
+    assert location_service._progress_on_current_piece == pytest.approx(STRAIGHT_PIECE_LENGTH() / 2)
@@ -0,0 +1,54 @@
+import time
+
+from LocationService.LocationService import LocationService
+from LocationService.SimulationProcess import SimulationProcess
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+
+def wait_for(condition, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_cars_are_simulated_in_other_process():
+    """
+    Test that inputs reach the simulation process and its updates are written back
+    into the mirrored LocationService
+    """
+    received = []
+    ticks = []
+    simulation_process = SimulationProcess()
+    simulation_process.add_tick_listener(ticks.append)
+    simulation_process.start()
+    try:
+        location_service = LocationService(TrackLoader().load(), lambda pos, rot, data: received.append((pos, data)))
+        start_position, _ = location_service.get_position_and_angle()
+        assert simulation_process.register(location_service)
+        assert not simulation_process.register(location_service)
+
+        location_service.set_speed_percent(50)
+        assert wait_for(lambda: len(received) > 5 and received[-1][1]['speed'] > 0)
+
+        position, _ = location_service.get_position_and_angle()
+        assert position.distance_to(start_position) > 0
+        assert location_service._step_count == 0
+        assert len(ticks) > 0
+
+        assert simulation_process.unregister(location_service)
+        assert location_service._input_listener is None
+        assert not simulation_process.unregister(location_service)
+    finally:
+        simulation_process.stop()
+    assert not simulation_process.is_running()
+
+def test_register_requires_running_process():
+    """
+    Test that LocationServices can't be registered before the process was started
+    """
+    simulation_process = SimulationProcess()
+    location_service = LocationService(TrackLoader().load(), None)
+    assert not simulation_process.register(location_service)
+    assert simulation_process.get_registered_count() == 0
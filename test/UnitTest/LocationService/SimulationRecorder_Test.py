@@ -0,0 +1,103 @@
+import os
+import time
+import random
+from threading import Thread
+
+from LocationService.Clock import VirtualClock
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.TrackLoader import TrackLoader
+from LocationService.LocationService import LocationService
+from LocationService.SimulationRecorder import SimulationRecorder, SimulationReplayer
+from LocationService.Trigo import Position, Angle
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def create_fleet(track, car_count: int) -> tuple:
+    fleet_simulator = FleetSimulator(24, start_on_register=False, clock=VirtualClock())
+    cars = []
+    for _ in range(0, car_count):
+        location_service = LocationService(track, do_nothing, simulation_ticks_per_second=24)
+        fleet_simulator.register(location_service)
+        cars.append(location_service)
+    return (fleet_simulator, cars)
+
+def test_replay_is_bit_identical(tmp_path):
+    track = TrackLoader().load()
+    fleet_simulator, cars = create_fleet(track, 3)
+    path = os.path.join(tmp_path, 'race.log')
+    recorder = SimulationRecorder(path, fleet_simulator)
+    for car in cars:
+        recorder.add_car(car)
+    cars[0].set_speed_percent(60)
+    cars[1].set_speed_percent(35, 500)
+    cars[1].set_offset_int(2)
+    fleet_simulator.run_for(3)
+    cars[0].set_offset_int(3)
+    cars[2].set_speed_percent(80)
+    fleet_simulator.run_for(2)
+    cars[0].do_uturn()
+    cars[1].set_offset_int(-3)
+    fleet_simulator.run_for(5)
+    recorder.remove_car(cars[2])
+    fleet_simulator.run_for(1)
+    recorder.close()
+
+    result = SimulationReplayer(path, track).replay()
+    assert result['cars'] == 3
+    assert result['ticks'] == 11 * 24
+    assert result['compared_states'] == 10 * 24 * 3 + 24 * 2
+    assert result['mismatches'] == 0
+    assert result['first_mismatch'] is None
+
+def test_replay_with_concurrent_inputs(tmp_path):
+    """
+    Test inputs that arrive from another thread while the simulation is running
+    """
+    track = TrackLoader().load()
+    fleet_simulator, cars = create_fleet(track, 4)
+    path = os.path.join(tmp_path, 'race.log')
+    recorder = SimulationRecorder(path, fleet_simulator, state_interval=5)
+    for car in cars:
+        recorder.add_car(car)
+
+    def send_inputs():
+        rng = random.Random(4)
+        for _ in range(0, 300):
+            car = rng.choice(cars)
+            match rng.randint(0, 9):
+                case 0:
+                    car.do_uturn()
+                case 1 | 2 | 3 | 4:
+                    car.set_offset_int(rng.randint(-3, 3))
+                case _:
+                    car.set_speed_percent(rng.randint(0, 100))
+            time.sleep(0.0005)
+
+    input_thread = Thread(target=send_inputs)
+    input_thread.start()
+    while input_thread.is_alive():
+        fleet_simulator.run_for(1)
+    input_thread.join()
+    recorder.close()
+
+    result = SimulationReplayer(path, track).replay()
+    assert result['compared_states'] > 0
+    assert result['mismatches'] == 0
+
+def test_replay_detects_differences(tmp_path):
+    track = TrackLoader().load()
+    fleet_simulator, cars = create_fleet(track, 1)
+    path = os.path.join(tmp_path, 'race.log')
+    recorder = SimulationRecorder(path, fleet_simulator)
+    recorder.add_car(cars[0])
+    cars[0].set_speed_percent(50)
+    fleet_simulator.run_for(1)
+    # changes that don't go through the recorded inputs
+    cars[0]._set_speed_mm(1000)
+    fleet_simulator.run_for(1)
+    recorder.close()
+
+    result = SimulationReplayer(path, track).replay()
+    assert result['mismatches'] > 0
+    assert result['first_mismatch'] == (25, 0)
@@ -0,0 +1,120 @@
+import os
+import json
+import stat
+import pytest
+
+from LocationService.Track import TrackPiece, TrackPieceType
+from LocationService.TrackLoader import TrackLoader, parse_track_definition, validate_track_closure
+
+LOOP = ["STRAIGHT_WE", "CURVE_WS", "CURVE_NW", "STRAIGHT_EW", "CURVE_EN", "CURVE_SE"]
+LONG_LOOP = ["STRAIGHT_WE", "STRAIGHT_WE", "CURVE_WS", "CURVE_NW", "STRAIGHT_EW", "STRAIGHT_EW", "CURVE_EN", "CURVE_SE"]
+
+def write_definition(directory, pieces: list) -> str:
+    path = os.path.join(directory, 'track.json')
+    with open(path, 'w') as definition_file:
+        definition_file.write('{"name": "Test", "pieces": [' + ', '.join(f'"{p}"' for p in pieces) + ']}')
+    return path
+
+def test_default_track_is_the_loop(tmp_path):
+    """
+    Test that the default track file contains the loop that was hard coded before
+    """
+    track = TrackLoader().load()
+    assert track.get_len() == 6
+    assert track.get_as_list() == TrackLoader().load(write_definition(tmp_path, LOOP)).get_as_list()
+
+def test_parse_rejects_unknown_pieces():
+    """
+    Test that unknown piece names and malformed files are rejected
+    """
+    assert parse_track_definition('{"pieces": ["STRAIGHT_WE"]}') == [TrackPieceType.STRAIGHT_WE]
+    assert parse_track_definition('["STRAIGHT_WE", "CURVE_WS"]') == [TrackPieceType.STRAIGHT_WE, TrackPieceType.CURVE_WS]
+    with pytest.raises(ValueError):
+        parse_track_definition('{"pieces": ["STRAIGHT_XY"]}')
+    with pytest.raises(ValueError):
+        parse_track_definition('{"name": "Loop"}')
+    with pytest.raises(ValueError):
+        parse_track_definition('{"pieces": ')
+
+@pytest.mark.parametrize("pieces", [
+    (["STRAIGHT_WE", "CURVE_WS", "CURVE_NW", "STRAIGHT_EW", "CURVE_EN"]),
+    (["STRAIGHT_WE", "STRAIGHT_NS"]),
+    (["STRAIGHT_WE", "CURVE_WS", "CURVE_NW", "STRAIGHT_EW", "STRAIGHT_EW", "CURVE_EN", "CURVE_SE"]),
+    ([])
+])
+def test_open_tracks_are_rejected(pieces: list):
+    """
+    Test that tracks with unconnected pieces or that don't end at the first piece are rejected
+    """
+    with pytest.raises(ValueError):
+        validate_track_closure([TrackPieceType[p] for p in pieces])
+
+def test_closed_tracks_are_accepted():
+    """
+    Test that the loop and a longer loop are accepted
+    """
+    validate_track_closure([TrackPieceType[p] for p in LOOP])
+    validate_track_closure([TrackPieceType[p] for p in LONG_LOOP])
+
+def test_compiled_track_is_cached(tmp_path, monkeypatch):
+    """
+    Test that the compiled track is read from the cache when the file didn't change
+    """
+    definition_path = write_definition(tmp_path, LONG_LOOP)
+    cache_dir = os.path.join(tmp_path, 'cache')
+    first = TrackLoader(cache_dir).load(definition_path)
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+    # the cache only holds data, the tables of the 6 piece types of the 8 pieces
+    with open(os.path.join(cache_dir, cache_files[0])) as cache_file:
+        assert sorted(json.load(cache_file)['lookup_tables']) == sorted(set(LONG_LOOP))
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+
+    # computing the lookup tables again would fail
+    def fail(*args):
+        raise AssertionError("the lookup tables were computed again")
+    monkeypatch.setattr(TrackPiece, 'precompute_lookup_tables', fail)
+    cached = TrackLoader(cache_dir).load(definition_path)
+    assert cached.get_as_list() == first.get_as_list()
+    assert cached.get_track_length(0) == pytest.approx(first.get_track_length(0))
+    for progress in [0, 100, 300.5]:
+        for offset in [0, 10, -44.5]:
+            cached_position = cached.get_entry_tupel(1)[0].get_position(progress, offset)
+            position = first.get_entry_tupel(1)[0].get_position(progress, offset)
+            assert cached_position.distance_to(position) == 0
+
+def test_broken_cache_is_ignored(tmp_path):
+    """
+    Test that an unreadable cache file results in compiling the track again
+    """
+    definition_path = write_definition(tmp_path, LOOP)
+    cache_dir = os.path.join(tmp_path, 'cache')
+    TrackLoader(cache_dir).load(definition_path)
+    cache_file = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+    with open(cache_file, 'wb') as broken:
+        broken.write(b'broken')
+    track = TrackLoader(cache_dir).load(definition_path)
+    assert track.get_len() == 6
+
+@pytest.mark.skipif(not hasattr(os, 'getuid') or os.getuid() != 0, reason="changing the owner requires root")
+def test_cache_of_other_user_is_not_used(tmp_path):
+    """
+    Test that a cache directory that belongs to another user is neither read nor written
+    """
+    definition_path = write_definition(tmp_path, LOOP)
+    cache_dir = os.path.join(tmp_path, 'cache')
+    os.makedirs(cache_dir, mode=0o777)
+    os.chown(cache_dir, 12345, 12345)
+    track = TrackLoader(cache_dir).load(definition_path)
+    assert track.get_len() == 6
+    assert os.listdir(cache_dir) == []
+
+def test_own_cache_dir_is_restricted(tmp_path):
+    """
+    Test that the access to an existing own cache directory is restricted to the user
+    """
+    cache_dir = os.path.join(tmp_path, 'cache')
+    os.makedirs(cache_dir)
+    os.chmod(cache_dir, 0o777)
+    TrackLoader(cache_dir).load(write_definition(tmp_path, LOOP))
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
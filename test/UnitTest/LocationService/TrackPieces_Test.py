@@ -0,0 +1,64 @@
+import pytest
+
+from LocationService.TrackPieces import TrackBuilder
+from LocationService.Track import TrackPieceType
+
+@pytest.mark.parametrize("piece_type", list(TrackPieceType))
+@pytest.mark.parametrize("offset", [(0), (22.25), (-66.75), (10), (-31.3), (100)])
+def test_lookup_table_matches_calculation(piece_type: TrackPieceType, offset: float):
+    """
+    Test that the interpolated positions of the lookup tables match the calculated ones,
+    also between the lanes and outside of them
+    """
+    track = TrackBuilder().append(piece_type).build()
+    piece, _ = track.get_entry_tupel(0)
+    length = piece.get_length(offset)
+    for i in range(0, 200):
+        progress = length * i / 199
+        expected = piece._calculate_position(progress, offset)
+        assert piece.get_position(progress, offset).distance_to(expected) < 1e-6
+
+@pytest.mark.parametrize("piece_type,start,end", [
+    (TrackPieceType.STRAIGHT_WE, 90, 90),
+    (TrackPieceType.STRAIGHT_EW, 270, 270),
+    (TrackPieceType.CURVE_WS, 90, 180),
+    (TrackPieceType.CURVE_NW, 180, 270)
+])
+def test_heading(piece_type: TrackPieceType, start: float, end: float):
+    """
+    Test the heading at the start and the end of pieces
+    """
+    track = TrackBuilder().append(piece_type).build()
+    piece, _ = track.get_entry_tupel(0)
+    for offset in [0, 22.25, -40]:
+        assert piece.get_heading(0, offset).get_deg() == pytest.approx(start, abs=0.01)
+        assert piece.get_heading(piece.get_length(offset), offset).get_deg() == pytest.approx(end, abs=0.01)
+
+@pytest.mark.parametrize("piece_type", list(TrackPieceType))
+@pytest.mark.parametrize("offset", [(0), (22.25), (-31.3)])
+def test_heading_of_pose_matches_calculation(piece_type: TrackPieceType, offset: float):
+    """
+    Test that the heading of get_pose() matches the one calculated from the positions
+    """
+    track = TrackBuilder().append(piece_type).build()
+    piece, _ = track.get_entry_tupel(0)
+    length = piece.get_length(offset)
+    for i in range(0, 50):
+        progress = length * i / 49
+        expected = piece._calculate_position(progress + 0.001, offset).calculate_angle_to(
+            piece._calculate_position(progress - 0.001, offset)).get_deg()
+        _, _, heading = piece.get_pose(progress, offset)
+        assert (heading - expected + 180) % 360 - 180 == pytest.approx(0, abs=1e-6)
+
+def test_pieces_of_a_type_share_the_lookup_tables():
+    track = TrackBuilder()\
+        .append(TrackPieceType.STRAIGHT_WE)\
+        .append(TrackPieceType.STRAIGHT_WE)\
+        .append(TrackPieceType.CURVE_WS)\
+        .build()
+    first, _ = track.get_entry_tupel(0)
+    second, _ = track.get_entry_tupel(1)
+    curve, _ = track.get_entry_tupel(2)
+    assert second.get_lookup_tables()['x'] is first.get_lookup_tables()['x']
+    assert curve.get_lookup_tables()['x'] is not first.get_lookup_tables()['x']
+    assert second.get_position(100, 22.25).distance_to(second._calculate_position(100, 22.25)) < 1e-6
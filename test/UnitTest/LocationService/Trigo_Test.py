@@ -0,0 +1,45 @@
+import math
+import pytest
+
+from LocationService.Trigo import Position, Angle
+
+@pytest.mark.parametrize("degree", [(0), (30), (90), (271.5), (-45)])
+def test_cached_trig(degree: float):
+    angle = Angle(degree)
+    assert angle.get_sin() == pytest.approx(math.sin(math.radians(degree)))
+    assert angle.get_cos() == pytest.approx(math.cos(math.radians(degree)))
+    x, y = angle.get_as_x_y()
+    assert x == pytest.approx(math.cos(math.radians(degree - 90)))
+    assert y == pytest.approx(math.sin(math.radians(degree - 90)))
+
+def test_set_deg_invalidates_cache():
+    angle = Angle(0)
+    assert angle.get_sin() == pytest.approx(0)
+    angle.set_deg(90)
+    assert angle.get_sin() == pytest.approx(1)
+    assert angle.get_cos() == pytest.approx(0)
+
+def test_in_place_arithmetic():
+    position = Position(1, 2)
+    other = Position(10, 20)
+    position.add_position(other)
+    assert (position.get_x(), position.get_y()) == (11, 22)
+    position.subtract_position(other)
+    assert (position.get_x(), position.get_y()) == (1, 2)
+    position.copy_from(other)
+    assert (position.get_x(), position.get_y()) == (10, 20)
+    # other isn't changed
+    assert (other.get_x(), other.get_y()) == (10, 20)
+
+def test_slots():
+    with pytest.raises(AttributeError):
+        Position().z = 1
+    with pytest.raises(AttributeError):
+        Angle().rad = 1
+
+def test_angle_and_distance():
+    position = Position(0, 0)
+    assert position.distance_to(Position(3, 4)) == pytest.approx(5)
+    # the LocationService uses new_pos.calculate_angle_to(old_pos) as heading
+    assert Position(0, -1).calculate_angle_to(position).get_deg() == pytest.approx(0)
+    assert Position(1, 0).calculate_angle_to(position).get_deg() == pytest.approx(90)
@@ -0,0 +1,91 @@
+import time
+import threading
+
+from LocationService.TrackPieces import TrackBuilder, FullTrack
+from LocationService.LocationService import LocationService
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.UpdatePublisher import UpdatePublisher
+from LocationService.Track import TrackPieceType
+from LocationService.Trigo import Position, Angle
+
+def get_two_straight_pieces() -> FullTrack:
+    track = TrackBuilder()\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .append(TrackPieceType.STRAIGHT_EW)\
+        .build()
+    return track
+
+def test_updates_are_coalesced():
+    """
+    Test that only the newest update of a car is sent, if the emitter didn't keep up
+    """
+    received = []
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=1, start_on_register=False, update_publisher=UpdatePublisher())
+    location_service = LocationService(get_two_straight_pieces(), lambda pos, rot, data: received.append(pos.get_x()),
+                                       simulation_ticks_per_second=1)
+    location_service._set_speed_mm(10, acceleration=10)
+    fleet_simulator.register(location_service)
+
+    for _ in range(0, 3):
+        fleet_simulator._run_tick()
+    assert received == []
+
+    publisher = fleet_simulator.get_update_publisher()
+    publisher.start()
+    deadline = time.monotonic() + 2
+    while publisher.get_statistics()['delivered'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    publisher.stop()
+
+    assert received == [location_service.get_position_and_angle()[0].get_x()]
+    assert publisher.get_statistics() == {'published': 3, 'delivered': 1, 'coalesced': 2, 'dropped': 0}
+
+def test_updates_are_copies():
+    """
+    Test that the simulation can't change an update that wasn't sent yet
+    """
+    publisher = UpdatePublisher()
+    pos = Position(1, 2)
+    rot = Angle(90)
+    publisher.publish(object(), pos, rot, {})
+    pos.set_x_y(5, 5)
+    rot.set_deg(180)
+    (sent_pos, sent_rot, _), = publisher._pending.values()
+    assert (sent_pos.get_x(), sent_pos.get_y(), sent_rot.get_deg()) == (1, 2, 90)
+
+def test_slow_callback_does_not_stall_simulation():
+    """
+    Test that the simulation keeps running while a callback blocks the emitter thread
+    """
+    release = threading.Event()
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=24, start_on_register=False, update_publisher=UpdatePublisher())
+    location_service = LocationService(get_two_straight_pieces(), lambda pos, rot, data: release.wait(2),
+                                       simulation_ticks_per_second=24)
+    location_service._set_speed_mm(10, acceleration=10)
+    fleet_simulator.register(location_service)
+    fleet_simulator.get_update_publisher().start()
+
+    start = time.perf_counter()
+    for _ in range(0, 10):
+        fleet_simulator._run_tick()
+    duration = time.perf_counter() - start
+    release.set()
+    fleet_simulator.get_update_publisher().stop()
+
+    assert duration < 1
+    assert location_service._step_count == 10
+
+def test_unregister_drops_pending_update():
+    """
+    Test that the update of a removed car isn't sent anymore
+    """
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=1, start_on_register=False, update_publisher=UpdatePublisher())
+    location_service = LocationService(get_two_straight_pieces(), lambda pos, rot, data: None, simulation_ticks_per_second=1)
+    location_service._set_speed_mm(10, acceleration=10)
+    fleet_simulator.register(location_service)
+    fleet_simulator._run_tick()
+
+    fleet_simulator.unregister(location_service)
+
+    assert location_service._update_publisher is None
+    assert fleet_simulator.get_update_publisher().get_statistics()['dropped'] == 1
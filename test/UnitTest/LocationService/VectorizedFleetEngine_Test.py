@@ -0,0 +1,66 @@
+import pytest
+
+from LocationService.Track import FullTrack
+from LocationService.LocationService import LocationService
+from LocationService.FleetSimulator import FleetSimulator
+from LocationService.TrackLoader import TrackLoader
+from LocationService.Trigo import Position, Angle
+
+pytest.importorskip("numpy")
+
+
+def do_nothing(pos: Position, angle: Angle, data: dict):
+    pass
+
+def create_fleet(track: FullTrack, use_vectorized_engine: bool):
+    fleet_simulator = FleetSimulator(simulation_ticks_per_second=24, start_on_register=False,
+                                     use_vectorized_engine=use_vectorized_engine)
+    location_services = []
+    for speed, offset in [(0, 0), (30, 1), (50, -2), (100, 3), (75, -3)]:
+        location_service = LocationService(track, do_nothing, simulation_ticks_per_second=24)
+        location_service.set_speed_percent(speed)
+        location_service.set_offset_int(offset)
+        fleet_simulator.register(location_service)
+        location_services.append(location_service)
+    return fleet_simulator, location_services
+
+@pytest.mark.parametrize("ticks", [(1), (50), (500)])
+def test_matches_scalar_simulation(ticks: int):
+    """
+    Test that the vectorized engine calculates the same results as the scalar implementation
+    """
+    track = TrackLoader().load()
+    scalar_sim, scalar_cars = create_fleet(track, False)
+    vector_sim, vector_cars = create_fleet(track, True)
+    assert vector_sim._vectorized_engine is not None
+    for i in range(0, ticks):
+        if i == ticks // 2:
+            # U-Turns are simulated by the scalar fallback
+            scalar_cars[3].do_uturn()
+            vector_cars[3].do_uturn()
+        scalar_sim._run_tick()
+        vector_sim._run_tick()
+
+    for scalar, vector in zip(scalar_cars, vector_cars):
+        assert vector._current_piece_index == scalar._current_piece_index
+        assert vector._progress_on_current_piece == pytest.approx(scalar._progress_on_current_piece, abs=1e-6)
+        assert vector._actual_offset == pytest.approx(scalar._actual_offset, abs=1e-6)
+        assert vector._actual_speed == pytest.approx(scalar._actual_speed)
+        assert vector._direction_mult == scalar._direction_mult
+        assert vector._current_position.distance_to(scalar._current_position) < 1e-6
+        assert vector._stop_direction.get_deg() == pytest.approx(scalar._stop_direction.get_deg(), abs=1e-6)
+
+def test_unregister():
+    """
+    Test that unregistered cars keep their state and aren't advanced anymore
+    """
+    fleet_simulator, location_services = create_fleet(TrackLoader().load(), True)
+    for _ in range(0, 10):
+        fleet_simulator._run_tick()
+    removed = location_services[2]
+    progress = removed._progress_on_current_piece
+    fleet_simulator.unregister(removed)
+    for _ in range(0, 10):
+        fleet_simulator._run_tick()
+    assert removed._progress_on_current_piece == progress
+    assert location_services[3]._progress_on_current_piece != 0
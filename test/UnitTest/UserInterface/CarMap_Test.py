@@ -0,0 +1,52 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from LocationService.TrackLoader import TrackLoader
+from UserInterface.CarMap import CarMap
+
+
+class CarMapCachingTest(TestCase):
+
+    def setUp(self) -> None:
+        self.app = Flask('IAV_Distortion', template_folder='UserInterface/templates', static_folder='UserInterface/static')
+        self.environment_mng_mock = MagicMock()
+        self.environment_mng_mock.get_track.return_value = TrackLoader().load()
+        self.environment_mng_mock.get_car_color_map.return_value = {}
+        self.environment_mng_mock.get_car_positions.return_value = [{'car': 'Virtual Vehicle 1'}]
+        self.app.register_blueprint(CarMap(self.environment_mng_mock).get_blueprint(), url_prefix='/car_map')
+        self.client = self.app.test_client()
+
+    def test_page_is_revalidated_with_etag(self):
+        # Act
+        first = self.client.get('/car_map')
+        second = self.client.get('/car_map', headers={'If-None-Match': first.headers['ETag']})
+
+        # Assert
+        assert first.status_code == 200
+        assert 'no-cache' in first.headers['Cache-Control']
+        assert second.status_code == 304
+        assert second.data == b''
+        assert self.environment_mng_mock.get_car_color_map.call_count == 1
+
+    def test_track_is_served_serialized(self):
+        # Arrange
+        track = self.environment_mng_mock.get_track.return_value
+
+        # Act
+        response = self.client.get('/car_map/track')
+        revalidated = self.client.get('/car_map/track', headers={'If-None-Match': response.headers['ETag']})
+
+        # Assert
+        assert response.get_json() == track.get_as_list()
+        assert response.headers['ETag'] == f'"{track.get_etag()}"'
+        assert revalidated.status_code == 304
+
+    def test_car_positions_are_not_cached(self):
+        # Act
+        response = self.client.get('/car_map/car_positions')
+
+        # Assert
+        assert response.get_json() == [{'car': 'Virtual Vehicle 1'}]
+        assert 'no-store' in response.headers['Cache-Control']
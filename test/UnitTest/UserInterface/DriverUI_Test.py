@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+
+from UserInterface.DriverUI import DriverUI
+from UserInterface.StaffUI import STAFF_ROOM
+
+
+def get_driving_data_events(client) -> list:
+    return [event['args'][0] for event in client.get_received() if event['name'] == 'update_driving_data']
+
+
+class DriverUIRoomsTest(TestCase):
+
+    def setUp(self) -> None:
+        self.app = Flask('IAV_Distortion')
+        self.socketio = SocketIO(self.app, async_mode='threading')
+        environment_mng_mock = MagicMock()
+        environment_mng_mock.get_vehicle_list.return_value = []
+        self.mut = DriverUI(behaviour_ctrl=MagicMock(), environment_mng=environment_mng_mock, socketio=self.socketio)
+
+        @self.socketio.on('join_staff')
+        def join_staff():
+            join_room(STAFF_ROOM)
+
+        self.player_1 = self.socketio.test_client(self.app)
+        self.player_2 = self.socketio.test_client(self.app)
+        self.staff = self.socketio.test_client(self.app)
+        self.player_1.emit('handle_connect', {'player': 'player 1'})
+        self.player_2.emit('handle_connect', {'player': 'player 2'})
+        self.staff.emit('join_staff')
+
+    def test_driving_data_is_only_sent_to_owner_and_staff(self):
+        # Act
+        self.mut.update_driving_data({'player': 'player 1', 'speed_actual': 10})
+
+        # Assert
+        assert get_driving_data_events(self.player_1) == [{'player': 'player 1', 'speed_actual': 10}]
+        assert get_driving_data_events(self.player_2) == []
+        assert get_driving_data_events(self.staff) == [{'player': 'player 1', 'speed_actual': 10}]
+
+    def test_driving_data_without_player_is_only_sent_to_staff(self):
+        # Act
+        self.mut.update_driving_data({'player': None, 'speed_actual': 10})
+
+        # Assert
+        assert get_driving_data_events(self.player_1) == []
+        assert get_driving_data_events(self.player_2) == []
+        assert get_driving_data_events(self.staff) == [{'player': None, 'speed_actual': 10}]
+
+    def test_player_id_can_not_join_staff_room(self):
+        # Arrange
+        intruder = self.socketio.test_client(self.app)
+        intruder.emit('handle_connect', {'player': STAFF_ROOM})
+
+        # Act
+        self.mut.update_driving_data({'player': 'player 1', 'speed_actual': 10})
+        self.mut.update_driving_data({'player': None, 'speed_actual': 20})
+
+        # Assert
+        assert get_driving_data_events(intruder) == []
+        assert len(get_driving_data_events(self.staff)) == 2
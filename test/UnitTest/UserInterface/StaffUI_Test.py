@@ -0,0 +1,89 @@
+from time import sleep
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from flask import Flask
+from flask_socketio import SocketIO
+
+from UserInterface.StaffUI import StaffUI
+
+
+def get_update_events(client) -> list:
+    return [event['args'][0] for event in client.get_received() if event['name'] == 'update_uuids']
+
+
+class StaffUIUpdateTest(TestCase):
+
+    def setUp(self) -> None:
+        self.app = Flask('IAV_Distortion')
+        self.socketio = SocketIO(self.app, async_mode='threading')
+        self.environment_mng_mock = MagicMock()
+        self.environment_mng_mock.get_mapped_cars.return_value = [{'player': 'player 1', 'car': 'Virtual Vehicle 1'}]
+        self.environment_mng_mock.get_free_car_list.return_value = []
+        self.environment_mng_mock.get_waiting_player_list.return_value = ['player 2']
+        self.mut = StaffUI(cybersecurity_mng=MagicMock(), socketio=self.socketio, environment_mng=self.environment_mng_mock,
+                           password='0000', update_window=0.05)
+
+        flask_client = self.app.test_client()
+        flask_client.set_cookie('admin_token', self.mut.admin_token)
+        self.staff = self.socketio.test_client(self.app, flask_test_client=flask_client)
+        self.driver = self.socketio.test_client(self.app)
+        self.staff.emit('get_uuids')
+
+    def test_requesting_client_gets_complete_data(self):
+        # Assert
+        assert get_update_events(self.staff) == [{'car_map': [{'player': 'player 1', 'car': 'Virtual Vehicle 1'}],
+                                                  'car_queue': [], 'player_queue': ['player 2']}]
+        assert get_update_events(self.driver) == []
+
+    def test_changes_are_debounced_and_diffed(self):
+        # Arrange
+        self.mut.publish_new_data()
+        sleep(0.15)
+        self.staff.get_received()
+
+        # Act
+        self.environment_mng_mock.get_waiting_player_list.return_value = []
+        for _ in range(0, 5):
+            self.mut.publish_new_data()
+        sleep(0.15)
+
+        # Assert
+        assert get_update_events(self.staff) == [{'player_queue': []}]
+        assert get_update_events(self.driver) == []
+
+    def test_nothing_is_sent_without_changes(self):
+        # Arrange
+        self.mut.publish_new_data()
+        sleep(0.15)
+        self.staff.get_received()
+
+        # Act
+        self.mut.publish_new_data()
+        sleep(0.15)
+
+        # Assert
+        assert get_update_events(self.staff) == []
+
+    def test_late_joiner_gets_baseline_of_updates(self):
+        # Arrange
+        self.mut._update_window = 0.2
+        self.environment_mng_mock.get_waiting_player_list.return_value = []
+        # the change isn't sent yet when the new staff page requests the data
+        self.mut.publish_new_data()
+        flask_client = self.app.test_client()
+        flask_client.set_cookie('admin_token', self.mut.admin_token)
+        late_staff = self.socketio.test_client(self.app, flask_test_client=flask_client)
+        late_staff.emit('get_uuids')
+
+        # Act
+        # changed back within the update window
+        self.environment_mng_mock.get_waiting_player_list.return_value = ['player 2']
+        self.mut.publish_new_data()
+        sleep(0.3)
+
+        # Assert
+        assert get_update_events(late_staff) == [{'car_map': [{'player': 'player 1', 'car': 'Virtual Vehicle 1'}],
+                                                  'car_queue': [], 'player_queue': []},
+                                                 {'player_queue': ['player 2']}]
+        assert get_update_events(self.staff)[-2:] == [{'player_queue': []}, {'player_queue': ['player 2']}]
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from threading import Thread, current_thread
+from unittest import TestCase
+from unittest.mock import Mock
+
+from VehicleManagement.BleEventLoop import BleEventLoop, get_shared_ble_event_loop
+from VehicleManagement.FleetController import FleetController
+from VehicleManagement.AnkiController import AnkiController
+
+
+class BleEventLoopTest(TestCase):
+
+    def setUp(self) -> None:
+        self.mut = BleEventLoop("test_ble_event_loop")
+
+    def tearDown(self) -> None:
+        self.mut.stop()
+
+    def test_tasks_of_all_threads_share_one_loop_thread(self):
+        # Arrange
+        threads_of_tasks = set()
+
+        async def task():
+            await asyncio.sleep(0.001)
+            threads_of_tasks.add(current_thread().name)
+
+        def run_tasks():
+            for _ in range(0, 10):
+                self.mut.run(task())
+        threads = [Thread(target=run_tasks) for _ in range(0, 8)]
+        thread_count_before = threading.active_count()
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert threads_of_tasks == {"test_ble_event_loop"}
+        assert threading.active_count() == thread_count_before + 1
+
+    def test_results_and_exceptions_are_returned(self):
+        # Arrange
+        async def add(a, b):
+            return a + b
+
+        async def fail():
+            raise ValueError("failed")
+
+        # Act
+        result = self.mut.run(add(1, 2))
+
+        # Assert
+        assert result == 3
+        with self.assertRaises(ValueError):
+            self.mut.run(fail())
+
+    def test_task_started_by_a_task_does_not_block_the_loop(self):
+        # Arrange
+        finished = []
+        errors = []
+
+        async def inner():
+            finished.append('inner')
+
+        async def outer():
+            # like a command sent from a notification callback
+            try:
+                self.mut.run(inner())
+            except RuntimeError as e:
+                errors.append(e)
+            self.mut.submit(inner())
+            await asyncio.sleep(0.01)
+            return 'outer'
+
+        # Act
+        result = self.mut.run(outer(), timeout=5)
+
+        # Assert
+        assert result == 'outer'
+        assert len(errors) == 1
+        assert finished == ['inner']
+
+    def test_command_from_notification_callback_is_sent(self):
+        # Arrange
+        anki_controller = AnkiController(self.mut)
+        written = []
+
+        async def write_gatt_char(uuid, data, response):
+            written.append(data)
+
+        async def stop_notify(uuid):
+            return
+        anki_controller._connected_car = Mock()
+        anki_controller._connected_car.write_gatt_char = write_gatt_char
+        # used by the disconnect in __del__
+        anki_controller._connected_car.stop_notify = stop_notify
+
+        async def notification_callback():
+            return anki_controller.change_speed_to(50)
+
+        # Act
+        sent = self.mut.run(notification_callback(), timeout=5)
+        self.mut.run(asyncio.sleep(0.01))
+
+        # Assert
+        assert sent
+        assert len(written) == 1
+
+    def test_stopped_loop_is_started_again(self):
+        # Arrange
+        async def get_thread_name():
+            return current_thread().name
+        self.mut.run(get_thread_name())
+
+        # Act
+        self.mut.stop()
+        stopped = not self.mut.is_running()
+        result = self.mut.run(get_thread_name())
+
+        # Assert
+        assert stopped
+        assert result == "test_ble_event_loop"
+
+    def test_fleet_controller_uses_shared_loop(self):
+        # Act
+        fleet_ctrl = FleetController()
+
+        # Assert
+        assert fleet_ctrl.get_ble_event_loop() is get_shared_ble_event_loop()
+        assert FleetController(self.mut).get_ble_event_loop() is self.mut
@@ -0,0 +1,127 @@
+import multiprocessing
+import time
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import Mock
+
+from bleak import BleakClient
+
+from VehicleManagement.VehicleController import Turns
+from VehicleManagement.VehicleControllerProcess import VehicleControllerProcess, _serve
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class AnkiControllerMock(Mock):
+    """
+    Mock doesn't support __del__, which disconnects the AnkiController
+    """
+    def __del__(self):
+        self.disconnected = True
+
+
+class VehicleControllerProcessTest(TestCase):
+    """
+    The other side of the pipe is served in a thread of the test process, so the
+    FleetController and the AnkiControllers can be mocked
+    """
+
+    def setUp(self) -> None:
+        self.fleet_ctrl_mock = Mock()
+        self.fleet_ctrl_mock.scan_for_anki_cars.return_value = ['AA:BB:CC:DD:EE:FF']
+        self.anki_controller_mock = AnkiControllerMock()
+        self.anki_controller_mock.connect_to_vehicle.return_value = True
+        connection, self.server_connection = multiprocessing.Pipe()
+        self.server_thread = Thread(target=_serve, args=(self.server_connection, self.fleet_ctrl_mock,
+                                                         lambda: self.anki_controller_mock), daemon=True)
+        self.server_thread.start()
+        self.mut = VehicleControllerProcess()
+        self.mut._connection = connection
+        self.mut._start_receiver()
+
+    def tearDown(self) -> None:
+        # like the end of the process
+        self.mut._send(('stop',))
+        self.server_thread.join()
+        self.server_connection.close()
+        self.mut._receiver_thread.join()
+        self.mut._connection.close()
+        self.mut._connection = None
+
+    def test_scan_returns_cars_of_other_side(self):
+        # Act
+        found_cars = self.mut.scan_for_anki_cars()
+
+        # Assert
+        assert found_cars == ['AA:BB:CC:DD:EE:FF']
+        self.fleet_ctrl_mock.scan_for_anki_cars.assert_called_once()
+
+    def test_commands_reach_anki_controller(self):
+        # Arrange
+        controller = self.mut.create_vehicle_controller()
+
+        # Act
+        connected = controller.connect_to_vehicle(BleakClient('AA:BB:CC:DD:EE:FF'))
+        controller.change_speed_to(50)
+        controller.change_lane_to(-1, 50)
+        controller.do_turn_with(Turns.A_UTURN)
+
+        # Assert
+        assert connected
+        assert self.anki_controller_mock.connect_to_vehicle.call_args.args[0].address == 'AA:BB:CC:DD:EE:FF'
+        assert wait_for(lambda: self.anki_controller_mock.do_turn_with.called)
+        self.anki_controller_mock.change_speed_to.assert_called_once_with(50, 1000, True)
+        self.anki_controller_mock.change_lane_to.assert_called_once_with(-1, 50, 1000)
+        assert self.anki_controller_mock.do_turn_with.call_args.args[0] == Turns.A_UTURN
+
+    def test_notifications_reach_callbacks(self):
+        # Arrange
+        controller = self.mut.create_vehicle_controller()
+        controller.connect_to_vehicle(BleakClient('AA:BB:CC:DD:EE:FF'))
+        battery_callback = Mock()
+        controller.set_callbacks(None, None, None, None, battery_callback, None)
+        # callbacks that were set on the other side: location, transition, offset, version, battery, not reachable
+        anki_callbacks = self.anki_controller_mock.set_callbacks.call_args.args
+
+        # Act
+        anki_callbacks[4]((3900,))
+
+        # Assert
+        assert wait_for(lambda: battery_callback.called)
+        battery_callback.assert_called_once_with((3900,))
+
+    def test_removed_controller_gets_no_commands(self):
+        # Arrange
+        controller = self.mut.create_vehicle_controller()
+        controller.connect_to_vehicle(BleakClient('AA:BB:CC:DD:EE:FF'))
+
+        # Act
+        controller.__del__()
+        controller.change_speed_to(50)
+        self.mut.scan_for_anki_cars()
+
+        # Assert
+        self.anki_controller_mock.change_speed_to.assert_not_called()
+        assert self.anki_controller_mock.disconnected is True
+
+
+def test_ble_runs_in_other_process():
+    """
+    Test that the process is started, answers without a BLE adapter and is stopped
+    """
+    vehicle_controller_process = VehicleControllerProcess()
+    vehicle_controller_process.start()
+    try:
+        assert isinstance(vehicle_controller_process.scan_for_anki_cars(), list)
+        assert vehicle_controller_process.create_vehicle_controller().change_speed_to(50)
+    finally:
+        vehicle_controller_process.stop()
+    assert not vehicle_controller_process.is_running()
+    assert vehicle_controller_process.scan_for_anki_cars() == []
@@ -0,0 +1,70 @@
+from time import sleep
+from threading import active_count
+from unittest import TestCase
+from unittest.mock import Mock
+
+from DataModel.Vehicle import Vehicle
+from VehicleMovementManagement.BehaviourController import BehaviourController
+
+
+class SpeedCoalescingTest(TestCase):
+
+    def setUp(self) -> None:
+        self.vehicle_mock = Mock(spec=Vehicle)
+        self.vehicle_mock.vehicle_id = 'Virtual Vehicle 1'
+        self.other_vehicle_mock = Mock(spec=Vehicle)
+        self.other_vehicle_mock.vehicle_id = 'Virtual Vehicle 2'
+        self.mut = BehaviourController([self.vehicle_mock, self.other_vehicle_mock], speed_coalescing_window=0.05)
+
+    def test_burst_applies_latest_request_once(self):
+        # Arrange
+        applied = []
+        type(self.vehicle_mock).speed_request = property(fset=lambda _, value: applied.append(value))
+
+        # Act
+        for value in range(0, 30):
+            self.mut.request_speed_change_for('Virtual Vehicle 1', value)
+        sleep(0.2)
+
+        # Assert
+        assert applied == [29]
+        assert self.mut.get_speed_coalescing_statistics() == {'submitted': 30, 'applied': 1, 'coalesced': 29}
+
+    def test_vehicles_are_coalesced_separately(self):
+        # Act
+        self.mut.request_speed_change_for('Virtual Vehicle 1', 40)
+        self.mut.request_speed_change_for('Virtual Vehicle 2', 60)
+        sleep(0.2)
+
+        # Assert
+        assert self.vehicle_mock.speed_request == 40
+        assert self.other_vehicle_mock.speed_request == 60
+
+    def test_windows_start_no_threads_and_leave_no_entries(self):
+        # Arrange
+        thread_count = active_count()
+
+        # Act
+        for value in range(0, 20):
+            self.mut.request_speed_change_for('Virtual Vehicle 1', value)
+            self.mut.request_speed_change_for('Virtual Vehicle 2', value)
+        burst_thread_count = active_count()
+        sleep(0.2)
+
+        # Assert
+        # at most the worker thread of the coalescer was started
+        assert burst_thread_count <= thread_count + 1
+        assert self.vehicle_mock.speed_request == 19
+        assert self.other_vehicle_mock.speed_request == 19
+        assert self.mut._speed_coalescer._pending == {}
+        assert not self.mut._speed_coalescer._scheduler.is_scheduled('Virtual Vehicle 1')
+
+    def test_without_window_requests_are_applied_immediately(self):
+        # Arrange
+        self.mut = BehaviourController([self.vehicle_mock], speed_coalescing_window=0)
+
+        # Act
+        self.mut.request_speed_change_for('Virtual Vehicle 1', 40)
+
+        # Assert
+        assert self.vehicle_mock.speed_request == 40